@@ -0,0 +1,182 @@
+import time
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+import consts
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from project import file_gen
+from project.backends import get_backend, BACKENDS
+from project.excel_session import ExcelSession
+
+"""
+Benchmark the workbook backends on the takeoff and checklist templates.
+
+With --strategies, also time the takeoff, checklist and config files of one run created one after the other,
+on threads (file_gen.create_files) and in spawned worker processes, as on Windows. --synthetic generates
+sample templates with openpyxl when the real templates are not available.
+
+Usage (from the src directory): python -m benchmark.file_gen_bench [--backends com xml openpyxl] [--runs 5]
+    [--strategies] [--synthetic]
+"""
+
+SYNTHETIC_ROWS = 2000
+
+SAMPLE_PROJ_DATA = {
+    'id': 'P12345',
+    'name': 'Sample Client_Sample Scope',
+    'scope': 'Sample Scope',
+    'type': 'Sample Type',
+    'item': 'SALES - Sample Item',
+    'rep': 'Sample Rep',
+    'client': 'Sample Client',
+    'url': 'https://example.com/proposal'
+}
+
+
+def time_backend(name: str, templates: dict, runs: int, out_dir: Path) -> dict:
+    """
+    Generate the takeoff and checklist files repeatedly with the given backend.
+
+    :param name: name of the workbook backend
+    :param templates: paths of the takeoff and checklist templates
+    :param runs: number of times each file is generated
+    :param out_dir: directory to write the generated files to
+    :return: template name, per-file timings (in seconds) pairs
+    """
+    session = ExcelSession()
+    backend = get_backend(name, session)
+    jobs = {
+        'takeoff': (file_gen.create_takeoff_file, templates['takeoff']),
+        'checklist': (file_gen.create_checklist_file, templates['checklist']),
+    }
+    timings = {}
+    with session:
+        for label, (create_file, src) in jobs.items():
+            timings[label] = []
+            for i in range(runs):
+                dest = Path(out_dir, f'{name}_{label}_{i}.xltm')
+                start = time.perf_counter()
+                create_file(Path(src), dest, SAMPLE_PROJ_DATA, backend)
+                timings[label].append(time.perf_counter() - start)
+    return timings
+
+
+def make_synthetic_templates(out_dir: Path) -> dict:
+    """
+    Write sample templates holding the placeholders of every kind among SYNTHETIC_ROWS filled rows.
+
+    :param out_dir: directory to write the templates to
+    :return: kind, template path pairs
+    """
+    import openpyxl
+    placeholders = {
+        'takeoff': [placeholder for placeholder, _ in file_gen.get_key_value_pairs('takeoff', SAMPLE_PROJ_DATA)],
+        'checklist': ['PROJECT#'],
+        'config': ['Project Number:', 'Project Name:']
+    }
+    templates = {}
+    for kind, keys in placeholders.items():
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        for row in range(1, SYNTHETIC_ROWS + 1):
+            ws.append([f'Item {row}', row, row * 1.5, f'=B{row}*C{row}'])
+        for row, key in enumerate(keys, start=SYNTHETIC_ROWS + 1):
+            ws.cell(row=row, column=1, value=key)
+        templates[kind] = Path(out_dir, f'{kind}_template.xlsx')
+        wb.save(templates[kind])
+    return templates
+
+
+def time_strategies(name: str, templates: dict, runs: int, out_dir: Path) -> dict:
+    """
+    Time the files of one run created serially, on threads and in spawned processes.
+
+    :param name: name of the workbook backend
+    :param templates: kind, template path pairs
+    :param runs: number of times the files are created with each strategy
+    :param out_dir: directory to write the generated files to
+    :return: strategy, per-run timings (in seconds) pairs
+    """
+    proj_data = dict(SAMPLE_PROJ_DATA, config=True)
+
+    def get_jobs(strategy: str, run: int) -> list:
+        return [(kind, src, Path(out_dir, f'{name}_{strategy}_{kind}_{run}.xltm')) for kind, src in templates.items()]
+
+    def serial(jobs):
+        with ExcelSession() as session:
+            for kind, src, dest in jobs:
+                file_gen.create_file(kind, src, dest, proj_data, name, session)
+
+    def processes(jobs):
+        with ProcessPoolExecutor(len(jobs), mp_context=multiprocessing.get_context('spawn')) as executor:
+            list(executor.map(file_gen.create_file, *zip(*jobs), [proj_data] * len(jobs), [name] * len(jobs)))
+
+    strategies = {
+        'serial': serial,
+        'threads': lambda jobs: file_gen.create_files(jobs, proj_data, name),
+        'processes': processes
+    }
+    timings = {}
+    for strategy, create in strategies.items():
+        timings[strategy] = []
+        for run in range(runs):
+            start = time.perf_counter()
+            create(get_jobs(strategy, run))
+            timings[strategy].append(time.perf_counter() - start)
+    return timings
+
+
+def print_report(results: dict):
+    """
+    Print the median and mean time per file for each backend and template.
+
+    :param results: backend name, timings pairs
+    """
+    print(f"{'backend':<10}{'template':<12}{'median (ms)':>14}{'mean (ms)':>12}")
+    for name, timings in results.items():
+        for label, samples in timings.items():
+            median = statistics.median(samples) * 1000
+            mean = statistics.mean(samples) * 1000
+            print(f'{name:<10}{label:<12}{median:>14.1f}{mean:>12.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the workbook backends used for file generation.')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--takeoff', help='takeoff template, defaults to TAKEOFF_PATH')
+    parser.add_argument('--checklist', help='checklist template, defaults to CHECKLIST_PATH')
+    parser.add_argument('--config', help='configurator template, defaults to CONFIG_PATH')
+    parser.add_argument('--strategies', action='store_true', help='compare serial, thread and process creation')
+    parser.add_argument('--synthetic', action='store_true', help='generate sample templates with openpyxl')
+    args = parser.parse_args()
+
+    consts.get_consts_from_csv(Path(__file__).parent.parent)
+    results = {}
+    strategy_results = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        if args.synthetic:
+            templates = make_synthetic_templates(Path(out_dir))
+        else:
+            templates = {
+                'takeoff': args.takeoff or consts.TAKEOFF_PATH,
+                'checklist': args.checklist or consts.CHECKLIST_PATH,
+                'config': args.config or consts.CONFIG_PATH
+            }
+        for name in args.backends:
+            try:
+                results[name] = time_backend(name, templates, args.runs, Path(out_dir))
+                if args.strategies:
+                    strategy_results[name] = time_strategies(name, templates, args.runs, Path(out_dir))
+            except Exception as ex:
+                print(f'Skipping {name}: {ex}')
+    print_report(results)
+    if strategy_results:
+        print()
+        print_report(strategy_results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+/* Behaviour of the NetSuite form fields used by the element steps. */
+
+function closePopup() {
+    var popups = document.querySelectorAll('.uir-popup-select-content');
+    for (var i = 0; i < popups.length; i++) {
+        popups[i].parentNode.removeChild(popups[i]);
+    }
+}
+
+function focusNext(field) {
+    var fields = Array.prototype.slice.call(document.querySelectorAll('input:not([type=hidden])'));
+    var next = fields[fields.indexOf(field) + 1];
+    if (next) {
+        next.focus();
+    }
+}
+
+function showPopup(field) {
+    fetch('/app/search?q=' + encodeURIComponent(field.value))
+        .then(function (response) { return response.json(); })
+        .then(function (rows) {
+            closePopup();
+            var html = '<table><tbody>';
+            rows.forEach(function (row) {
+                html += '<tr><td><a class="smalltextnolink" href="#">' + row + '</a></td></tr>';
+            });
+            var popup = document.createElement('div');
+            popup.className = 'uir-popup-select-content';
+            popup.innerHTML = html + '</tbody></table>';
+            popup.addEventListener('click', function (event) {
+                event.preventDefault();
+                field.value = event.target.textContent;
+                closePopup();
+                focusNext(field);
+            });
+            document.body.appendChild(popup);
+        });
+}
+
+function editCell(cell) {
+    var input = cell.querySelector('input');
+    input.style.display = 'inline';
+    input.focus();
+}
+
+document.addEventListener('change', function (event) {
+    if (event.target.hasAttribute('data-popup')) {
+        showPopup(event.target);
+    }
+});
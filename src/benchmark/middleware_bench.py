@@ -0,0 +1,161 @@
+import math
+import time
+import argparse
+import tempfile
+import consts
+from pathlib import Path
+import middleware.utils as utils
+from middleware.plan import get_plan
+from middleware.rest import RestClient, create_proposal
+from middleware.middleware import get_controller, get_proj_data
+from utility.elem_handler import set_user_pass_questions
+from benchmark.mock_netsuite import MockNetSuite, QUESTION, MOCK_CREDENTIALS
+
+"""
+Benchmark the end-to-end latency of the element steps against the local mock NetSuite.
+
+With the browser engine, each run starts a headless Chrome on a fresh profile, logs in, fills the proposal
+and the project popup, saves the record and checks the scraped project id and URL. With --fast, the browser
+uses the fast profile of get_controller, blocking the images and fonts the mock pages reference. With the REST
+engine, each run creates the same records through the mock REST services over one shared client. The report
+gives the p50 and p95 of every phase of the runs.
+
+Usage (from the src directory):
+    python -m benchmark.middleware_bench [--engine browser|rest] [--runs 10] [--latency 50] [--question] [--fast]
+"""
+
+HEADLESS_OPTIONS = ['--headless=new', '--window-size=1920,1080']
+
+SAMPLE_DATA = {
+    'Username': 'bench@example.com',
+    'Password': 'password',
+    'Question 1': QUESTION,
+    'Answer 1': 'Rex',
+    'Question 2': 'Unused question 2',
+    'Answer 2': '',
+    'Question 3': 'Unused question 3',
+    'Answer 3': '',
+    'Customer': 'Sample Client',
+    'Status': 'Open',
+    'Memo': 'Benchmark',
+    'Proposal Sales Rep': 'Sample Rep',
+    'Department': 'Sales',
+    'Class': 'Products',
+    'Item': 'SALES - Sample Item',
+    'Project Template': 'Sample Template',
+    'Project Scope': 'Sample Scope',
+    'Project Type': 'Sample Type',
+    'Site Name': 'Sample Site | Building | Subfacility'
+}
+
+
+def percentile(samples: list, rank: float) -> float:
+    """
+    Return the nearest-rank percentile of the samples.
+
+    :param samples: measured values
+    :param rank: percentile between 0 and 100
+    :return: value at the given percentile
+    """
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(rank / 100 * len(ordered)) - 1, 0)]
+
+
+def check_proj_data(proj_data: dict):
+    """
+    Raise an error if the run did not return the project id and URL.
+
+    :param proj_data: data for the project
+    """
+    if not proj_data['id'] or not proj_data['url']:
+        raise Exception(f"Error: The run did not return a project id and URL ({proj_data['id']}, {proj_data['url']}).")
+
+
+def time_run(wait: float, fast: bool = False) -> dict:
+    """
+    Create one proposal against the mock server on a fresh headless browser.
+
+    :param wait: delay (in seconds) before executing each action
+    :param fast: use the fast profile, see get_controller
+    :return: phase name, duration (in seconds) pairs
+    """
+    data = dict(SAMPLE_DATA)
+    set_user_pass_questions(data)
+    utils.update_keys_for_elements(data)
+    with tempfile.TemporaryDirectory() as profile:
+        start = time.perf_counter()
+        options = None if fast else HEADLESS_OPTIONS
+        controller = get_controller([consts.NETSUITE_URL], wait, Path(profile), options, fast)
+        started = time.perf_counter()
+        try:
+            controller.run_plan(get_plan(), data)
+            proj_data = get_proj_data(controller.data_handler.database, data, {})
+        finally:
+            controller.quit()
+        end = time.perf_counter()
+    check_proj_data(proj_data)
+    return {'startup': started - start, 'steps': end - started, 'total': end - start}
+
+
+def time_rest_run(client: RestClient) -> dict:
+    """
+    Create one proposal through the mock REST services.
+
+    :param client: client shared by the runs
+    :return: phase name, duration (in seconds) pairs
+    """
+    data = dict(SAMPLE_DATA)
+    set_user_pass_questions(data)
+    start = time.perf_counter()
+    proj_data = get_proj_data(create_proposal(data, client), data, {})
+    end = time.perf_counter()
+    check_proj_data(proj_data)
+    return {'total': end - start}
+
+
+def print_report(timings: dict):
+    """
+    Print the p50 and p95 of each phase.
+
+    :param timings: phase name, durations pairs
+    """
+    print(f"{'phase':<10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'runs':>8}")
+    for phase, samples in timings.items():
+        p50 = percentile(samples, 50) * 1000
+        p95 = percentile(samples, 95) * 1000
+        print(f'{phase:<10}{p50:>12.0f}{p95:>12.0f}{len(samples):>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the element steps against a local mock NetSuite.')
+    parser.add_argument('--engine', default='browser', choices=['browser', 'rest'])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=50, help='delay added to every response (ms)')
+    parser.add_argument('--wait', type=float, default=0, help='delay before each action (s)')
+    parser.add_argument('--question', action='store_true', help='ask a security question after login')
+    parser.add_argument('--fast', action='store_true', help='use the fast browser profile')
+    args = parser.parse_args()
+
+    consts.get_consts_from_csv(Path(__file__).parent.parent)
+    server = MockNetSuite(latency=args.latency / 1000, question=args.question).start()
+    consts.NETSUITE_URL = server.url
+    client = RestClient(server.rest_url, MOCK_CREDENTIALS, 'MOCK')
+    timings = {}
+    try:
+        for i in range(args.runs):
+            try:
+                run = time_rest_run(client) if args.engine == 'rest' else time_run(args.wait, args.fast)
+            except Exception as ex:
+                print(f'Run {i + 1} failed: {ex}')
+                continue
+            for phase, duration in run.items():
+                timings.setdefault(phase, []).append(duration)
+    finally:
+        client.close()
+        server.stop()
+    if timings:
+        print_report(timings)
+
+
+if __name__ == '__main__':
+    main()
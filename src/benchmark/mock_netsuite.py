@@ -0,0 +1,297 @@
+import html
+import re
+import hmac
+import base64
+import json
+import time
+import argparse
+import itertools
+from pathlib import Path
+from string import Template
+from threading import Thread
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from middleware.rest import get_signature
+
+"""
+Local stand-in for the NetSuite pages driven by the element steps.
+
+Serves the login page, the security question, the proposal form with its popups, the project popup
+window and the saved record, all from the HTML fixtures in benchmark/fixtures, with the images and fonts
+the pages reference. The REST record and SuiteQL services used by the REST engine
+are served under /services/rest and check the request signature against MOCK_CREDENTIALS. Every response
+can be delayed to mimic the latency of the real service.
+
+Usage (from the src directory): python -m benchmark.mock_netsuite [--port 8765] [--latency 50] [--question]
+"""
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+FORM_PATH = '/app/common/custom/custrecordentry.nl'
+SESSION_COOKIE = 'mock-session'
+QUESTION = "What is the name of your first pet?"
+REST_PATH = '/services/rest'
+MOCK_CREDENTIALS = {
+    'consumer_key': 'mock-consumer-key',
+    'consumer_secret': 'mock-consumer-secret',
+    'token_id': 'mock-token-id',
+    'token_secret': 'mock-token-secret'
+}
+# Images and fonts referenced by the fixtures, so blocking them in the fast profile shows in the benchmark
+ASSET_PATH = '/static/assets/'
+ASSET_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/png',
+    '.gif': 'image/png',
+    '.woff2': 'font/woff2'
+}
+PIXEL = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAAC0lEQVR4nGNgAAIAAAUAAXpeqz8AAAAASUVORK5CYII=')
+LOOKUP_PATTERN = re.compile(r"SELECT '([^']*)' AS label, id FROM \w+ WHERE \w+ = '((?:[^']|'')*)'")
+
+
+def render(name: str, **values) -> bytes:
+    """
+    Fill an HTML fixture with the given values.
+
+    :param name: file name of the fixture
+    :param values: placeholder, value pairs
+    :return: encoded page
+    """
+    template = Template((FIXTURES_DIR / name).read_text(encoding='utf-8'))
+    return template.substitute(values).encode('utf-8')
+
+
+class MockNetSuiteHandler(BaseHTTPRequestHandler):
+    """
+    Handles the requests made by the browser to the mock server.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def is_logged_in(self) -> bool:
+        return f'{SESSION_COOKIE}=ok' in self.headers.get('Cookie', '')
+
+    def read_form(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        return {key: values[0] for key, values in form.items()}
+
+    def is_signed(self) -> bool:
+        header = self.headers.get('Authorization', '')
+        params = {key: unquote(value) for key, value in re.findall(r'(\w+)="([^"]*)"', header)}
+        params.pop('realm', None)
+        signature = params.pop('oauth_signature', '')
+        url = f'http://{self.headers["Host"]}{self.path}'
+        return hmac.compare_digest(signature, get_signature(self.command, url, params, MOCK_CREDENTIALS))
+
+    def send_json(self, status: int, body: dict = None, location: str = None):
+        time.sleep(self.server.latency)
+        content = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        if location:
+            self.send_header('Location', location)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def handle_rest(self):
+        url = urlsplit(self.path)
+        parts = url.path[len(REST_PATH):].strip('/').split('/')
+        if not self.is_signed():
+            self.send_json(401, {'o:errorDetails': [{'detail': 'Invalid login attempt.'}]})
+        elif self.command == 'POST' and parts == ['query', 'v1', 'suiteql']:
+            suiteql = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))['q']
+            items = []
+            for label, name in LOOKUP_PATTERN.findall(suiteql):
+                name = name.replace("''", "'")
+                record_id = self.server.lookups.setdefault(name, str(next(self.server.ids)))
+                self.server.names[record_id] = name
+                items.append({'label': label, 'id': record_id})
+                if name in self.server.duplicate_names:
+                    items.append({'label': label, 'id': str(next(self.server.ids))})
+            self.send_json(200, {'items': items, 'count': len(items), 'hasMore': False})
+        elif self.command == 'POST' and parts[:2] == ['record', 'v1'] and len(parts) == 3 \
+                and parts[2] in self.server.failing_records:
+            self.send_json(400, {'o:errorDetails': [{'detail': 'Invalid field value.'}]})
+        elif self.command == 'POST' and parts[:2] == ['record', 'v1'] and len(parts) == 3:
+            fields = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+            record_id = str(next(self.server.ids))
+            self.server.rest_records[(parts[2], record_id)] = fields
+            self.send_json(204, location=f'http://{self.headers["Host"]}{url.path}/{record_id}')
+        elif self.command == 'DELETE' and parts[:2] == ['record', 'v1'] and len(parts) == 4:
+            if self.server.rest_records.pop((parts[2], parts[3]), None) is None:
+                self.send_json(404, {'o:errorDetails': [{'detail': 'Record not found.'}]})
+                return
+            self.send_json(204)
+        elif self.command == 'GET' and parts[:2] == ['record', 'v1'] and len(parts) == 4:
+            fields = self.server.rest_records.get((parts[2], parts[3]))
+            if fields is None:
+                self.send_json(404, {'o:errorDetails': [{'detail': 'Record not found.'}]})
+                return
+            customer = self.server.names.get(fields.get('parent', {}).get('id'), '')
+            scope = fields.get('custentityprime_project_scope', '')
+            self.send_json(200, {'id': parts[3], 'entityid': f'P{parts[3]}', 'companyname': f'{customer}_{scope}'})
+        else:
+            self.send_json(404, {'o:errorDetails': [{'detail': 'Unknown service.'}]})
+
+    def send_page(self, body: bytes, content_type: str = 'text/html; charset=utf-8', cookie: str = None):
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if cookie:
+            self.send_header('Set-Cookie', cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def redirect(self, location: str, cookie: str = None):
+        time.sleep(self.server.latency)
+        self.send_response(303)
+        self.send_header('Location', location)
+        if cookie:
+            self.send_header('Set-Cookie', cookie)
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path.startswith(REST_PATH):
+            self.handle_rest()
+        elif url.path == '/static/netsuite.js':
+            self.send_page((FIXTURES_DIR / 'netsuite.js').read_bytes(), 'application/javascript')
+        elif url.path.startswith(ASSET_PATH) and Path(url.path).suffix in ASSET_TYPES:
+            content_type = ASSET_TYPES[Path(url.path).suffix]
+            self.send_page(PIXEL if content_type.startswith('image') else b'', content_type)
+        elif not self.is_logged_in() and url.path == '/app/login':
+            self.send_page(render('login.html', next=html.escape(query.get('next', FORM_PATH))))
+        elif not self.is_logged_in():
+            self.redirect(f'/app/login?next={quote(self.path)}')
+        elif url.path == '/app/question':
+            self.send_page(render('question.html', next=html.escape(query.get('next', FORM_PATH)),
+                                             question=QUESTION))
+        elif url.path == '/app/search':
+            term = query.get('q', '').strip()
+            # The near miss comes first, as a popup row is only chosen by exact match
+            self.send_page(json.dumps([f'{term} (Inactive)', term]).encode('utf-8'), 'application/json')
+        elif url.path == '/app/project.nl':
+            self.send_page(render('project.html'))
+        elif url.path == FORM_PATH and 'id' in query:
+            record = self.server.records.get(query['id'], '')
+            self.send_page(render('record.html', record_id=query['id'], project=record))
+        elif url.path == FORM_PATH:
+            self.send_page(render('proposal.html', action=self.path))
+        else:
+            self.send_error(404)
+
+    def do_DELETE(self):
+        if urlsplit(self.path).path.startswith(REST_PATH):
+            self.handle_rest()
+            return
+        self.send_error(404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.startswith(REST_PATH):
+            self.handle_rest()
+            return
+        form = self.read_form()
+        if url.path == '/app/login':
+            cookie = f'{SESSION_COOKIE}=ok; Path=/'
+            next_path = form.get('next') or FORM_PATH
+            if self.server.question:
+                self.redirect(f'/app/question?next={quote(next_path)}', cookie)
+            else:
+                self.redirect(next_path, cookie)
+        elif url.path == '/app/question':
+            self.redirect(form.get('next') or FORM_PATH)
+        elif url.path == '/app/project.nl':
+            project_id = f'P{next(self.server.ids)}'
+            project = f"{project_id} {form.get('parent_display', '')}_{form.get('custentityprime_project_scope', '')}"
+            self.send_page(render('project_saved.html', project=project.replace("'", '')))
+        elif url.path == FORM_PATH:
+            record_id = str(next(self.server.ids))
+            self.server.records[record_id] = form.get('custrecord_appfproj_display', '')
+            self.redirect(f'{url.path}?{url.query}&id={record_id}')
+        else:
+            self.send_error(404)
+
+
+class MockNetSuite(ThreadingHTTPServer):
+    """
+    HTTP server serving the mock NetSuite pages on a background thread.
+
+        Attributes:
+        latency (float): The delay (in seconds) added to every response.
+        question (bool): A boolean indicating whether a security question is asked after login.
+        records (dict): Record id, project name pairs of the saved proposals.
+        ids (itertools.count): The generator of record and project ids.
+        lookups (dict): Name, internal id pairs of the names resolved by SuiteQL.
+        names (dict): Internal id, name pairs of the names resolved by SuiteQL.
+        rest_records (dict): The fields of the records created through REST, by (record type, id).
+        failing_records (set): The record types whose creation fails with an error.
+        duplicate_names (set): The names SuiteQL finds on two records.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0, question: bool = False):
+        super().__init__(('127.0.0.1', port), MockNetSuiteHandler)
+        self.latency = latency
+        self.question = question
+        self.records = {}
+        self.ids = itertools.count(1001)
+        self.lookups = {}
+        self.names = {}
+        self.rest_records = {}
+        self.failing_records = set()
+        self.duplicate_names = set()
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        URL of the new proposal form, used in place of NETSUITE_URL.
+        """
+        return f'http://127.0.0.1:{self.server_port}{FORM_PATH}?rectype=207'
+
+    @property
+    def rest_url(self) -> str:
+        """
+        Base URL of the REST services, used in place of NETSUITE_REST_URL.
+        """
+        return f'http://127.0.0.1:{self.server_port}{REST_PATH}'
+
+    def start(self):
+        """
+        Serve the requests on a daemon thread.
+        """
+        self.thread = Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the mock NetSuite pages.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='delay added to every response (ms)')
+    parser.add_argument('--question', action='store_true', help='ask a security question after login')
+    args = parser.parse_args()
+
+    server = MockNetSuite(args.port, args.latency / 1000, args.question)
+    print(f'Serving the mock NetSuite at {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
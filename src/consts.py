@@ -1,4 +1,5 @@
 import csv
+from pathlib import Path
 
 NETSUITE_URL = None
 GITHUB_SRC = None
@@ -10,6 +11,19 @@ QUOTE_LOG_PATH = None
 DROPDOWN_DIR = None
 JOB_DIRS = None
 DROPDOWN_PATHS = None
+WORKBOOK_BACKEND = None
+CACHE_DIR = None
+MIRROR_VERIFY_HASH = None
+BATCH_WORKERS = None
+BATCH_THROTTLE = None
+BATCH_ATTEMPTS = None
+TRACE_STEPS = None
+NETSUITE_ENGINE = None
+NETSUITE_REST_URL = None
+COOKIE_CACHE = None
+STEP_ATTEMPTS = None
+STEP_BACKOFF = None
+BATCH_BREAKER = None
 
 
 def get_consts_from_csv(app_path):
@@ -29,6 +43,19 @@ def get_consts_from_csv(app_path):
     global DROPDOWN_DIR
     global JOB_DIRS
     global DROPDOWN_PATHS
+    global WORKBOOK_BACKEND
+    global CACHE_DIR
+    global MIRROR_VERIFY_HASH
+    global BATCH_WORKERS
+    global BATCH_THROTTLE
+    global BATCH_ATTEMPTS
+    global TRACE_STEPS
+    global NETSUITE_ENGINE
+    global NETSUITE_REST_URL
+    global COOKIE_CACHE
+    global STEP_ATTEMPTS
+    global STEP_BACKOFF
+    global BATCH_BREAKER
 
     NETSUITE_URL = result['NETSUITE_URL']
     GITHUB_SRC = result['GITHUB_SRC']
@@ -39,6 +66,19 @@ def get_consts_from_csv(app_path):
     QUOTE_LOG_PATH = result['QUOTE_LOG_PATH']
     DROPDOWN_DIR = result['DROPDOWN_DIR']
     JOB_DIRS = [x.strip() for x in result['JOB_DIRS'].split(',')]
+    WORKBOOK_BACKEND = result.get('WORKBOOK_BACKEND', 'auto')
+    CACHE_DIR = result.get('CACHE_DIR') or str(Path.home() / 'AppData' / 'Local' / 'NetSuite Takeoff Integration')
+    MIRROR_VERIFY_HASH = result.get('MIRROR_VERIFY_HASH', '').strip().lower() == 'true'
+    BATCH_WORKERS = int(result.get('BATCH_WORKERS') or 1)
+    BATCH_THROTTLE = float(result.get('BATCH_THROTTLE') or 0)
+    BATCH_ATTEMPTS = int(result.get('BATCH_ATTEMPTS') or 2)
+    TRACE_STEPS = result.get('TRACE_STEPS', '').strip().lower() == 'true'
+    NETSUITE_ENGINE = result.get('NETSUITE_ENGINE', '').strip().lower() or 'browser'
+    NETSUITE_REST_URL = result.get('NETSUITE_REST_URL') or None
+    COOKIE_CACHE = result.get('COOKIE_CACHE', '').strip().lower() == 'true'
+    STEP_ATTEMPTS = int(result.get('STEP_ATTEMPTS') or 3)
+    STEP_BACKOFF = float(result.get('STEP_BACKOFF') or 0.5)
+    BATCH_BREAKER = int(result.get('BATCH_BREAKER') or 3)
     DROPDOWN_PATHS = {
         'addresses': f'{DROPDOWN_DIR}/NetSuite_Daily_SiteAddress_List.csv',
         'customers': f'{DROPDOWN_DIR}/NetSuite_Daily_Customer_List.csv',
@@ -6,15 +6,33 @@ import PIL.Image
 from PIL import ImageTk
 from tkinter import *
 from tkinter.ttk import *
+from queue import Queue, Empty
 from pathlib import Path
 from threading import Thread
 from interface import utils
-from utility import csv_handler
+from utility import dropdown_handler, mirror_handler
+from utility.search_index import SearchIndex
 from pywebgo.controller import WebController
+from middleware.batch import run_batch
+from middleware.warm import WarmController
+from middleware.cancel import CancelToken
+from middleware.controller import MAX_ACTION_DELAY
 from middleware.middleware import run_middleware
 
 ctypes.windll.shcore.SetProcessDpiAwareness(1)
 
+DROPDOWN_FIELDS = {
+    'Customer': 'customers',
+    'Proposal Sales Rep': 'reps',
+    'Department': 'departments',
+    'Class': 'classes',
+    'Item': 'items',
+    'Site Name': 'addresses',
+    'Project Template': 'templates',
+    'Project Type': 'types'
+}
+UI_POLL_INTERVAL = 50
+
 
 class App(Tk):
     """
@@ -31,6 +49,11 @@ class App(Tk):
         data_vars (dict): A dictionary to store the tkinter variables for various data fields.
         settings (dict): A dictionary to store the application settings.
         elements (list): A list to store the tkinter elements added to the application.
+        combos (dict): A dictionary to store the dropdown widgets by their field label.
+        dropdowns_loaded (bool): A boolean indicating whether the dropdown lists have been loaded.
+        warm_controller (WarmController): The browser kept logged in between runs when enabled in the settings.
+        messages (Queue): The UI calls posted by the worker threads, run by the Tk main loop.
+        token (CancelToken): The cancellation token of the current run, None before the first run.
         pad_x (int): The padding value for the x-axis.
         default_csv_path (Path): The default path for CSV files.
     """
@@ -38,6 +61,9 @@ class App(Tk):
     def __init__(self, app_path: Path):
         super().__init__()
         self.controller = None
+        self.warm_controller = WarmController()
+        self.messages = Queue()
+        self.token = None
         self.pb_status = None
         self.pb = None
         self.pb_window = None
@@ -47,6 +73,8 @@ class App(Tk):
         self.data_vars = {}
         self.settings = {}
         self.elements = []
+        self.combos = {}
+        self.dropdowns_loaded = False
         self.pad_x = 40
         self.default_csv_path = None
         self.settings_window = None
@@ -71,14 +99,20 @@ class App(Tk):
             'config': BooleanVar(),
             'log': BooleanVar(),
             'status': StringVar(),
-            'memo': StringVar()
+            'memo': StringVar(),
+            'keep-browser': BooleanVar(),
+            'fast-browser': BooleanVar()
         })
 
+        mirror_handler.refresh_async([consts.TAKEOFF_PATH, consts.CHECKLIST_PATH, consts.CONFIG_PATH,
+                                      *consts.DROPDOWN_PATHS.values()])
         self.__create_tabs(3, titles=tab_titles)
         self.__load_settings()
         self.__design_tabs()
         self.__add_cmd_buttons()
         self.__customize()
+        self.__load_dropdowns_async()
+        self.after(UI_POLL_INTERVAL, self.__poll_messages)
 
         self.mainloop()
 
@@ -88,6 +122,18 @@ class App(Tk):
         """
         self.destroy()
 
+    def destroy(self):
+        """
+        Close the browsers left open and destroy the application window.
+        """
+        self.warm_controller.close()
+        if self.controller:
+            try:
+                self.controller.quit()
+            except Exception:
+                pass
+        super().destroy()
+
     def __add_icon(self):
         """
         Add the application icon.
@@ -125,6 +171,7 @@ class App(Tk):
         ]
         edit_cmd_funcs = [
             ['Open Browser', self.open_chromedriver],
+            ['Run Batch...', self.run_batch_controller],
             ['Clear Inputs', self.clear_inputs]
         ]
         help_cmd_funcs = [
@@ -151,6 +198,11 @@ class App(Tk):
         Load the application settings from a CSV file.
         """
         utils.load(self.settings, Path(self.default_path, 'settings.csv'))
+        try:
+            delay = self.settings['delay'].get()
+        except TclError:
+            delay = 0.0
+        self.settings['delay'].set(min(delay, MAX_ACTION_DELAY))
         self.default_csv_path = Path(self.settings['csv-path'].get())
         if not self.default_csv_path.is_dir() or not self.settings['csv-path'].get():
             self.default_csv_path = self.default_path
@@ -183,9 +235,82 @@ class App(Tk):
         utils.create_grid(self.tabs[1], *self.tab_grid[1])
         utils.create_grid(self.tabs[2], *self.tab_grid[2])
 
+        dropdowns = {name: [] for name in DROPDOWN_FIELDS.values()}
         self.__add_elements_login()
-        self.__add_elements_proposal()
-        self.__add_elements_project()
+        self.__add_elements_proposal(dropdowns)
+        self.__add_elements_project(dropdowns)
+
+    def __load_dropdowns_async(self):
+        """
+        Load and index the dropdown lists on a worker thread and show a loading state until they arrive.
+        """
+        for label, combo in self.combos.items():
+            if label in DROPDOWN_FIELDS:
+                self.data_vars[label].set('Loading...')
+                combo.config(state=DISABLED)
+
+        results = Queue()
+
+        def load():
+            try:
+                dropdowns = dropdown_handler.load_dropdowns(consts.DROPDOWN_PATHS)
+                results.put({name: SearchIndex(values) for name, values in dropdowns.items()})
+            except Exception as ex:
+                results.put(ex)
+
+        Thread(target=load, daemon=True).start()
+        self.after(50, self.__poll_dropdowns, results)
+
+    def __poll_dropdowns(self, results: Queue):
+        """
+        Fill the dropdowns once the worker thread has loaded the lists.
+
+        :param results: queue receiving the indexed lists or the error raised while loading them
+        """
+        try:
+            dropdowns = results.get_nowait()
+        except Empty:
+            self.after(50, self.__poll_dropdowns, results)
+            return
+
+        for label, name in DROPDOWN_FIELDS.items():
+            combo = self.combos[label]
+            combo.config(state=NORMAL)
+            if not isinstance(dropdowns, Exception):
+                combo.set_index(dropdowns[name])
+            if self.data_vars[label].get() == 'Loading...':
+                self.data_vars[label].set('Select...')
+        self.dropdowns_loaded = True
+
+        if isinstance(dropdowns, FileNotFoundError):
+            self.show_startup_error_msg(str(dropdowns))
+        elif isinstance(dropdowns, Exception):
+            self.show_startup_error_msg("Unable to load the dropdown lists.")
+
+    def post(self, func, *args):
+        """
+        Queue a call to a UI method, run by the Tk main loop. Worker threads must update the UI through post,
+        as Tk widgets may only be used from the thread running the main loop.
+
+        :param func: method of the app, e.g. update_progress
+        :param args: arguments of the method
+        """
+        self.messages.put((func, args))
+
+    def __poll_messages(self):
+        """
+        Run the UI calls posted by the worker threads since the last poll.
+        """
+        while True:
+            try:
+                func, args = self.messages.get_nowait()
+            except Empty:
+                break
+            try:
+                func(*args)
+            except TclError:
+                pass
+        self.after(UI_POLL_INTERVAL, self.__poll_messages)
 
     def __add_elements_login(self):
         """
@@ -208,15 +333,17 @@ class App(Tk):
             ['entry', 'Answer 3:']
         ], 0, 6, 1)
 
-    def __add_elements_proposal(self):
+    def __add_elements_proposal(self, dropdowns: dict):
         """
         Add the elements for the proposal tab.
+
+        :param dropdowns: values of the dropdown lists
         """
-        departments = csv_handler.read_csv_column(Path(consts.DROPDOWN_PATHS['departments']), header=True)
-        classes = csv_handler.read_csv_column(Path(consts.DROPDOWN_PATHS['classes']), header=True)
-        reps = csv_handler.read_csv_column(Path(consts.DROPDOWN_PATHS['reps']), header=True)
-        customers = csv_handler.read_csv_column(Path(consts.DROPDOWN_PATHS['customers']), header=True)
-        items = csv_handler.read_csv_column(Path(consts.DROPDOWN_PATHS['items']), header=True)
+        departments = dropdowns['departments']
+        classes = dropdowns['classes']
+        reps = dropdowns['reps']
+        customers = dropdowns['customers']
+        items = dropdowns['items']
 
         status = ['Initial Review', 'Submitted', 'Closed Won', 'Closed Lost']
         utils.add_heading(self, 'Proposal Info', 1, 0)
@@ -232,13 +359,15 @@ class App(Tk):
             ['combo', 'Item:', items]
         ], 1, 1, 1)
 
-    def __add_elements_project(self):
+    def __add_elements_project(self, dropdowns: dict):
         """
         Add the elements for the project tab.
+
+        :param dropdowns: values of the dropdown lists
         """
-        templates = csv_handler.read_csv_column(Path(consts.DROPDOWN_PATHS['templates']), header=True)
-        types = csv_handler.read_csv_column(Path(consts.DROPDOWN_PATHS['types']), header=True)
-        addresses = csv_handler.read_csv_column(Path(consts.DROPDOWN_PATHS['addresses']), header=True)
+        templates = dropdowns['templates']
+        types = dropdowns['types']
+        addresses = dropdowns['addresses']
         utils.add_heading(self, 'Project Info', 2, 0)
         utils.add_fields(self, [
             ['combo', 'Site Name:', addresses],
@@ -289,6 +418,9 @@ class App(Tk):
         Handle and display errors for missing required input fields.
         :return: flag indicating error
         """
+        if not self.dropdowns_loaded:
+            utils.messagebox.showerror('Input Error', "The dropdown lists are still loading. Please try again.")
+            return True
         req_vars = dict(itertools.islice(self.data_vars.items(), 2))
         req_vars.update(dict(itertools.islice(self.data_vars.items(), 8, len(self.data_vars) - 2)))
         req_vars.pop('Project Scope')
@@ -322,18 +454,38 @@ class App(Tk):
 
     def stop_progress(self):
         """
-        Stop the progress bar and closes the status window.
+        Cancel the current run, freeing its browser and Excel, and close the status window.
+        """
+        if self.token:
+            self.token.cancel()
+        self.close_progress()
+
+    def close_progress(self):
+        """
+        Stop the progress bar and close the status window.
         """
+        if self.pb_window is None:
+            return
         self.pb.grid_forget()
         self.pb.destroy()
         self.pb_window.destroy()
         self.pb_window = None
 
-        try:
-            self.controller.close()
-        except Exception as ex:
-            pass
-        self.controller = None
+    def offer_resume(self):
+        """
+        Add a button to the status window resuming the failed run from its last completed step.
+        """
+        if self.pb_window is None:
+            return
+        resume_button = Button(self.pb_window, text="Resume", command=self.resume_controller)
+        resume_button.grid(row=4, column=2, sticky=E, padx=20, ipadx=5)
+
+    def resume_controller(self):
+        """
+        Close the status window of the failed run, keeping its browser, and run the same keys again.
+        """
+        self.close_progress()
+        self.run_controller()
 
     def update_progress(self, status: str, inc: float):
         """
@@ -342,9 +494,21 @@ class App(Tk):
         :param status: status message to display
         :param inc: amount by which to increment the progress
         """
+        if self.pb_window is None:
+            return
         self.pb_status.set(status + '...')
         self.pb['value'] += inc
 
+    def add_log(self, msg: str):
+        """
+        Add an error message to the log of the status window.
+
+        :param msg: message to display
+        """
+        if self.pb_window is None:
+            return
+        self.log.insert(END, msg)
+
     def save_login(self):
         """
         Save the login information to the default CSV file.
@@ -439,6 +603,21 @@ class App(Tk):
         """
         utils.show_error_msg("Error", "Unexpected error occurred. Please check the browser for more info.")
 
+    @staticmethod
+    def show_batch_msg(created: int, total: int, results_path: Path):
+        """
+        Display the summary of a batch run.
+
+        :param created: number of rows completed successfully
+        :param total: number of rows in the queue
+        :param results_path: path of the results file
+        """
+        msg = f"Created {created} of {total} proposal(s).\n\nResults saved to {results_path}"
+        if created == total:
+            utils.show_info_msg('Batch Complete', msg)
+        else:
+            utils.show_error_msg('Batch Complete', msg)
+
     @staticmethod
     def show_startup_error_msg(msg: str):
         """
@@ -467,7 +646,29 @@ class App(Tk):
         """
         if self.__error_handler():
             return
-        execution_thread = Thread(target=run_middleware, args=(self,))
+        self.token = CancelToken()
+        self.start_progress()
+        execution_thread = Thread(target=run_middleware, args=(self, self.get_data(), self.token))
+        execution_thread.daemon = True
+        execution_thread.start()
+
+    def run_batch_controller(self):
+        """
+        Run the proposals of a queue file in a separate thread, logging in once for all of them.
+        """
+        if not self.dropdowns_loaded:
+            utils.messagebox.showerror('Input Error', "The dropdown lists are still loading. Please try again.")
+            return
+        for key in itertools.islice(self.data_vars, 2):
+            if not self.data_vars[key].get():
+                utils.messagebox.showerror('Input Error', f"Enter value for '{key}'.")
+                return
+        path = utils.browse_queue_file()
+        if not path:
+            return
+        self.token = CancelToken()
+        self.start_progress()
+        execution_thread = Thread(target=run_batch, args=(self, path, self.get_data(), self.token))
         execution_thread.daemon = True
         execution_thread.start()
 
@@ -479,7 +680,7 @@ class App(Tk):
             settings_window = self.settings_window
             settings_window.focus()
         else:
-            settings_window = utils.open_new_window(self, 'Settings', 500, 545, 14, 2)
+            settings_window = utils.open_new_window(self, 'Settings', 500, 630, 17, 2)
 
         heading = Label(settings_window, text='Settings', font=("Tahoma", 12))
         heading.grid(row=0, column=0, columnspan=2, sticky=W, pady=20, padx=self.pad_x)
@@ -518,8 +719,17 @@ class App(Tk):
         en = Entry(settings_window, textvariable=self.settings['memo'])
         en.grid(row=12, column=1, sticky='ew', padx=(0, self.pad_x))
 
+        lb = Label(settings_window, text='Browser:')
+        lb.grid(row=14, column=0, sticky=NW, padx=self.pad_x)
+        cb = Checkbutton(settings_window, text='Keep logged in between runs', variable=self.settings['keep-browser'],
+                         onvalue=True, offvalue=False)
+        cb.grid(row=14, column=1, sticky=W)
+        cb = Checkbutton(settings_window, text='Fast mode (headless, no images or fonts)',
+                         variable=self.settings['fast-browser'], onvalue=True, offvalue=False)
+        cb.grid(row=15, column=1, sticky=W)
+
         save_btn = Button(settings_window, text="Save", command=lambda: self.save_settings(settings_window))
-        save_btn.grid(row=14, columnspan=2, sticky='ew', padx=self.pad_x * 4)
+        save_btn.grid(row=17, columnspan=2, sticky='ew', padx=self.pad_x * 4)
 
         self.settings_window = settings_window
 
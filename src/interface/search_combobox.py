@@ -0,0 +1,87 @@
+from tkinter import END, INSERT, SEL_FIRST
+from tkinter.ttk import Combobox
+from utility.search_index import SearchIndex
+
+
+class SearchCombobox(Combobox):
+    """
+    Combobox that completes the typed text from a SearchIndex.
+
+    Keystrokes are debounced so the index is searched once the user pauses typing. The popup list
+    holds at most `limit` ranked matches instead of the whole list, and the best prefix match is
+    completed inline.
+
+        Attributes:
+        search_index (SearchIndex): The index of the completion values.
+        limit (int): The maximum number of matches shown in the popup list.
+        delay (int): The time (in milliseconds) to wait after a keystroke before searching.
+        position (int): The length of the text typed by the user, the rest is the inline completion.
+        pending (str): The id of the scheduled search, None if no search is scheduled.
+    """
+
+    def __init__(self, master=None, completevalues: list = None, limit: int = 100, delay: int = 150, **kwargs):
+        Combobox.__init__(self, master, **kwargs)
+        self.limit = limit
+        self.delay = delay
+        self.position = 0
+        self.pending = None
+        self.set_index(SearchIndex(completevalues or []))
+        self.bind('<KeyRelease>', self.handle_keyrelease)
+
+    def set_completion_list(self, completion_list: list):
+        """
+        Index the given values and use them for completion.
+
+        :param completion_list: completion values
+        """
+        self.set_index(SearchIndex(completion_list))
+
+    def set_index(self, index: SearchIndex):
+        """
+        Use an index built beforehand, e.g. on a worker thread, for completion.
+
+        :param index: index of the completion values
+        """
+        self.search_index = index
+        self['values'] = index.values[:self.limit]
+
+    def handle_keyrelease(self, event):
+        """
+        Event handler for the keyrelease event on this widget.
+
+        :param event: Tkinter event
+        """
+        if event.keysym == 'BackSpace':
+            self.delete(self.index(INSERT), END)
+            self.position = self.index(END)
+        elif event.keysym == 'Right':
+            self.position = self.index(END)
+            return
+        elif event.keysym == 'Return':
+            self.icursor(END)
+            self.selection_clear()
+            return
+        elif len(event.keysym) != 1 and event.char == '':
+            return
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+        self.pending = self.after(self.delay, self.autocomplete,
+                                  event.keysym not in ('BackSpace', 'Delete'))
+
+    def autocomplete(self, complete: bool = True):
+        """
+        Search the index for the typed text, fill the popup list and complete the best prefix match.
+
+        :param complete: insert the remainder of the best prefix match after the typed text
+        """
+        self.pending = None
+        text = self.get()
+        typed = text[:self.index(SEL_FIRST)] if self.selection_present() else text
+        self.position = len(typed)
+        matches = self.search_index.search(typed, self.limit)
+        self['values'] = matches
+        if complete and typed and matches and matches[0].casefold().startswith(typed.casefold()):
+            self.delete(0, END)
+            self.insert(0, matches[0])
+            self.select_range(self.position, END)
+            self.icursor(self.position)
@@ -4,7 +4,7 @@ from tkinter import END, W, NW
 from tkinter import messagebox, filedialog, StringVar, BooleanVar, Toplevel, Menu, Tk, Event
 from tkinter.ttk import Label, Entry, Checkbutton
 from utility import csv_handler
-from ttkwidgets.autocomplete import AutocompleteCombobox
+from interface.search_combobox import SearchCombobox
 
 
 def adjust_window(app, title: str, width: int, height: int):
@@ -132,11 +132,12 @@ def add_dropdown(app, tab: int, row: int, col: int, label: str, options: list):
     """
     str_var = StringVar()
     str_var.set('Select...')
-    dropdown = AutocompleteCombobox(app.tabs[tab], textvariable=str_var, completevalues=options)
+    dropdown = SearchCombobox(app.tabs[tab], textvariable=str_var, completevalues=options)
     dropdown.grid(row=row, column=col, sticky='ew', padx=app.pad_x)
     dropdown.bind('<FocusIn>', clear_widget)
     dropdown.bind('<FocusOut>', reset_widget)
     app.data_vars.update({label: str_var})
+    app.combos.update({label: dropdown})
     app.elements.append(dropdown)
 
 
@@ -266,6 +267,19 @@ def show_error_msg(title: str, msg: str):
     messagebox.showerror(title, msg)
 
 
+def browse_queue_file() -> Path:
+    """
+    Open the browse file window to select a batch queue file.
+
+    :return: path of the selected file, None if cancelled
+    """
+    file_types = [('Queue files', '*.csv *.xlsx *.xlsm'), ('CSV UTF-8 (Comma delimited)', '*.csv'),
+                  ('Excel Workbook', '*.xlsx *.xlsm')]
+    browse_path = filedialog.askopenfilename(filetypes=file_types)
+    if browse_path:
+        return Path(browse_path)
+
+
 def browse_directory(str_var: StringVar):
     """
     Open the browse directory window.
@@ -0,0 +1,194 @@
+import consts
+from pathlib import Path
+from utility import csv_handler, elem_handler
+from middleware.pool import WorkerPool
+from middleware.retry import CircuitBreaker
+from middleware.cancel import CancelToken
+import middleware.utils as utils
+from middleware.session import run_elements
+from project.excel_session import ExcelSession
+from middleware.middleware import get_proj_data, get_proj_options, execute_dirs_files_maker, update_quote_log
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+"""
+Batch mode: create a proposal and project for every row of a queue file, logging in once per browser.
+
+The first row of the queue holds the field labels of the app, e.g. 'Customer' or 'Project Path'. Empty
+cells and missing columns take the values entered in the app. The rows are spread over BATCH_WORKERS
+browsers and the results are written in row order to '<queue name>_results.csv' next to the queue file.
+"""
+
+BOOL_FIELDS = ['Configurator', 'Quote Log']
+OPTIONAL_FIELDS = ['Project Scope', 'Site Name']
+RESULT_HEADER = ['Row', 'Customer', 'Project Scope', 'Project ID', 'Project URL', 'Status', 'Error']
+
+
+def read_queue(path: Path | str) -> list:
+    """
+    Read the rows of a CSV or XLSX queue file.
+
+    :param path: path of the queue file
+    :return: field label, value dicts for every non-empty row
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        rows = csv_handler.read_csv(path)
+    elif path.suffix.lower() in ['.xlsx', '.xlsm']:
+        if openpyxl is None:
+            raise Exception("Error: openpyxl is required to read Excel queue files.")
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        rows = [['' if value is None else value for value in row]
+                for row in wb.worksheets[0].iter_rows(values_only=True)]
+        wb.close()
+    else:
+        raise Exception(f"Error: file type {path.suffix} is not supported.")
+
+    if not rows:
+        raise Exception(f"Error: the queue file {path.name} is empty.")
+    header = [str(label).strip().rstrip(':') for label in rows[0]]
+    return [dict(zip(header, [str(value).strip() for value in row]))
+            for row in rows[1:] if any(str(value).strip() for value in row)]
+
+
+def check_queue_fields(rows: list, defaults: dict):
+    """
+    Raise an error if the queue has columns that do not match any field of the app.
+
+    :param rows: field label, value dicts read from the queue
+    :param defaults: values entered in the app
+    """
+    unknown = {label for row in rows for label in row if label and label not in defaults}
+    if unknown:
+        raise Exception(f"Error: unknown column(s) in the queue file: {', '.join(sorted(unknown))}.")
+
+
+def get_row_data(defaults: dict, row: dict) -> dict:
+    """
+    Combine a queue row with the values entered in the app.
+
+    :param defaults: values entered in the app
+    :param row: field label, value pairs of the queue row
+    :return: keys for the row
+    """
+    data = dict(defaults)
+    for label, value in row.items():
+        if label not in data or value == '':
+            continue
+        if label in BOOL_FIELDS:
+            data[label] = value.lower() in ['true', 'yes', 'y', '1', 'x']
+        else:
+            data[label] = value
+    return data
+
+
+def get_missing_fields(data: dict) -> list:
+    """
+    Return the required fields left blank.
+
+    :param data: keys for the row
+    :return: labels of the missing fields
+    """
+    return [label for label, value in data.items()
+            if isinstance(value, str) and not value and label not in OPTIONAL_FIELDS]
+
+
+def process_row(controller, data: dict, logged_in: bool) -> tuple:
+    """
+    Create the proposal, project and files of a queue row.
+
+    :param controller: instance of WebController
+    :param data: keys for the row
+    :param logged_in: true if the session is already logged in
+    :return: data for the project and the error raised while creating the files, if any
+    """
+    missing = get_missing_fields(data)
+    if missing:
+        raise Exception(f"Error: enter value for {', '.join(missing)}.")
+    proj_options = get_proj_options(data)
+    utils.update_keys_for_elements(data)
+    data_scraped = run_elements(controller, data, logged_in)
+    proj_data = get_proj_data(data_scraped, data, proj_options)
+    try:
+        execute_dirs_files_maker(proj_data)
+    except Exception as ex:
+        return proj_data, str(ex)
+    return proj_data, None
+
+
+def get_results_path(path: Path | str) -> Path:
+    """
+    Return the path of the results file of a queue file.
+
+    :param path: path of the queue file
+    :return: path of the results CSV
+    """
+    path = Path(path)
+    return path.with_name(f'{path.stem}_results.csv')
+
+
+def run_batch(app, path: Path | str, defaults: dict, token: CancelToken) -> None:
+    """
+    Run the middleware for every row of the queue file.
+
+    :param app: current app object interacting with the user
+    :param path: path of the queue file
+    :param defaults: values entered in the app
+    :param token: cancellation token of the batch, checked before every row and step
+    """
+    elem_handler.set_user_pass_questions(defaults)
+
+    try:
+        rows = read_queue(path)
+        check_queue_fields(rows, defaults)
+    except Exception as ex:
+        app.post(app.update_progress, 'Error occurred', 0)
+        app.post(app.add_log, str(ex))
+        return
+
+    results_path = get_results_path(path)
+    rows = [get_row_data(defaults, row) for row in rows]
+    results = []
+    pool = WorkerPool(process_row, app.settings['delay'].get(), consts.BATCH_WORKERS, consts.BATCH_THROTTLE,
+                      consts.BATCH_ATTEMPTS, app.settings['fast-browser'].get(), CircuitBreaker(consts.BATCH_BREAKER),
+                      token)
+    app.controller = pool
+    token.register(pool.close)
+    app.post(app.update_progress, 'Executing controller', 5)
+    try:
+        with ExcelSession() as session:
+            token.register(session.terminate)
+            for index, (proj_data, error) in pool.run(rows):
+                token.check()
+                data = rows[index]
+                result = [index + 1, data['Customer'], data['Project Scope'], '', '', 'Failed', error or '']
+                if proj_data:
+                    result[3], result[4] = proj_data['id'], proj_data['url']
+                    if not error:
+                        try:
+                            update_quote_log(proj_data, session)
+                            result[5] = 'Created'
+                        except Exception as ex:
+                            result[6] = str(ex)
+                if result[6]:
+                    app.post(app.add_log, f"Row {index + 1}: {result[6]}\n")
+                results.append(result)
+                csv_handler.write_csv(results_path, [RESULT_HEADER] + results)
+                app.post(app.update_progress, f'Finished proposal {index + 1} of {len(rows)}', 90 / len(rows))
+
+    except Exception as ex:
+        if not token.cancelled:
+            app.post(app.update_progress, 'Error occurred', 0)
+            app.post(app.add_log, str(ex))
+        pool.close()
+        return
+
+    pool.close()
+    app.post(app.update_progress, 'Finishing', 5)
+    created = sum(result[5] == 'Created' for result in results)
+    if created == len(results):
+        app.post(app.close_progress)
+    app.post(app.show_batch_msg, created, len(results), results_path)
@@ -0,0 +1,87 @@
+from threading import Thread, Event, Lock
+
+"""
+Cancellation of the runs started from the app.
+
+The End button cancels the token of the run. Every phase of the run (browser steps, file generation,
+quote log) checks the token before doing more work and raises RunCancelled, so the worker thread ends
+instead of running to completion in the background. The resources a run registers, e.g. its browser, the
+Excel process of the quote log or the file pipeline, are released as soon as the token is cancelled rather
+than when the worker notices.
+"""
+
+
+class RunCancelled(Exception):
+    """
+    Raised by a phase of a run once the user has cancelled it.
+    """
+
+    def __init__(self):
+        super().__init__("Error: the run was cancelled.")
+
+
+class CancelToken:
+    """
+    Shared by the app and the worker thread of a run to stop the run.
+
+        Attributes:
+        event (Event): Set once the run is cancelled.
+        releases (list): The functions releasing the resources of the run, called on cancel.
+        lock (Lock): Held while the releases are changed.
+    """
+
+    def __init__(self):
+        self.event = Event()
+        self.releases = []
+        self.lock = Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        True once the run was cancelled.
+        """
+        return self.event.is_set()
+
+    def check(self):
+        """
+        Raise RunCancelled if the run was cancelled.
+        """
+        if self.event.is_set():
+            raise RunCancelled()
+
+    def register(self, release):
+        """
+        Add a function releasing a resource of the run, calling it at once if the run is already cancelled.
+
+        :param release: function without arguments, e.g. quitting a browser
+        """
+        with self.lock:
+            if not self.event.is_set():
+                self.releases.append(release)
+                return
+        release()
+
+    def cancel(self):
+        """
+        Cancel the run and release its resources on a background thread, so the caller is not blocked
+        while the browser or Excel quits.
+        """
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.event.set()
+            releases, self.releases = self.releases, []
+        Thread(target=self.release, args=(releases,), daemon=True).start()
+
+    @staticmethod
+    def release(releases: list):
+        """
+        Call the release functions, in reverse order of registration.
+
+        :param releases: functions releasing the resources of the run
+        """
+        for release in reversed(releases):
+            try:
+                release()
+            except Exception:
+                pass
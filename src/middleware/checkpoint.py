@@ -0,0 +1,137 @@
+import os
+import json
+import consts
+import hashlib
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from selenium.common.exceptions import WebDriverException
+
+"""
+Checkpoint of the element run, saved after every completed step.
+
+A failed run can then be resumed from its last completed step instead of starting over from the login:
+in the same browser while it is still open, or in a new browser once the proposal has been saved, as the
+saved record can be reloaded from its URL. Checkpoints are tied to the keys entered in the app, so a run
+with different keys always starts from the beginning.
+"""
+
+
+def get_run_key(data: dict) -> str:
+    """
+    Return the key identifying the run of the given keys.
+
+    :param data: keys entered by the user in the app interface, without the login fields
+    :return: hex digest of the keys
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def is_record_url(url: str) -> bool:
+    """
+    Check if a URL shows a saved record, i.e. its query has an id parameter.
+
+    :param url: URL of a NetSuite page
+    :return: true if the query has a non-empty id
+    """
+    return bool(parse_qs(urlsplit(url).query).get('id'))
+
+
+def get_checkpoint_path() -> Path:
+    """
+    Return the path of the checkpoint file.
+
+    :return: path of the checkpoint file in the cache directory
+    """
+    return Path(consts.CACHE_DIR, 'checkpoint.json')
+
+
+class Checkpoint:
+    """
+    The progress of an element run.
+
+        Attributes:
+        key (str): The key of the run, see get_run_key.
+        remaining (int): The number of steps from the next step to the end of the plan, None before the first step.
+        data (list): The data scraped by the controller up to the last completed step.
+        window (int): The window index of the last completed step.
+        url (str): The URL of that window after the step, None if the step closed the window.
+        restorable (bool): A boolean indicating whether a new browser can continue from the URL.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.remaining = None
+        self.data = []
+        self.window = 0
+        self.url = None
+        self.restorable = False
+
+    @property
+    def started(self) -> bool:
+        """
+        True if at least one step was completed.
+        """
+        return self.remaining is not None
+
+    def record(self, controller, step, next_index: int):
+        """
+        Save the progress after a completed step.
+
+        :param controller: instance of AdaptiveController
+        :param step: the completed step
+        :param next_index: index of the step the run continues at, after a branch if one was taken
+        """
+        self.remaining = len(controller.plan) - next_index
+        self.data = list(controller.data_handler.database)
+        self.window = step.window
+        try:
+            self.url = controller.current_url
+            single_window = len(controller.window_handles) == 1
+        except WebDriverException:
+            self.url, single_window = None, False
+        self.restorable = bool(single_window and self.url and is_record_url(self.url))
+        self.save()
+
+    def save(self):
+        """
+        Write the checkpoint to disk atomically.
+        """
+        path = get_checkpoint_path()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(vars(self), file)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def clear(self):
+        """
+        Delete the checkpoint once the run has completed.
+        """
+        if not self.started:
+            return
+        self.remaining = None
+        try:
+            get_checkpoint_path().unlink()
+        except OSError:
+            pass
+
+
+def load_checkpoint(key: str) -> Checkpoint:
+    """
+    Load the saved checkpoint of the run, or a new one if the saved checkpoint belongs to other keys.
+
+    :param key: key of the run, see get_run_key
+    :return: instance of Checkpoint
+    """
+    checkpoint = Checkpoint(key)
+    try:
+        with open(get_checkpoint_path(), encoding='utf-8') as file:
+            values = json.load(file)
+    except (OSError, ValueError):
+        return checkpoint
+    if values.get('key') == key:
+        vars(checkpoint).update(values)
+    return checkpoint
@@ -0,0 +1,535 @@
+import time
+from contextlib import nullcontext
+from pywebgo import utils
+from pywebgo.controller import WebController
+from middleware.trace import StepTracer
+from middleware.checkpoint import Checkpoint
+from middleware.retry import RetryPolicy
+from middleware.plan import Step, StepPlan, compile_plan
+from selenium.webdriver.support.select import Select
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.common import NoSuchElementException, TimeoutException, WebDriverException
+
+"""
+WebController running compiled step plans, waiting for the readiness condition declared by each step instead of
+a fixed delay.
+
+Conditions ('ready' key of an element):
+    'clickable':    the element is visible and enabled
+    'settled':      the value of the element stopped changing, e.g. after the browser autofilled it
+    'idle':         the page finished loading and has no request in flight
+    'popup':        the popup rows render, or the page stays idle without them, whichever comes first
+Steps without a condition only wait for their presence, as in WebController.
+
+Popup steps race the two outcomes of sending a value to a lookup field (see wait_for_popup): the popup renders
+and its row showing exactly the value is chosen, or the field accepted the value inline and no popup shows up.
+"""
+
+POLL_FREQUENCY = 0.05
+IDLE_QUIET_TIME = 0.15
+SETTLE_TIME = 0.25
+POPUP_RENDER_TIMEOUT = 0.3
+INLINE_QUIET_TIME = IDLE_QUIET_TIME + POPUP_RENDER_TIMEOUT
+# Longest execution delay (in seconds) slept before an action, as every step already waits for its readiness
+MAX_ACTION_DELAY = 0.5
+
+REQUEST_COUNTER_SCRIPT = """
+if (window.__ntiPending === undefined) {
+    window.__ntiPending = 0;
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__ntiPending++;
+        this.addEventListener('loadend', function () { window.__ntiPending--; });
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            window.__ntiPending++;
+            return fetch.apply(this, arguments).finally(function () { window.__ntiPending--; });
+        };
+    }
+}
+"""
+IDLE_CHECK_SCRIPT = REQUEST_COUNTER_SCRIPT + """
+return document.readyState === 'complete' && window.__ntiPending === 0;
+"""
+# Returns the popup row showing the value, 'missing' if no row does, else 'idle' or 'busy'
+POPUP_CHECK_SCRIPT = REQUEST_COUNTER_SCRIPT + """
+var rows = document.querySelectorAll(arguments[0]);
+if (rows.length) {
+    var normalize = function (text) { return text.replace(/\\s+/g, ' ').trim(); };
+    var value = normalize(arguments[1]);
+    var folded = null;
+    for (var i = 0; i < rows.length; i++) {
+        var text = normalize(rows[i].textContent);
+        if (text === value) {
+            return rows[i];
+        }
+        if (folded === null && text.toLowerCase() === value.toLowerCase()) {
+            folded = rows[i];
+        }
+    }
+    return folded || 'missing';
+}
+return document.readyState === 'complete' && window.__ntiPending === 0 ? 'idle' : 'busy';
+"""
+
+# Chrome arguments of the fast profile, used in place of start-maximized
+FAST_OPTIONS = [
+    '--headless=new',
+    '--window-size=1920,1080',
+    '--blink-settings=imagesEnabled=false',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-background-networking'
+]
+# Requests blocked in every window by the fast profile: images, fonts and the known third-party analytics
+# hosts. Network.setBlockedURLs only matches patterns, so third-party hosts missing from this list still load
+BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.ico', '*.bmp',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googleadservices.com*',
+    '*facebook.net*', '*hotjar.com*', '*newrelic.com*', '*nr-data.net*', '*pendo.io*', '*walkme.com*',
+    '*fonts.googleapis.com*', '*fonts.gstatic.com*'
+]
+
+RETRIEVE_OPTIONS = {
+    'text': lambda web_element: web_element.text,
+    'tag': lambda web_element: web_element.tag_name,
+    'aria-role': lambda web_element: web_element.aria_role,
+    'id': lambda web_element: web_element.id,
+    'location': lambda web_element: web_element.location,
+    'accessible-name': lambda web_element: web_element.accessible_name
+}
+
+
+class AdaptiveController(WebController):
+    """
+    Runs step plans like WebController runs elements, waiting for each step's readiness condition.
+
+        Attributes:
+        tracer (StepTracer): The tracer timing each step, None if tracing is disabled.
+        attempts (int): The number of locate attempts of the current get_element call.
+        checkpoint (Checkpoint): The checkpoint saved after every step, None to run without checkpoints.
+        plan (StepPlan): The plan of the current run.
+        bindings (dict): The keys sent by the steps of the current run, by label.
+        current_index (int): The index of the step being executed.
+        retry_policy (RetryPolicy): The policy retrying the steps that fail with transient errors.
+        phase (str): The part of the current step being executed: 'locate', 'action' or 'done'.
+        step_attempts (dict): The step index, {'attempts', 'backoff', 'error'} pairs of the retried steps.
+        token (CancelToken): The token of the current run, checked before every step, None if it cannot be cancelled.
+        blocked_urls (list): The URL patterns blocked in every window, None to load every resource.
+        prepared_windows (set): The handles of the windows the CDP settings were applied to.
+        window_index (int): The window index of the previous window segment.
+    """
+
+    def __init__(self, urls: list, timeout: float, tracer: StepTracer = None, blocked_urls: list = None,
+                 retry_policy: RetryPolicy = None, **kwargs):
+        super().__init__(urls, timeout, **kwargs)
+        self.tracer = tracer
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.phase = 'locate'
+        self.step_attempts = {}
+        self.token = None
+        self.attempts = 0
+        self.checkpoint = None
+        self.plan = None
+        self.bindings = {}
+        self.current_index = 0
+        self.blocked_urls = blocked_urls
+        self.prepared_windows = set()
+        self.window_index = 0
+        self.prepare_window()
+
+    def prepare_window(self) -> None:
+        """
+        Apply the CDP settings to the current window once, as every window is a separate CDP target.
+        """
+        try:
+            handle = self.current_window_handle
+            if handle in self.prepared_windows:
+                return
+            self.prepared_windows.add(handle)
+            self.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': REQUEST_COUNTER_SCRIPT})
+            if self.blocked_urls:
+                self.execute_cdp_cmd('Network.enable', {})
+                self.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked_urls})
+        except WebDriverException:
+            pass
+
+    def switch_window(self, step: Step) -> None:
+        """
+        Switch to the window of the step once it is open, preparing new windows.
+
+        :param step: step starting a window segment
+        """
+        handles = WebDriverWait(self, self.timeout, POLL_FREQUENCY).until(
+            lambda driver: len(driver.window_handles) > step.window and driver.window_handles)
+        self.switch_to.window(handles[step.window])
+        if step.window != self.window_index:
+            self.window_index = step.window
+            self.prepare_window()
+
+    def span(self, kind: str):
+        """
+        Return a context manager timing a part of the current step, a no-op when tracing is disabled.
+
+        :param kind: one of trace.SPAN_KINDS
+        """
+        return self.tracer.span(kind) if self.tracer else nullcontext()
+
+    def step(self, index: int, name: str, window: int):
+        """
+        Return a context manager recording a step, a no-op when tracing is disabled.
+
+        :param index: index of the step
+        :param name: readable name of the step
+        :param window: window index of the step
+        """
+        return self.tracer.step(index, name, window) if self.tracer else nullcontext()
+
+    def run_plan(self, plan: StepPlan, bindings: dict, start: int = 0) -> None:
+        """
+        Load the first url and run the plan from the given step.
+
+        :param plan: compiled steps to run
+        :param bindings: keys sent by the steps, by label; copied so the run can bind more
+        :param start: index of the first step to execute
+        """
+        self.plan = plan
+        self.bindings = dict(bindings)
+        self.step_attempts = {}
+        self.execute_operations(start)
+
+    def run_controller(self, elements: list, bindings: dict = None) -> None:
+        """
+        Compile the elements and run them, see run_plan.
+
+        :param elements: element dicts, with the labels of the bindings as 'keys'
+        :param bindings: keys sent by the elements, by label
+        """
+        self.run_plan(compile_plan(elements), bindings or {})
+
+    def execute_operations(self, start: int = 0, load: bool = True) -> None:
+        """
+        Execute the steps of the plan, tracing every step and following the branches taken.
+
+        :param start: index of the first step to execute
+        :param load: load the first url before the first step
+        """
+        steps = self.plan.steps
+        if self.tracer:
+            self.tracer.start()
+        try:
+            if load:
+                with self.step(-1, 'load-page', 0), self.span('navigate'):
+                    self.load_page(self.urls[0])
+            index, switch = start, True
+            while index < len(steps):
+                step = steps[index]
+                if self.token:
+                    self.token.check()
+                with self.step(index, step.name, step.window):
+                    next_index = self.run_step(step, switch or step.switch)
+                if self.checkpoint:
+                    self.checkpoint.record(self, step, next_index)
+                switch = next_index != index + 1
+                index = next_index
+        finally:
+            if self.tracer:
+                self.tracer.finish()
+
+    def resume(self, checkpoint: Checkpoint) -> None:
+        """
+        Continue the current plan after the last step completed in this browser.
+
+        :param checkpoint: checkpoint of the failed run
+        """
+        self.checkpoint = checkpoint
+        self.data_handler.database = list(checkpoint.data)
+        self.execute_operations(len(self.plan) - checkpoint.remaining, load=False)
+
+    def restore(self, plan: StepPlan, bindings: dict, checkpoint: Checkpoint) -> None:
+        """
+        Continue the given plan from a restorable checkpoint in a logged in browser.
+
+        :param plan: compiled steps of the run
+        :param bindings: keys sent by the steps, by label
+        :param checkpoint: checkpoint of the failed run
+        """
+        self.plan = plan
+        self.bindings = dict(bindings)
+        self.load_page(checkpoint.url)
+        self.resume(checkpoint)
+
+    def run_step(self, step: Step, switch: bool) -> int:
+        """
+        Execute a step, retrying it in place after a transient error as the retry policy allows.
+
+        Custom functions run in the locate phase, so they are retried on any transient error and must be safe to
+        repeat, as the login steps are by skipping the fields already filled.
+
+        :param step: step to execute
+        :param switch: switch to the window of the step first
+        :return: index of the next step to execute
+        """
+        attempt = 1
+        data_size = len(self.data_handler.database)
+        while True:
+            self.phase = 'locate'
+            try:
+                if switch:
+                    with self.span('switch'):
+                        self.switch_window(step)
+                return self.execute_step(step)
+            except Exception as ex:
+                if self.phase == 'done' or not self.retry_policy.should_retry(ex, attempt, self.phase == 'action'):
+                    raise
+                delay = self.retry_policy.get_delay(attempt)
+                with self.span('backoff'):
+                    time.sleep(delay)
+                if self.token:
+                    self.token.check()
+                del self.data_handler.database[data_size:]
+                attempt += 1
+                record = self.step_attempts.setdefault(step.index, {'attempts': 1, 'backoff': 0.0, 'error': ''})
+                record.update({'attempts': attempt, 'backoff': record['backoff'] + delay, 'error': type(ex).__name__})
+                if self.tracer:
+                    self.tracer.add_attempt()
+
+    def execute_step(self, step: Step) -> int:
+        """
+        Execute the operations of a single step, as WebController.execute_operations does for an element.
+
+        :param step: step to execute
+        :return: index of the next step to execute
+        """
+        self.current_index = step.index
+        # Call the custom function if it exists, jumping if it takes the branch
+        if step.custom:
+            with self.span('action'):
+                taken = step.custom(self, step)
+            return step.branch if taken and step.branch is not None else step.index + 1
+        web_element = self.get_element(step, self.retry_attempts, self.timeout)
+        self.elem_handler.store_web_element(web_element)
+        with self.span('retrieve'):
+            self.retrieve_data(web_element, step)
+        self.phase = 'action'
+        with self.span('action'):
+            self.execute_actions(web_element, step)
+        self.phase = 'done'
+        if step.page is not None:
+            with self.span('navigate'):
+                self.load_page(self.urls[step.page])
+        # Handle alert if appears after any action
+        with self.span('action'):
+            self.handle_alert(step, web_element)
+        return step.index + 1
+
+    def get_keys(self, step: Step) -> str:
+        """
+        Return the keys sent by the step, bound at run time.
+
+        :param step: step sending keys
+        :return: bound keys followed by the terminator of the step
+        """
+        return f'{self.bindings[step.key]}{step.term}'
+
+    def execute_actions(self, web_element: WebElement, step: Step) -> None:
+        """
+        Execute the actions of the step, in the order WebController runs them.
+
+        :param web_element: selenium WebElement object of the step
+        :param step: step to execute
+        """
+        for action in step.actions:
+            if step.wait:
+                time.sleep(step.wait)
+            else:
+                self.wait_for_all_actions()
+            if callable(action):
+                action(self, step)
+            elif action == 'send-keys':
+                web_element.send_keys(self.get_keys(step))
+            elif action == 'select':
+                Select(web_element).select_by_visible_text(self.get_keys(step))
+            else:
+                self.perform_action_chains(action, web_element)
+
+    def retrieve_data(self, web_element: WebElement, step: Step) -> None:
+        """
+        Retrieve the requested data of the step, reading only the requested property.
+
+        :param web_element: element object
+        :param step: step to retrieve data for
+        """
+        retrieve = step.retrieve
+        if not retrieve:
+            return
+        if callable(retrieve):
+            retrieve(self, step)
+            return
+        if retrieve.startswith('attr'):
+            element_data = self.get_element_attribute({'retrieve': retrieve}, web_element)
+        else:
+            read = utils.match_label(retrieve, RETRIEVE_OPTIONS)
+            element_data = read(web_element) if read else None
+        self.data_handler.add_data(step.index, retrieve, element_data)
+
+    def get_element(self, step: Step, retry: int, timeout: float) -> WebElement:
+        """
+        Get the WebElement of the step once its readiness condition is met.
+
+        :param step: step with the compiled locator
+        :param retry: the number of retry attempts to get an element
+        :param timeout: time before throwing exception if the element is not found
+        :return: a WebElement corresponding to the step
+        """
+        ready = step.ready
+        if ready == 'idle':
+            with self.span('wait'):
+                self.wait_until_idle(timeout)
+        self.attempts = 0
+        with self.span('locate'):
+            web_element = self.locate(step, retry, timeout)
+        try:
+            with self.span('wait'):
+                if ready == 'clickable':
+                    WebDriverWait(self, timeout, POLL_FREQUENCY).until(
+                        expected_conditions.element_to_be_clickable(web_element))
+                elif ready == 'settled':
+                    self.wait_until_settled(web_element, timeout)
+        except TimeoutException:
+            raise NoSuchElementException(f"Element not {ready} after {timeout} seconds.")
+        return web_element
+
+    def locate(self, step: Step, retry: int, timeout: float) -> WebElement:
+        """
+        Find the element of the step with its compiled locator, as WebController.get_element does.
+
+        :param step: step with the compiled locator
+        :param retry: the number of retry attempts to get an element
+        :param timeout: time before throwing exception if the element is not found
+        :return: a WebElement corresponding to the step
+        """
+        if step.loc == 'active':
+            return self.get_active_element(timeout)
+        for _ in range(retry + 1):
+            try:
+                web_element = self.wait_for_element_load(step, timeout)
+                if step.nth is not None:
+                    return self.find_elements(step.strategy, step.value)[step.nth]
+                return web_element
+            except (NoSuchElementException, TimeoutException):
+                continue
+        raise NoSuchElementException(f"Element not found after {retry} attempts.")
+
+    def wait_for_element_load(self, step: Step, timeout: float) -> WebElement:
+        """
+        Wait for the element of the step to load, counting the attempts beyond the first as retries.
+
+        :param step: step with the compiled locator
+        :param timeout: time before throwing exception if the element is not found
+        :return: the first element matching the locator
+        """
+        self.attempts += 1
+        if self.attempts > 1 and self.tracer:
+            self.tracer.add_retry()
+        return WebDriverWait(self, timeout, POLL_FREQUENCY).until(
+            expected_conditions.presence_of_element_located((step.strategy, step.value)))
+
+    def wait_for_all_actions(self) -> None:
+        """
+        Sleep the execution delay, capped at MAX_ACTION_DELAY, traced as wait time. Delays set higher to be safe
+        before the steps waited for their readiness would otherwise add minutes to every run.
+        """
+        if self.wait:
+            with self.span('wait'):
+                time.sleep(min(self.wait, MAX_ACTION_DELAY))
+
+    def wait_until_idle(self, timeout: float) -> bool:
+        """
+        Wait until the page is loaded and no request has been in flight for IDLE_QUIET_TIME.
+
+        :param timeout: maximum time (in seconds) to wait
+        :return: true if the page became idle before the timeout
+        """
+        quiet_since = []
+
+        def is_idle(driver) -> bool:
+            try:
+                idle = driver.execute_script(IDLE_CHECK_SCRIPT)
+            except WebDriverException:
+                idle = False
+            if not idle:
+                quiet_since.clear()
+                return False
+            if not quiet_since:
+                quiet_since.append(time.monotonic())
+            return time.monotonic() - quiet_since[0] >= IDLE_QUIET_TIME
+
+        try:
+            WebDriverWait(self, timeout, POLL_FREQUENCY).until(is_idle)
+            return True
+        except TimeoutException:
+            return False
+
+    def wait_for_popup(self, step: Step, value: str) -> WebElement | None:
+        """
+        Race the popup of a lookup field against the field accepting the value inline.
+
+        The popup wins as soon as its rows render; the inline outcome wins once the page has been idle without
+        a popup for INLINE_QUIET_TIME.
+
+        :param step: popup step, with the css locator of the popup rows
+        :param value: value sent to the field
+        :return: the row showing the value, None if the field accepted the value inline
+        :raises TimeoutException: if the page stayed busy, so the field may not have resolved the value, which is
+            transient and retried by the retry policy
+        """
+        idle_since = []
+
+        def get_outcome(driver):
+            try:
+                outcome = driver.execute_script(POPUP_CHECK_SCRIPT, step.value, value)
+            except WebDriverException:
+                outcome = 'busy'
+            if isinstance(outcome, WebElement) or outcome == 'missing':
+                return outcome
+            if outcome != 'idle':
+                idle_since.clear()
+                return False
+            if not idle_since:
+                idle_since.append(time.monotonic())
+            return time.monotonic() - idle_since[0] >= INLINE_QUIET_TIME and 'inline'
+
+        try:
+            with self.span('wait'):
+                outcome = WebDriverWait(self, self.timeout, POLL_FREQUENCY).until(get_outcome)
+        except TimeoutException:
+            raise TimeoutException(f"Error: the popup for '{value}' did not settle within {self.timeout} seconds.")
+        if outcome == 'missing':
+            raise Exception(f"Error: no row of the popup matches '{value}'.")
+        return outcome if isinstance(outcome, WebElement) else None
+
+    def wait_until_settled(self, web_element: WebElement, timeout: float) -> None:
+        """
+        Wait until the value of the element has not changed for SETTLE_TIME.
+
+        :param web_element: element to watch
+        :param timeout: maximum time (in seconds) to wait
+        """
+        last_value = []
+
+        def is_settled(_) -> bool:
+            value = web_element.get_attribute('value')
+            if not last_value or last_value[0] != value:
+                last_value[:] = [value, time.monotonic()]
+                return False
+            return time.monotonic() - last_value[1] >= SETTLE_TIME
+
+        WebDriverWait(self, timeout, POLL_FREQUENCY).until(is_settled)
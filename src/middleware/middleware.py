@@ -1,33 +1,90 @@
 import consts
-import tkinter
 import webbrowser
+from functools import partial
 from pathlib import Path
 import middleware.utils as utils
+import middleware.rest as rest
+from middleware.plan import get_plan
+from middleware.pipeline import FilePipeline
 from pywebgo.controller import WebController
+from middleware.trace import get_tracer
+from middleware.retry import get_retry_policy
+from middleware.controller import AdaptiveController, FAST_OPTIONS, BLOCKED_URLS
+from project.excel_session import ExcelSession
+from middleware.cancel import CancelToken
+from middleware.session import run_elements, is_alive, login, quit_browser
+from middleware.checkpoint import Checkpoint, get_run_key, load_checkpoint
+from utility import cookie_cache
 from utility.elem_handler import set_user_pass_questions
 
 
-def get_controller(url: list, wait: float) -> WebController:
+def get_controller(url: list, wait: float, profile: Path = None, extra_options: list = None,
+                   fast: bool = False) -> WebController:
     """
     Execute WebController processes.
 
     :param url: URL of the landing page
     :param wait: delay (in seconds) before executing each action
+    :param profile: Chrome user data directory, defaults to CHROME_USER_PROFILE
+    :param extra_options: Chrome arguments added to the default ones
+    :param fast: run headless without background throttling and block images, fonts and analytics
     :return: instance of WebController
     """
-    chrome_profile_path = str(Path.home() / Path(consts.CHROME_USER_PROFILE))
+    chrome_profile_path = str(profile or Path.home() / Path(consts.CHROME_USER_PROFILE))
     options = [
         f'user-data-dir={chrome_profile_path}',
-        'start-maximized',
         'disable-infobars',
         '--disable-dev-shm-usage',
         '--no-sandbox',
         '--disable-extensions'
-    ]
-    web_controller = WebController(url, timeout=10, options=options, wait=wait)
+    ] + (FAST_OPTIONS if fast else ['start-maximized']) + (extra_options or [])
+    blocked_urls = BLOCKED_URLS if fast else None
+    web_controller = AdaptiveController(url, timeout=10, options=options, wait=wait, tracer=get_tracer(),
+                                        blocked_urls=blocked_urls, retry_policy=get_retry_policy())
     return web_controller
 
 
+def start_controller(app, checkpoint: Checkpoint) -> AdaptiveController:
+    """
+    Return the browser of the failed run of the same keys if it is still open, else start a new browser.
+
+    :param app: current app object interacting with the user
+    :param checkpoint: checkpoint of the run
+    :return: instance of AdaptiveController
+    """
+    # The app also holds the worker pool of the last batch, which cannot be resumed
+    controller = app.controller if isinstance(app.controller, AdaptiveController) else None
+    if controller and checkpoint.started and getattr(controller.checkpoint, 'key', None) == checkpoint.key \
+            and is_alive(controller):
+        return controller
+    quit_browser(controller)
+    app.controller = get_controller([consts.NETSUITE_URL], app.settings['delay'].get(),
+                                    fast=app.settings['fast-browser'].get())
+    return app.controller
+
+
+def execute_controller(controller, bindings: dict, checkpoint: Checkpoint, token: CancelToken = None) -> list:
+    """
+    Run the proposal plan, or resume the failed run of the same keys from its checkpoint.
+
+    :param controller: instance of AdaptiveController, see start_controller
+    :param bindings: keys for the project, by label
+    :param checkpoint: checkpoint of the run
+    :param token: cancellation token of the run, checked before every step
+    :return: data scraped by the controller
+    """
+    controller.token = token
+    if checkpoint.started and getattr(controller.checkpoint, 'key', None) == checkpoint.key:
+        controller.resume(checkpoint)
+    elif checkpoint.restorable:
+        login(controller)
+        controller.restore(get_plan(), bindings, checkpoint)
+    else:
+        controller.checkpoint = checkpoint
+        controller.run_plan(get_plan(), bindings)
+    return controller.data_handler.database
+
+
 def get_proj_data(data_fetched, data, proj_options):
     """
 
@@ -86,54 +143,98 @@ def execute_dirs_files_maker(proj_data: dict) -> None:
 
     :param proj_data: data for the project
     """
-    utils.make_project_dirs_files(proj_data)
+    results = utils.make_project_dirs_files(proj_data)
+    utils.check_file_results(results)
 
 
-def update_quote_log(proj_data):
+def update_quote_log(proj_data, session: ExcelSession = None):
     """
     Update the Quote Log if the user specified.
 
     :param proj_data: data for the project
+    :param session: Excel session shared by the run
     """
     if proj_data['log']:
-        utils.update_quote_log(proj_data)
+        utils.update_quote_log(proj_data, session)
 
 
-def run_middleware(app) -> None:
+def run_middleware(app, data: dict, token: CancelToken) -> None:
     """
     Run the middleware.
 
     :param app: current app object interacting with the user
+    :param data: keys entered by the user in the app interface
+    :param token: cancellation token of the run, checked before every phase
     """
-    app.start_progress()
-    data = app.get_data()
     set_user_pass_questions(data)
     proj_options = get_proj_options(data)
+    checkpoint = load_checkpoint(get_run_key(data))
+    pipeline = FilePipeline(get_proj_data([], data, proj_options)).start()
+    token.register(pipeline.cancel)
 
-    app.update_progress('Creating controller elements', 5)
-    elements = utils.generate_elements_with_keys(data)
+    app.post(app.update_progress, 'Creating controller elements', 5)
+    utils.update_keys_for_elements(data)
 
+    # Browser used by the run, None for the REST engine
+    controller = None
+    kept = app.settings['keep-browser'].get()
     try:
-        app.update_progress('Executing controller', 15)
-        app.controller = get_controller([consts.NETSUITE_URL], app.settings['delay'].get())
-        app.controller.run_controller(elements)
-        data_scraped = app.controller.data_handler.database
-        proj_data = get_proj_data(data_scraped, data, proj_options)
-        app.controller.close()
+        token.check()
+        app.post(app.update_progress, 'Executing controller', 15)
+        if consts.NETSUITE_ENGINE == 'rest':
+            data_scraped = rest.create_proposal(data)
+            proj_data = get_proj_data(data_scraped, data, proj_options)
+        elif kept:
+            with app.warm_controller.session(app.settings['delay'].get(),
+                                             app.settings['fast-browser'].get()) as controller:
+                controller.token = token
+                try:
+                    if checkpoint.restorable:
+                        controller.restore(get_plan(), data, checkpoint)
+                        data_scraped = controller.data_handler.database
+                    else:
+                        controller.checkpoint = checkpoint
+                        data_scraped = run_elements(controller, data, logged_in=True)
+                finally:
+                    controller.checkpoint = None
+                    controller.token = None
+                proj_data = get_proj_data(data_scraped, data, proj_options)
+        else:
+            controller = start_controller(app, checkpoint)
+            token.register(partial(quit_browser, controller))
+            data_scraped = execute_controller(controller, data, checkpoint, token)
+            proj_data = get_proj_data(data_scraped, data, proj_options)
+            cookie_cache.save_cookies(controller)
+            controller.close()
+        checkpoint.clear()
+        token.check()
         webbrowser.open(proj_data['url'])
-        app.update_progress('Creating project files and directories', 50)
-        execute_dirs_files_maker(proj_data)
-        app.update_progress('Updating the quote log', 10)
-        update_quote_log(proj_data)
+        app.post(app.update_progress, 'Creating project files and directories', 50)
+        utils.check_file_results(pipeline.finish(proj_data))
+        token.check()
+        app.post(app.update_progress, 'Updating the quote log', 10)
+        with ExcelSession() as session:
+            token.register(session.terminate)
+            token.check()
+            update_quote_log(proj_data, session)
 
     except Exception as ex:
-        if app.pb_window:
-            app.update_progress('Error occurred', 10)
-            app.log.insert(tkinter.END, str(ex))
-        if app.controller:
-            app.controller.close()
+        pipeline.cancel()
+        # The kept browser stays open for the next run, it is logged in again by the next session
+        if controller is None or kept:
+            resumable = checkpoint.started and checkpoint.restorable
+        else:
+            resumable = checkpoint.started and not token.cancelled and is_alive(controller)
+            if not resumable:
+                quit_browser(controller)
+        if token.cancelled:
+            return
+        app.post(app.update_progress, 'Error occurred', 10)
+        app.post(app.add_log, str(ex))
+        if resumable:
+            app.post(app.offer_resume)
         return
 
-    app.update_progress('Finishing', 20)
-    app.stop_progress()
-    app.show_success_msg()
+    app.post(app.update_progress, 'Finishing', 20)
+    app.post(app.close_progress)
+    app.post(app.show_success_msg)
@@ -0,0 +1,159 @@
+import shutil
+import consts
+from uuid import uuid4
+from pathlib import Path
+from threading import Thread, Event
+import middleware.utils as utils
+from project import file_gen
+from project.excel_session import ExcelSession
+from project.backends import get_backend, resolve_backend_name
+
+"""
+Project files prepared while the browser creates the project.
+
+The pipeline starts before the browser step: it creates a pending job folder in the project path, opens every
+template on its own thread and fills the placeholders that do not depend on the project (date, rep, client,
+name, type). Once the project id and URL are known, finish only writes those, saves the files and renames the
+pending folder to the job folder, so a run takes about as long as the slower of the two steps.
+"""
+
+PENDING_PREFIX = '_pending_'
+
+
+def move_dir(src: Path, dest: Path):
+    """
+    Rename a folder, merging it into the destination if the destination already exists.
+
+    :param src: folder to move
+    :param dest: new path of the folder
+    """
+    if not dest.exists():
+        src.rename(dest)
+        return
+    for child in src.iterdir():
+        if child.is_dir() and Path(dest, child.name).is_dir():
+            move_dir(child, Path(dest, child.name))
+        else:
+            shutil.move(str(child), str(Path(dest, child.name)))
+    src.rmdir()
+
+
+class FilePipeline:
+    """
+    Prepares the project files in the background and completes them once the project id is known.
+
+        Attributes:
+        proj_data (dict): The data for the project, completed with the id and URL by finish.
+        backend_name (str): The name of the workbook backend the files are generated with.
+        pending_dir (Path): The folder the files are created in until the job folder name is known.
+        results (dict): The file kind, error message (None on success) pairs in job order.
+        dests (dict): The file kind, destination path pairs, set by finish.
+        proceed (Event): Set when the project id is known or the run is cancelled.
+        cancelled (bool): A boolean indicating whether the prepared files are discarded.
+        finished (bool): A boolean indicating whether the files were saved, after which they are kept.
+        error (str): The error that prevented the preparation, None if the files are being prepared.
+    """
+
+    def __init__(self, proj_data: dict):
+        self.proj_data = proj_data
+        self.backend_name = None
+        self.pending_dir = None
+        self.results = {}
+        self.dests = {}
+        self.proceed = Event()
+        self.cancelled = False
+        self.finished = False
+        self.error = None
+        self.threads = []
+        self.coordinator = None
+
+    def start(self):
+        """
+        Start preparing the files on a background thread.
+
+        :return: the pipeline itself
+        """
+        self.coordinator = Thread(target=self.prepare, daemon=True)
+        self.coordinator.start()
+        return self
+
+    def prepare(self):
+        """
+        Create the pending folder and open every template on its own thread.
+        """
+        try:
+            self.backend_name = resolve_backend_name(consts.WORKBOOK_BACKEND)
+            self.pending_dir = Path(utils.get_proj_dir(self.proj_data), f'{PENDING_PREFIX}{uuid4().hex[:8]}')
+            utils.make_job_subdirs(self.pending_dir)
+            jobs = utils.get_file_jobs(self.proj_data, self.pending_dir)
+        except Exception as ex:
+            self.error = str(ex) or type(ex).__name__
+            return
+        self.results = {kind: None for kind, _, _ in jobs}
+        for kind, src, _ in jobs:
+            thread = Thread(target=self.prepare_file, args=(kind, Path(src)), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def prepare_file(self, kind: str, src: Path):
+        """
+        Open a template and fill it, waiting for the project id before saving it.
+
+        The workbook stays on the thread that opened it, as COM objects cannot be shared between threads.
+
+        :param kind: 'takeoff', 'checklist' or 'config'
+        :param src: path of the template
+        """
+        try:
+            with ExcelSession() as session:
+                backend = get_backend(self.backend_name, session)
+                template = file_gen.open_template(kind, src, self.proj_data, backend)
+                self.proceed.wait()
+                if self.cancelled:
+                    backend.close(template['wb'])
+                    return
+                file_gen.save_template(template, self.dests[kind], self.proj_data, backend)
+        except Exception as ex:
+            self.results[kind] = str(ex) or type(ex).__name__
+
+    def join(self):
+        """
+        Wait for the preparation and the file threads to end.
+        """
+        self.coordinator.join()
+        for thread in self.threads:
+            thread.join()
+
+    def finish(self, proj_data: dict) -> dict:
+        """
+        Complete the files with the project id and URL and move them to the job folder.
+
+        :param proj_data: data for the project, including the id and URL
+        :return: file kind, error message (None on success) pairs
+        """
+        self.coordinator.join()
+        if self.error:
+            if self.pending_dir:
+                shutil.rmtree(self.pending_dir, ignore_errors=True)
+            return utils.make_project_dirs_files(proj_data)
+        self.proj_data.update(proj_data)
+        self.dests = {kind: dest for kind, _, dest in utils.get_file_jobs(self.proj_data, self.pending_dir)}
+        self.proceed.set()
+        self.join()
+        self.finished = True
+        job_dir = utils.get_job_dir(self.proj_data)
+        move_dir(self.pending_dir, job_dir)
+        proj_data['job-path'] = str(job_dir)
+        return self.results
+
+    def cancel(self):
+        """
+        Discard the prepared files and remove the pending folder.
+        """
+        if self.finished or self.coordinator is None:
+            return
+        self.cancelled = True
+        self.proceed.set()
+        self.join()
+        if self.pending_dir:
+            shutil.rmtree(self.pending_dir, ignore_errors=True)
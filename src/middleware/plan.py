@@ -0,0 +1,167 @@
+from threading import Lock
+from pywebgo import utils
+from utility import elem_handler
+from selenium.webdriver import Keys
+from middleware.trace import get_step_name
+
+"""
+Step plans compiled once from the element dicts and reused by every run.
+
+Compiling resolves what WebController works out again on every step: the locator strategy and match index,
+the actions in execution order, the url to load after the step and whether the step starts on a different
+window. The steps never change once compiled. The keys a step sends are looked up by label in the bindings
+of the run, and a step whose custom function decides the path jumps to a labelled step instead of deleting
+the steps that follow it, so the same plan serves every proposal and batch row.
+
+Element keys read by the compiler in addition to the WebController specifications:
+    'ready':    readiness condition, see middleware.controller
+    'label':    name of the step, the target of branches
+    'branch':   label of the step to continue at when the custom function returns true
+    'term':     string sent after the bound keys, defaults to the terminator of the plan
+The 'rank' and 'copy' keys of WebController are not supported, the elements run in list order.
+"""
+
+STEP_FIELDS = ('index', 'name', 'loc', 'value', 'strategy', 'nth', 'actions', 'key', 'term', 'retrieve',
+               'window', 'page', 'wait', 'ready', 'custom', 'branch', 'switch')
+
+
+class Step:
+    """
+    An immutable compiled element.
+
+        Attributes:
+        index (int): The position of the step in its plan.
+        name (str): The readable name of the step, see trace.get_step_name.
+        loc (str): The locator, 'active' for the focused element, None for custom steps.
+        value (str): The locator value.
+        strategy (str): The selenium By strategy of the locator.
+        nth (int): The index of the element among the matches, None for the first match.
+        actions (tuple): The action keywords or function in execution order.
+        key (str): The label of the binding sent by send-keys and select, None if the step sends no keys.
+        term (str): The string sent after the bound keys.
+        retrieve (str | Callable): The data to retrieve from the element.
+        window (int): The window index of the element.
+        page (int): The url index to load after the step, None to stay on the page.
+        wait (float): The delay (in seconds) before each action, 0 for the execution delay of the controller.
+        ready (str): The readiness condition of the element.
+        custom (Callable): The function (controller, step) -> bool run instead of the default process.
+        branch (int): The index to continue at when the custom function returns true, None if it never jumps.
+        switch (bool): A boolean indicating whether the step is the first of its window segment.
+    """
+
+    __slots__ = STEP_FIELDS
+
+    def __init__(self, **fields):
+        for field in STEP_FIELDS:
+            object.__setattr__(self, field, fields.get(field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Steps are immutable, cannot set '{name}'.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Steps are immutable, cannot delete '{name}'.")
+
+    def __repr__(self):
+        return f'Step({self.index}, {self.name})'
+
+
+class StepPlan:
+    """
+    The compiled steps of a run.
+
+        Attributes:
+        steps (tuple): The steps in execution order.
+        labels (dict): The label, step index pairs.
+    """
+
+    def __init__(self, steps: tuple, labels: dict):
+        self.steps = steps
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.steps)
+
+
+def get_actions(action) -> tuple:
+    """
+    Split an action into the actions to execute, in the order WebController.execute_actions runs them.
+
+    :param action: action keywords separated by spaces, or an action function
+    :return: action keywords or function
+    """
+    if not action:
+        return ()
+    if callable(action):
+        return (action,)
+    # WebController runs the following actions before the current one
+    return tuple(reversed(action.split()))
+
+
+def compile_plan(elements: list, term_str: str = Keys.TAB) -> StepPlan:
+    """
+    Compile the element dicts into a plan.
+
+    :param elements: element dicts, with the labels of the bindings as 'keys'
+    :param term_str: string sent after the bound keys of the steps that do not declare a 'term'
+    :return: instance of StepPlan
+    """
+    labels = {element['label']: index for index, element in enumerate(elements) if element.get('label')}
+    steps = []
+    for index, element in enumerate(elements):
+        loc = element.get('loc')
+        strategy, nth = None, None
+        if loc and loc != 'active':
+            identifiers = utils.get_element_identifiers(element)
+            strategy = identifiers['strategy']
+            nth = int(identifiers['index']) if identifiers['index'] else None
+            if strategy is None:
+                raise Exception(f"Error: unknown locator '{loc}' in element {index}.")
+        branch = element.get('branch')
+        if branch and branch not in labels:
+            raise Exception(f"Error: element {index} branches to the unknown label '{branch}'.")
+        window = element.get('window') or 0
+        page = element.get('page') or 0
+        next_page = (elements[index + 1].get('page') or 0) if index + 1 < len(elements) else page
+        steps.append(Step(
+            index=index,
+            name=get_step_name(element),
+            loc=loc,
+            value=element.get('value'),
+            strategy=strategy,
+            nth=nth,
+            actions=get_actions(element.get('action')),
+            key=element.get('keys'),
+            term=element.get('term', term_str if element.get('keys') else ''),
+            retrieve=element.get('retrieve'),
+            window=window,
+            page=next_page if next_page != page else None,
+            wait=element.get('wait') or 0,
+            ready=element.get('ready'),
+            custom=element.get('custom'),
+            branch=labels[branch] if branch else None,
+            switch=index == 0 or window != (elements[index - 1].get('window') or 0)
+        ))
+    return StepPlan(tuple(steps), labels)
+
+
+# Name of a plan: function returning its element dicts
+PLAN_SOURCES = {
+    'proposal': elem_handler.get_elements,
+    'login': elem_handler.get_login_elements
+}
+
+plans = {}
+plans_lock = Lock()
+
+
+def get_plan(name: str = 'proposal') -> StepPlan:
+    """
+    Return a compiled plan, compiling it on first use.
+
+    :param name: name of the plan in PLAN_SOURCES
+    :return: instance of StepPlan
+    """
+    with plans_lock:
+        if name not in plans:
+            plans[name] = compile_plan(PLAN_SOURCES[name]())
+        return plans[name]
@@ -0,0 +1,272 @@
+import os
+import time
+import shutil
+import consts
+from pathlib import Path
+from queue import Queue, Empty
+from threading import Thread, Lock
+from selenium.common.exceptions import WebDriverException
+from middleware.retry import CircuitBreaker
+from middleware.cancel import CancelToken, RunCancelled
+from middleware.middleware import get_controller
+from middleware.session import is_alive, is_logged_in, is_record_saved
+
+"""
+Pool of WebController workers pulling the rows of a batch from a shared queue.
+
+Every worker drives its own Chrome with a copy of the user profile, so the workers do not fight over
+the profile lock and each keeps its own NetSuite session. A row that fails in the browser before the
+proposal is saved is put back on the queue; a row is never retried once its record exists, so a
+retry cannot create a duplicate proposal. Once several rows in a row fail in the browser, the circuit
+breaker fails the remaining rows instead of running them against a degraded NetSuite. Once the batch is
+cancelled, the workers report the remaining rows as cancelled without starting them. A worker that stops on
+an unexpected error still reports its row, and once no worker is left the remaining rows are failed.
+"""
+
+PROFILE_IGNORE = shutil.ignore_patterns('Singleton*', 'lockfile', '*.lock', 'Cache', 'Code Cache', 'GPUCache',
+                                        'GrShaderCache', 'ShaderCache', 'Crashpad')
+
+
+def get_worker_profile(number: int) -> Path:
+    """
+    Return the Chrome user data directory of a worker.
+
+    :param number: zero based number of the worker; worker 0 uses the user profile itself
+    :return: path of the user data directory
+    """
+    profile = Path.home() / Path(consts.CHROME_USER_PROFILE)
+    if number == 0:
+        return profile
+    return profile.with_name(f'{profile.name} - Worker {number}')
+
+
+def copy_worker_profile(number: int) -> Path:
+    """
+    Copy the user profile to the user data directory of a worker on first use.
+
+    The copy is made in a temporary folder and moved into place once complete, so a copy that fails partway
+    is never reused by a later run.
+
+    :param number: zero based number of the worker
+    :return: path of the user data directory
+    """
+    profile = get_worker_profile(0)
+    worker_profile = get_worker_profile(number)
+    if number == 0 or worker_profile.is_dir() or not profile.is_dir():
+        return worker_profile
+    tmp_profile = worker_profile.with_name(f'{worker_profile.name}.{os.getpid()}.tmp')
+    shutil.rmtree(tmp_profile, ignore_errors=True)
+    try:
+        shutil.copytree(profile, tmp_profile, ignore=PROFILE_IGNORE)
+        os.replace(tmp_profile, worker_profile)
+    finally:
+        shutil.rmtree(tmp_profile, ignore_errors=True)
+    return worker_profile
+
+
+class WorkerPool:
+    """
+    Runs rows on several WebController instances and returns the results in row order.
+
+        Attributes:
+        process_row (Callable): Function (controller, data, logged_in) -> (proj_data, error) running one row.
+        wait (float): The delay (in seconds) before executing each action.
+        workers (int): The maximum number of browsers running at once.
+        throttle (float): The minimum time (in seconds) between two rows started by the same worker.
+        attempts (int): The number of times a row is tried before it is reported as failed.
+        fast (bool): A boolean indicating whether the browsers use the fast profile, see get_controller.
+        breaker (CircuitBreaker): The breaker stopping the batch after consecutive browser failures.
+        token (CancelToken): The cancellation token of the batch, checked before every row and step.
+        profile_errors (dict): The worker number, error pairs of the profiles that could not be copied.
+        jobs (Queue): The rows waiting for a worker, as (index, data, attempt) triplets.
+        done (Queue): The finished rows, as (index, (proj_data, error)) pairs.
+        controllers (list): The running controllers.
+        alive (int): The number of workers still running.
+    """
+
+    def __init__(self, process_row, wait: float, workers: int = 1, throttle: float = 0, attempts: int = 1,
+                 fast: bool = False, breaker: CircuitBreaker = None, token: CancelToken = None):
+        self.process_row = process_row
+        self.wait = wait
+        self.workers = max(workers, 1)
+        self.throttle = throttle
+        self.attempts = max(attempts, 1)
+        self.fast = fast
+        self.breaker = breaker or CircuitBreaker()
+        self.token = token or CancelToken()
+        self.profile_errors = {}
+        self.jobs = Queue()
+        self.done = Queue()
+        self.controllers = []
+        self.alive = 0
+        self.lock = Lock()
+
+    def run(self, rows: list):
+        """
+        Run all the rows and yield their results in row order as soon as they are available.
+
+        :param rows: keys for each row
+        :return: generator of (index, (proj_data, error)) pairs
+        """
+        for index, data in enumerate(rows):
+            self.jobs.put((index, data, 1))
+        self.alive = min(self.workers, len(rows))
+        self.copy_profiles()
+        threads = [Thread(target=self.work, args=(number,), daemon=True) for number in range(self.alive)]
+        for thread in threads:
+            thread.start()
+
+        finished = {}
+        next_index = 0
+        while next_index < len(rows):
+            try:
+                index, result = self.done.get(timeout=1)
+                finished[index] = result
+            except Empty:
+                with self.lock:
+                    if self.alive:
+                        continue
+                # Every worker has stopped, so the rows not reported yet never will be
+                while not self.done.empty():
+                    index, result = self.done.get()
+                    finished[index] = result
+                for index in range(next_index, len(rows)):
+                    finished.setdefault(index, (None, "Error: the batch stopped before the row could run."))
+            while next_index in finished:
+                yield next_index, finished.pop(next_index)
+                next_index += 1
+
+        for _ in threads:
+            self.jobs.put(None)
+
+    def work(self, number: int):
+        """
+        Take rows from the queue and run them on the controller of this worker.
+
+        :param number: zero based number of the worker
+        """
+        controller = None
+        logged_in = False
+        last_start = 0
+        # The row taken from the queue and not yet reported or put back
+        job = None
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    return
+                index, data, attempt = job
+                if self.token.cancelled:
+                    self.done.put((index, (None, str(RunCancelled()))))
+                    job = None
+                    continue
+                if self.breaker.tripped:
+                    self.done.put((index, (None, f"Error: batch stopped after {self.breaker.threshold} consecutive "
+                                                 f"browser failures, NetSuite may be degraded.")))
+                    job = None
+                    continue
+                time.sleep(max(0.0, last_start + self.throttle - time.monotonic()))
+                last_start = time.monotonic()
+
+                if controller is None:
+                    try:
+                        controller = self.start_controller(number)
+                        logged_in = False
+                    except Exception as ex:
+                        self.jobs.put(job)
+                        job = None
+                        self.stop_worker(f"Error: unable to start the browser. {ex}")
+                        return
+
+                try:
+                    result = self.process_row(controller, dict(data), logged_in)
+                    logged_in = True
+                    self.breaker.record(True)
+                except Exception as ex:
+                    self.breaker.record(not isinstance(ex, WebDriverException))
+                    retry = isinstance(ex, WebDriverException) and not is_record_saved(controller)
+                    if not is_alive(controller):
+                        self.close_controller(controller)
+                        controller = None
+                    else:
+                        logged_in = is_logged_in(controller)
+                    if retry and attempt < self.attempts:
+                        self.jobs.put((index, data, attempt + 1))
+                        job = None
+                        continue
+                    result = (None, str(ex) or type(ex).__name__)
+                self.done.put((index, result))
+                job = None
+        except Exception as ex:
+            if job is not None:
+                self.done.put((job[0], (None, str(ex) or type(ex).__name__)))
+            self.stop_worker(f"Error: the browser worker stopped unexpectedly. {str(ex) or type(ex).__name__}")
+        finally:
+            if controller:
+                self.close_controller(controller)
+
+    def copy_profiles(self):
+        """
+        Copy the user profile for every worker before any browser starts, as a running Chrome locks files of
+        the profile it uses.
+        """
+        for number in range(1, self.alive):
+            try:
+                copy_worker_profile(number)
+            except Exception as ex:
+                self.profile_errors[number] = ex
+
+    def start_controller(self, number: int):
+        """
+        Start a controller with the Chrome profile of the given worker.
+
+        :param number: zero based number of the worker
+        :return: instance of WebController
+        """
+        if number in self.profile_errors:
+            raise Exception(f"Error: unable to copy the Chrome profile of worker {number}. "
+                            f"{self.profile_errors[number]}")
+        controller = get_controller([consts.NETSUITE_URL], self.wait, get_worker_profile(number), fast=self.fast)
+        controller.token = self.token
+        with self.lock:
+            self.controllers.append(controller)
+        return controller
+
+    def stop_worker(self, error: str):
+        """
+        Stop a worker that could not start its browser or failed unexpectedly. The last worker to stop fails
+        the remaining rows.
+
+        :param error: error message reported for the remaining rows
+        """
+        with self.lock:
+            self.alive -= 1
+            if self.alive:
+                return
+            while not self.jobs.empty():
+                job = self.jobs.get()
+                if job is not None:
+                    self.done.put((job[0], (None, error)))
+
+    def close_controller(self, controller):
+        """
+        Quit the browser of a controller.
+
+        :param controller: instance of WebController
+        """
+        with self.lock:
+            if controller in self.controllers:
+                self.controllers.remove(controller)
+        try:
+            controller.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """
+        Quit the browsers of all the workers and stop the workers waiting for a row.
+        """
+        for controller in list(self.controllers):
+            self.close_controller(controller)
+        for _ in range(self.workers):
+            self.jobs.put(None)
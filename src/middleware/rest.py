@@ -0,0 +1,361 @@
+import os
+import hmac
+import time
+import base64
+import hashlib
+import secrets
+import consts
+import requests
+from threading import Lock
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit, parse_qsl, quote
+from middleware.utils import update_keys_for_elements
+
+"""
+Create the proposal, its item line and the linked project through the NetSuite REST API.
+
+Used instead of the browser when NETSUITE_ENGINE is 'rest'. The requests are signed with token-based
+authentication (OAuth 1.0a, HMAC-SHA256); the integration tokens are read from the environment variables in
+CREDENTIAL_VARS so they are never written to consts.csv. The names entered in the app are resolved to internal
+ids with one SuiteQL query, then the project, the proposal and the item line are created over one pooled
+HTTP session. If a request fails, the records already created are deleted so a rerun cannot leave
+duplicates. The result has the shape of the data scraped by the browser so get_proj_data works unchanged.
+"""
+
+CREDENTIAL_VARS = {
+    'consumer_key': 'NETSUITE_CONSUMER_KEY',
+    'consumer_secret': 'NETSUITE_CONSUMER_SECRET',
+    'token_id': 'NETSUITE_TOKEN_ID',
+    'token_secret': 'NETSUITE_TOKEN_SECRET'
+}
+REQUEST_TIMEOUT = 30
+
+# Script ids of the custom records of the account
+PROPOSAL_RECORD = 'customrecord_appfproposal'
+ITEM_LINE_RECORD = 'customrecord_appfproposalitem'
+PROJECT_RECORD = 'job'
+
+# App field label: (table, column) used to find the internal id of the entered name
+LOOKUPS = {
+    'Customer': ('customer', 'entityid'),
+    'Status': ('customlist_appfproposalstatus', 'name'),
+    'Proposal Sales Rep': ('employee', 'entityid'),
+    'Department': ('department', 'name'),
+    'Class': ('classification', 'name'),
+    'Item': ('item', 'itemid'),
+    'Choose': ('customlist_prime_choose_template', 'name'),
+    'Project Template': ('projecttemplate', 'entityid'),
+    'Project Type': ('customlist_prime_project_type', 'name'),
+    'Site Name': ('customrecord_prime_site_name', 'name')
+}
+
+# App field label: field id on the record
+PROPOSAL_FIELDS = {
+    'Customer': 'custrecord_appfcust',
+    'Status': 'custrecord_appfproposalstatus',
+    'Proposal Sales Rep': 'custrecord_proposalsales',
+    'Department': 'custrecord_proposaldepartment',
+    'Class': 'custrecord_proposalclass'
+}
+PROJECT_FIELDS = {
+    'Customer': 'parent',
+    'Choose': 'custentityprime_choose_template',
+    'Project Template': 'projecttemplate',
+    'Project Type': 'custentityprime_project_type',
+    'Proposal Sales Rep': 'custentity_salesrep',
+    'Site Name': 'custentityprime_project_site_name'
+}
+
+
+def encode(value: str) -> str:
+    """
+    Percent-encode a value as required by OAuth 1.0a.
+
+    :param value: value to encode
+    :return: encoded value
+    """
+    return quote(str(value), safe='~')
+
+
+def get_signature(method: str, url: str, params: dict, credentials: dict) -> str:
+    """
+    Sign a request with HMAC-SHA256.
+
+    :param method: HTTP method of the request
+    :param url: URL of the request, including its query
+    :param params: OAuth parameters of the request
+    :param credentials: consumer and token keys and secrets
+    :return: base64 encoded signature
+    """
+    parts = urlsplit(url)
+    pairs = sorted((encode(key), encode(value)) for key, value in list(params.items()) + parse_qsl(parts.query))
+    normalized = '&'.join(f'{key}={value}' for key, value in pairs)
+    base_url = f'{parts.scheme}://{parts.netloc}{parts.path}'
+    base_string = '&'.join([method.upper(), encode(base_url), encode(normalized)])
+    key = f"{encode(credentials['consumer_secret'])}&{encode(credentials['token_secret'])}"
+    digest = hmac.new(key.encode('utf-8'), base_string.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def get_oauth_header(method: str, url: str, credentials: dict, realm: str) -> str:
+    """
+    Return the token-based authentication header of a request.
+
+    :param method: HTTP method of the request
+    :param url: URL of the request, including its query
+    :param credentials: consumer and token keys and secrets
+    :param realm: NetSuite account id, e.g. 6516658_SB1
+    :return: value of the Authorization header
+    """
+    params = {
+        'oauth_consumer_key': credentials['consumer_key'],
+        'oauth_token': credentials['token_id'],
+        'oauth_signature_method': 'HMAC-SHA256',
+        'oauth_timestamp': str(int(time.time())),
+        'oauth_nonce': secrets.token_hex(16),
+        'oauth_version': '1.0'
+    }
+    params['oauth_signature'] = get_signature(method, url, params, credentials)
+    fields = ', '.join(f'{key}="{encode(value)}"' for key, value in params.items())
+    return f'OAuth realm="{realm}", {fields}'
+
+
+def get_account() -> str:
+    """
+    Return the account id of NETSUITE_URL, e.g. 6516658-sb1.
+
+    :return: account id as written in the NetSuite host names
+    """
+    return urlsplit(consts.NETSUITE_URL).hostname.split('.')[0]
+
+
+def get_rest_url() -> str:
+    """
+    Return the base URL of the REST services, NETSUITE_REST_URL if set.
+
+    :return: URL ending with /services/rest
+    """
+    if consts.NETSUITE_REST_URL:
+        return consts.NETSUITE_REST_URL.rstrip('/')
+    return f'https://{get_account()}.suitetalk.api.netsuite.com/services/rest'
+
+
+def get_credentials() -> dict:
+    """
+    Read the integration tokens from the environment.
+
+    :return: consumer and token keys and secrets
+    """
+    credentials = {key: os.environ.get(var, '') for key, var in CREDENTIAL_VARS.items()}
+    missing = [CREDENTIAL_VARS[key] for key, value in credentials.items() if not value]
+    if missing:
+        raise Exception(f"Error: set the environment variables {', '.join(missing)} to use the REST engine.")
+    return credentials
+
+
+def escape(value: str) -> str:
+    """
+    Escape a value for a SuiteQL string literal.
+
+    :param value: value to escape
+    :return: escaped value
+    """
+    return str(value).replace("'", "''")
+
+
+class RestClient:
+    """
+    Signed requests to the NetSuite REST API over a pooled HTTP session.
+
+        Attributes:
+        base_url (str): The base URL of the REST services.
+        credentials (dict): The consumer and token keys and secrets.
+        realm (str): The account id sent as the OAuth realm.
+        session (requests.Session): The session keeping the connections open between requests.
+        ids (dict): The internal ids already resolved, by (label, name).
+    """
+
+    def __init__(self, base_url: str, credentials: dict, realm: str):
+        self.base_url = base_url
+        self.credentials = credentials
+        self.realm = realm
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=max(consts.BATCH_WORKERS, 1)))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=max(consts.BATCH_WORKERS, 1)))
+        self.session.headers.update({'Content-Type': 'application/json', 'Accept': 'application/json'})
+        self.ids = {}
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send a signed request.
+
+        :param method: HTTP method of the request
+        :param path: path of the service relative to the base URL, including its query
+        :param kwargs: arguments passed to requests.Session.request
+        :return: response of the request
+        """
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        headers = {'Authorization': get_oauth_header(method, url, self.credentials, self.realm)}
+        headers.update(kwargs.pop('headers', {}))
+        response = self.session.request(method, url, headers=headers, timeout=REQUEST_TIMEOUT, **kwargs)
+        if not response.ok:
+            try:
+                detail = response.json()['o:errorDetails'][0]['detail']
+            except (ValueError, KeyError, IndexError, TypeError):
+                detail = response.text[:200]
+            raise Exception(f"Error: NetSuite returned {response.status_code} for {method} {path}: {detail}")
+        return response
+
+    def query(self, suiteql: str) -> list:
+        """
+        Run a SuiteQL query.
+
+        :param suiteql: query to run
+        :return: rows of the result
+        """
+        response = self.request('POST', 'query/v1/suiteql', json={'q': suiteql}, headers={'Prefer': 'transient'})
+        return response.json().get('items', [])
+
+    def resolve(self, data: dict) -> dict:
+        """
+        Find the internal ids of the names entered for the LOOKUPS fields, with one query for the new names.
+
+        :param data: keys entered by the user in the app interface
+        :return: field label, internal id pairs
+        :raises Exception: if a name is not found, or matches several records
+        """
+        pending = [label for label in LOOKUPS if data.get(label) and (label, data[label]) not in self.ids]
+        if pending:
+            selects = [f"SELECT '{label}' AS label, id FROM {LOOKUPS[label][0]} "
+                       f"WHERE {LOOKUPS[label][1]} = '{escape(data[label])}'" for label in pending]
+            found = {}
+            for row in self.query(' UNION ALL '.join(selects)):
+                found.setdefault(row['label'], set()).add(str(row['id']))
+            ambiguous = [label for label, ids in found.items() if len(ids) > 1]
+            if ambiguous:
+                raise Exception(f"Error: {', '.join(f'{label} {data[label]!r}' for label in ambiguous)} "
+                                f"matches more than one record in NetSuite.")
+            for label, ids in found.items():
+                self.ids[(label, data[label])] = ids.pop()
+        missing = [label for label in pending if (label, data[label]) not in self.ids]
+        if missing:
+            raise Exception(f"Error: {', '.join(missing)} not found in NetSuite.")
+        return {label: self.ids[(label, data[label])] for label in LOOKUPS if data.get(label)}
+
+    def create_record(self, record_type: str, fields: dict) -> str:
+        """
+        Create a record.
+
+        :param record_type: record type, e.g. job
+        :param fields: field id, value pairs of the record
+        :return: internal id of the new record
+        """
+        response = self.request('POST', f'record/v1/{record_type}', json=fields)
+        return response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+
+    def delete_record(self, record_type: str, record_id: str):
+        """
+        Delete a record.
+
+        :param record_type: record type, e.g. job
+        :param record_id: internal id of the record
+        """
+        self.request('DELETE', f'record/v1/{record_type}/{record_id}')
+
+    def get_record(self, record_type: str, record_id: str, fields: list) -> dict:
+        """
+        Read fields of a record.
+
+        :param record_type: record type, e.g. job
+        :param record_id: internal id of the record
+        :param fields: field ids to read
+        :return: field id, value pairs of the record
+        """
+        path = f"record/v1/{record_type}/{record_id}?fields={encode(','.join(fields))}"
+        return self.request('GET', path).json()
+
+    def close(self):
+        """
+        Close the pooled connections.
+        """
+        self.session.close()
+
+
+client = None
+client_lock = Lock()
+
+
+def get_client() -> RestClient:
+    """
+    Return the client shared by the runs, so the connections and resolved ids are reused.
+
+    :return: instance of RestClient
+    """
+    global client
+    with client_lock:
+        if client is None:
+            client = RestClient(get_rest_url(), get_credentials(), get_account().upper().replace('-', '_'))
+        return client
+
+
+def delete_records(rest_client: RestClient, records: list) -> list:
+    """
+    Delete records in reverse order of creation, so no record is deleted while another one references it.
+
+    :param rest_client: client to use
+    :param records: (record type, internal id) pairs in order of creation
+    :return: the records that could not be deleted
+    """
+    left = []
+    for record_type, record_id in reversed(records):
+        try:
+            rest_client.delete_record(record_type, record_id)
+        except Exception:
+            left.append((record_type, record_id))
+    return left
+
+
+def create_proposal(data: dict, rest_client: RestClient = None) -> list:
+    """
+    Create the project, the proposal and its item line.
+
+    :param data: keys entered by the user in the app interface
+    :param rest_client: client to use, defaults to the shared client
+    :return: project title and proposal URL, in the format of the data scraped by the browser
+    """
+    rest_client = rest_client or get_client()
+    update_keys_for_elements(data)
+    ids = rest_client.resolve(data)
+
+    # (record type, internal id) of the records created so far, deleted if a later request fails
+    created = []
+    try:
+        project = {field: {'id': ids[label]} for label, field in PROJECT_FIELDS.items() if label in ids}
+        project['custentityprime_project_scope'] = data['Project Scope']
+        project_id = rest_client.create_record(PROJECT_RECORD, project)
+        created.append((PROJECT_RECORD, project_id))
+
+        proposal = {field: {'id': ids[label]} for label, field in PROPOSAL_FIELDS.items() if label in ids}
+        proposal.update({'custrecord_proposalmemo': data['Memo'], 'custrecord_appfproj': {'id': project_id}})
+        proposal_id = rest_client.create_record(PROPOSAL_RECORD, proposal)
+        created.append((PROPOSAL_RECORD, proposal_id))
+
+        rest_client.create_record(ITEM_LINE_RECORD, {
+            'custrecord_proposallink': {'id': proposal_id},
+            'custrecord_proposalitem': {'id': ids['Item']},
+            'custrecord_proposalmilestone': data['Milestone'],
+            'custrecord_proposalquantity': float(data['Quantity'])
+        })
+    except Exception as ex:
+        left = delete_records(rest_client, created)
+        if left:
+            raise Exception(f"{ex}\nUnable to delete the records already created, delete them in NetSuite before "
+                            f"running again: {', '.join(f'{kind} {record_id}' for kind, record_id in left)}.") from ex
+        raise
+
+    project_fields = rest_client.get_record(PROJECT_RECORD, project_id, ['entityid', 'companyname'])
+    proj_title = f"{project_fields.get('entityid', '')} {project_fields.get('companyname', '')}".strip()
+    return [
+        {'element': None, 'type': 'text', 'data-keys': proj_title},
+        {'element': None, 'type': 'url', 'data-keys': f'{consts.NETSUITE_URL}&id={proposal_id}'}
+    ]
@@ -0,0 +1,121 @@
+import random
+import consts
+from threading import Lock
+from selenium.common.exceptions import (
+    StaleElementReferenceException, ElementClickInterceptedException, ElementNotInteractableException,
+    NoSuchElementException, TimeoutException, InvalidSessionIdException, NoSuchWindowException
+)
+
+"""
+Retry policy of the controller steps and circuit breaker of the batch runs.
+
+A step that fails with a transient error (the page re-rendered the element, something covered it, or it did
+not show up in time) is retried in place after an exponential backoff with jitter, so a flaky step costs one
+retry instead of a rerun from the login. Other errors end the run at once: a closed browser cannot be
+retried in place, and a wrong value would fail the same way again. The circuit breaker stops a batch after
+consecutive rows fail in the browser, as NetSuite is then more likely degraded than the rows wrong.
+"""
+
+TRANSIENT = 'transient'
+BROWSER = 'browser'
+FATAL = 'fatal'
+
+TRANSIENT_ERRORS = (StaleElementReferenceException, ElementClickInterceptedException,
+                    ElementNotInteractableException, NoSuchElementException, TimeoutException)
+# Errors WebDriver raises before performing an action, so the action can be repeated safely
+UNPERFORMED_ERRORS = (StaleElementReferenceException, ElementClickInterceptedException, ElementNotInteractableException)
+BROWSER_ERRORS = (InvalidSessionIdException, NoSuchWindowException)
+MAX_BACKOFF = 8
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Classify an error raised by a step.
+
+    :param error: error raised by the step
+    :return: TRANSIENT if retrying the step may succeed, BROWSER if the browser or window is gone, else FATAL
+    """
+    if isinstance(error, BROWSER_ERRORS):
+        return BROWSER
+    if isinstance(error, TRANSIENT_ERRORS):
+        return TRANSIENT
+    return FATAL
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed step is retried and how long to back off first.
+
+        Attributes:
+        attempts (int): The maximum number of attempts of a step, 1 to never retry.
+        base_delay (float): The backoff (in seconds) before the second attempt, doubled for every following one.
+        max_delay (float): The maximum backoff (in seconds).
+    """
+
+    def __init__(self, attempts: int = 1, base_delay: float = 0.5, max_delay: float = MAX_BACKOFF):
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, error: Exception, attempt: int, acting: bool = False) -> bool:
+        """
+        Check if a step is retried after the given failed attempt.
+
+        :param error: error raised by the attempt
+        :param attempt: one based number of the failed attempt
+        :param acting: true if the error was raised by an action, which may have been performed, e.g. a click
+            on save timing out while the record is being saved
+        :return: true if the error is transient, the action was not performed and attempts are left
+        """
+        if acting and not isinstance(error, UNPERFORMED_ERRORS):
+            return False
+        return attempt < self.attempts and classify_error(error) == TRANSIENT
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Return the backoff after a failed attempt: half of the exponential delay, plus a random part of the other
+        half so workers failing together do not retry together.
+
+        :param attempt: one based number of the failed attempt
+        :return: delay (in seconds)
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+def get_retry_policy() -> RetryPolicy:
+    """
+    Return the step retry policy set by STEP_ATTEMPTS and STEP_BACKOFF.
+
+    :return: instance of RetryPolicy
+    """
+    return RetryPolicy(consts.STEP_ATTEMPTS, consts.STEP_BACKOFF)
+
+
+class CircuitBreaker:
+    """
+    Trips once a number of consecutive rows have failed in the browser.
+
+        Attributes:
+        threshold (int): The number of consecutive failures tripping the breaker, 0 to never trip.
+        failures (int): The number of consecutive failures so far.
+        tripped (bool): A boolean indicating whether the batch should stop.
+        lock (Lock): Held while the workers record results.
+    """
+
+    def __init__(self, threshold: int = 0):
+        self.threshold = threshold
+        self.failures = 0
+        self.tripped = False
+        self.lock = Lock()
+
+    def record(self, success: bool):
+        """
+        Record the result of a row.
+
+        :param success: true if the row reached NetSuite without a browser error
+        """
+        with self.lock:
+            self.failures = 0 if success else self.failures + 1
+            if self.threshold and self.failures >= self.threshold:
+                self.tripped = True
@@ -0,0 +1,112 @@
+import consts
+from utility import elem_handler
+from middleware.plan import get_plan
+from middleware.checkpoint import is_record_url
+from selenium.common.exceptions import NoAlertPresentException
+
+"""
+Helpers to run several proposals through one logged in WebController.
+"""
+
+
+def reset_controller(controller):
+    """
+    Clear the elements and data of the previous run and close any window it left open.
+
+    :param controller: instance of WebController
+    """
+    controller.elem_handler.elements = []
+    controller.elem_handler.element_objects = []
+    controller.data_handler.database = []
+    for handle in controller.window_handles[1:]:
+        controller.switch_to.window(handle)
+        controller.close()
+    controller.switch_to.window(controller.window_handles[0])
+
+
+def is_alive(controller) -> bool:
+    """
+    Check if the browser of the controller still responds.
+
+    :param controller: instance of WebController
+    :return: true if the browser can be driven
+    """
+    # A chromedriver that quit or crashed raises urllib3 errors such as MaxRetryError, not WebDriverException
+    try:
+        return bool(controller.window_handles)
+    except Exception:
+        return False
+
+
+def quit_browser(controller):
+    """
+    Quit the browser of the controller, ignoring a browser that already closed.
+
+    :param controller: instance of WebController, or None
+    """
+    if controller is None:
+        return
+    try:
+        controller.quit()
+    except Exception:
+        pass
+
+
+def is_record_saved(controller) -> bool:
+    """
+    Check if the proposal of the last run was saved, i.e. the browser left the new record form.
+
+    :param controller: instance of WebController
+    :return: true if the main window shows a saved record
+    """
+    try:
+        controller.switch_to.window(controller.window_handles[0])
+        return is_record_url(controller.current_url)
+    except Exception:
+        return False
+
+
+def is_logged_in(controller) -> bool:
+    """
+    Check if the session is still logged in by loading the landing page.
+
+    :param controller: instance of WebController
+    :return: true if NetSuite served the landing page instead of redirecting to the login
+    """
+    try:
+        reset_controller(controller)
+        controller.load_page(consts.NETSUITE_URL)
+        try:
+            controller.switch_to.alert.accept()
+        except NoAlertPresentException:
+            pass
+        return elem_handler.is_authenticated(controller)
+    except Exception:
+        return False
+
+
+def login(controller):
+    """
+    Log in without creating a proposal, stopping once the new proposal form is shown.
+
+    :param controller: instance of WebController
+    """
+    reset_controller(controller)
+    controller.checkpoint = None
+    controller.run_plan(get_plan('login'), {})
+
+
+def run_elements(controller, bindings: dict, logged_in: bool) -> list:
+    """
+    Run the steps of a proposal, starting at the proposal form once logged in.
+
+    :param controller: instance of WebController
+    :param bindings: keys for the project, by label
+    :param logged_in: true if the session is already logged in
+    :return: data scraped by the controller
+    """
+    plan = get_plan()
+    start = plan.labels[elem_handler.PROPOSAL_LABEL] if logged_in else 0
+    reset_controller(controller)
+    controller.run_plan(plan, bindings, start)
+    return controller.data_handler.database
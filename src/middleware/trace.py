@@ -0,0 +1,226 @@
+import json
+import time
+import consts
+import datetime
+from pathlib import Path
+from contextlib import contextmanager
+
+"""
+Per-step timing of the element pipeline.
+
+Every step records the time spent switching windows, locating its element, waiting for it to be ready,
+acting on it, retrieving data, loading the next page and backing off before a retry, plus the number of
+locate retries and of attempts of the step. Nested spans are counted exclusively, e.g. the execution delay
+slept inside an action counts as wait, not action.
+A finished run is written as Chrome trace-event JSON (open it in chrome://tracing or Perfetto) and as a
+summary table.
+"""
+
+SPAN_KINDS = ['switch', 'locate', 'wait', 'action', 'retrieve', 'navigate', 'backoff']
+
+
+def get_step_name(element: dict) -> str:
+    """
+    Return a readable name for the step of an element. The keys are left out as they may hold passwords.
+
+    :param element: a dictionary containing WebElement specifications
+    :return: name of the step
+    """
+    if element.get('loc') and element.get('value'):
+        return f"{element['loc']}={element['value']}"
+    if element.get('loc'):
+        return element['loc']
+    return getattr(element.get('custom'), '__name__', 'custom')
+
+
+class StepTracer:
+    """
+    Collects the timings of the steps of a run.
+
+        Attributes:
+        steps (list): The step records of the current run.
+        events (list): The Chrome trace events of the current run.
+        stack (list): The open spans, as [kind, start, child time] triplets.
+        window (int): The window index of the previous step.
+        origin (float): The start time of the run.
+        trace_dir (Path): The directory the finished runs are written to, None to keep them in memory.
+    """
+
+    def __init__(self, trace_dir: Path | str = None):
+        self.steps = []
+        self.events = []
+        self.stack = []
+        self.window = 0
+        self.origin = time.perf_counter()
+        self.trace_dir = Path(trace_dir) if trace_dir else None
+
+    def start(self):
+        """
+        Start a new run.
+        """
+        self.steps = []
+        self.events = []
+        self.stack = []
+        self.window = 0
+        self.origin = time.perf_counter()
+
+    def get_timestamp(self, moment: float) -> float:
+        """
+        Convert a perf_counter time to microseconds since the start of the run.
+
+        :param moment: perf_counter time
+        :return: trace timestamp
+        """
+        return (moment - self.origin) * 1e6
+
+    def begin_step(self, index: int, name: str, window: int):
+        """
+        Open the record of a step.
+
+        :param index: index of the step
+        :param name: readable name of the step, see get_step_name
+        :param window: window index of the step
+        """
+        record = {'index': index, 'name': name, 'window': window, 'retries': 0, 'attempts': 1,
+                  'switched': window != self.window, 'start': time.perf_counter(), 'total': 0.0, 'error': ''}
+        record.update({kind: 0.0 for kind in SPAN_KINDS})
+        self.window = window
+        self.steps.append(record)
+
+    def end_step(self, error: Exception = None):
+        """
+        Close the record of the current step.
+
+        :param error: error raised by the step, if any
+        """
+        record = self.steps[-1]
+        end = time.perf_counter()
+        record['total'] = end - record['start']
+        record['error'] = type(error).__name__ if error else ''
+        self.events.append({
+            'name': record['name'], 'cat': 'step', 'ph': 'X', 'pid': 1, 'tid': record['window'],
+            'ts': self.get_timestamp(record['start']), 'dur': record['total'] * 1e6,
+            'args': {
+                **{f'{kind}_ms': round(record[kind] * 1000, 3) for kind in SPAN_KINDS},
+                'retries': record['retries'], 'attempts': record['attempts'], 'switched': record['switched'],
+                'error': record['error']
+            }
+        })
+
+    @contextmanager
+    def step(self, index: int, name: str, window: int):
+        """
+        Record a step, including the error it raised if any.
+
+        :param index: index of the step
+        :param name: readable name of the step, see get_step_name
+        :param window: window index of the step
+        """
+        self.begin_step(index, name, window)
+        try:
+            yield
+        except Exception as ex:
+            self.end_step(ex)
+            raise
+        self.end_step()
+
+    def add_retry(self):
+        """
+        Count a locate attempt beyond the first of the current step.
+        """
+        if self.steps:
+            self.steps[-1]['retries'] += 1
+
+    def add_attempt(self):
+        """
+        Count an attempt beyond the first of the current step, after a transient error.
+        """
+        if self.steps:
+            self.steps[-1]['attempts'] += 1
+
+    @contextmanager
+    def span(self, kind: str):
+        """
+        Time a part of the current step, excluding the time of the spans nested in it.
+
+        :param kind: one of SPAN_KINDS
+        """
+        entry = [kind, time.perf_counter(), 0.0]
+        self.stack.append(entry)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            duration = time.perf_counter() - entry[1]
+            if self.stack:
+                self.stack[-1][2] += duration
+            if self.steps:
+                self.steps[-1][kind] += duration - entry[2]
+                self.events.append({
+                    'name': kind, 'cat': 'span', 'ph': 'X', 'pid': 1, 'tid': self.steps[-1]['window'],
+                    'ts': self.get_timestamp(entry[1]), 'dur': duration * 1e6
+                })
+
+    def get_trace(self) -> dict:
+        """
+        Return the run in the Chrome trace-event format.
+
+        :return: trace-event JSON object
+        """
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': window, 'args': {'name': f'Window {window}'}}
+                    for window in sorted({record['window'] for record in self.steps})]
+        return {'traceEvents': metadata + self.events, 'displayTimeUnit': 'ms'}
+
+    def get_summary(self) -> str:
+        """
+        Return a table of the step timings (in milliseconds) of the run.
+
+        :return: summary table
+        """
+        header = ['#', 'Step', 'Win', 'Switch', 'Locate', 'Wait', 'Action', 'Retrieve', 'Navigate', 'Backoff',
+                  'Retries', 'Attempts', 'Total']
+        rows = [[str(record['index']), record['name'][:48] + (' !' + record['error'] if record['error'] else ''),
+                 ('*' if record['switched'] else '') + str(record['window'])]
+                + [f"{record[kind] * 1000:.0f}" for kind in SPAN_KINDS]
+                + [str(record['retries']), str(record['attempts']), f"{record['total'] * 1000:.0f}"]
+                for record in self.steps]
+        totals = ['', 'Total', ''] + [f"{sum(record[kind] for record in self.steps) * 1000:.0f}"
+                                      for kind in SPAN_KINDS]
+        totals += [str(sum(record['retries'] for record in self.steps)),
+                   str(sum(record['attempts'] for record in self.steps)),
+                   f"{sum(record['total'] for record in self.steps) * 1000:.0f}"]
+        widths = [max(len(row[i]) for row in [header, totals] + rows) for i in range(len(header))]
+        lines = []
+        for row in [header] + rows + [totals]:
+            lines.append('  '.join(cell.ljust(width) if i == 1 else cell.rjust(width)
+                                   for i, (cell, width) in enumerate(zip(row, widths))))
+        lines.insert(1, '-' * len(lines[0]))
+        lines.insert(len(lines) - 1, '-' * len(lines[0]))
+        return '\n'.join(lines)
+
+    def finish(self) -> Path:
+        """
+        Write the trace and the summary of the run to the trace directory.
+
+        :return: path of the trace file, None if the run is kept in memory only
+        """
+        if not self.trace_dir or not self.steps:
+            return None
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        name = datetime.datetime.now().strftime('run_%Y%m%d_%H%M%S_%f')
+        trace_path = self.trace_dir / f'{name}.json'
+        with open(trace_path, 'w', encoding='utf-8') as file:
+            json.dump(self.get_trace(), file)
+        with open(self.trace_dir / f'{name}.txt', 'w', encoding='utf-8') as file:
+            file.write(self.get_summary() + '\n')
+        return trace_path
+
+
+def get_tracer() -> StepTracer:
+    """
+    Return a tracer writing to the cache directory if step tracing is enabled.
+
+    :return: instance of StepTracer or None
+    """
+    if consts.TRACE_STEPS:
+        return StepTracer(Path(consts.CACHE_DIR, 'traces'))
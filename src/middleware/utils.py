@@ -2,30 +2,53 @@ import re
 import consts
 from pathlib import Path
 from project import file_gen
-from selenium.webdriver import Keys
-from utility import list_handler, elem_handler
+from project.backends import get_backend
+from project.excel_session import ExcelSession
+from utility import mirror_handler
 
 
-def make_project_dirs_files(proj_data: dict) -> None:
+def get_proj_dir(proj_data: dict) -> Path:
     """
-    Create project directories and files.
+    Return the directory the job folder of the project is created in.
 
     :param proj_data: data for the project
+    :return: project path, with the subfacility folder if any
     """
     if proj_data['subfac']:
-        proj_dir = Path(proj_data['path'], proj_data['subfac'])
-    else:
-        proj_dir = Path(proj_data['path'])
+        return Path(proj_data['path'], proj_data['subfac'])
+    return Path(proj_data['path'])
 
+
+def get_job_dir(proj_data: dict) -> Path:
+    """
+    Return the job folder of the project.
+
+    :param proj_data: data for the project
+    :return: path of the job folder
+    """
     if proj_data['scope']:
-        job_dir = Path(proj_dir, f"{proj_data['id']}_{proj_data['scope']}")
-    else:
-        job_dir = Path(proj_dir, f"{proj_data['id']}_{proj_data['type']}")
+        return Path(get_proj_dir(proj_data), f"{proj_data['id']}_{proj_data['scope']}")
+    return Path(get_proj_dir(proj_data), f"{proj_data['id']}_{proj_data['type']}")
 
-    proj_data['job-path'] = str(Path(job_dir))
+
+def make_job_subdirs(job_dir: Path):
+    """
+    Create the job folder and its subfolders.
+
+    :param job_dir: path of the job folder
+    """
     for subdir in consts.JOB_DIRS:
         Path(job_dir, subdir).mkdir(parents=True, exist_ok=True)
 
+
+def get_file_jobs(proj_data: dict, job_dir: Path) -> list:
+    """
+    Return the project files to create from the templates.
+
+    :param proj_data: data for the project
+    :param job_dir: folder the files are created in
+    :return: kind, template path, destination path triplets
+    """
     excel_ext = ".xltm"
     takeoff_name = f"{proj_data['id']}_{proj_data['type']}_takeoff_1.0.0{excel_ext}"
     checklist_name = f"{proj_data['id']}_Job Opening Checklist_1.0.0{excel_ext}"
@@ -35,19 +58,55 @@ def make_project_dirs_files(proj_data: dict) -> None:
     checklist_path = Path(job_dir, consts.JOB_DIRS[1], checklist_name)
     config_path = Path(job_dir, config_name)
 
-    file_gen.create_takeoff_file(consts.TAKEOFF_PATH, takeoff_path, proj_data)
-    file_gen.create_checklist_file(consts.CHECKLIST_PATH, checklist_path, proj_data)
+    jobs = [
+        ['takeoff', mirror_handler.get_local_path(consts.TAKEOFF_PATH), takeoff_path],
+        ['checklist', mirror_handler.get_local_path(consts.CHECKLIST_PATH), checklist_path]
+    ]
     if proj_data['config']:
-        file_gen.create_config_file(consts.CONFIG_PATH, config_path, proj_data)
+        jobs.append(['config', mirror_handler.get_local_path(consts.CONFIG_PATH), config_path])
+    return jobs
+
 
+def make_project_dirs_files(proj_data: dict) -> dict:
+    """
+    Create project directories and generate the project files concurrently.
+
+    :param proj_data: data for the project
+    :return: file kind, error message (None on success) pairs
+    """
+    job_dir = get_job_dir(proj_data)
+    proj_data['job-path'] = str(Path(job_dir))
+    make_job_subdirs(job_dir)
+    jobs = get_file_jobs(proj_data, job_dir)
+    return file_gen.create_files(jobs, proj_data, consts.WORKBOOK_BACKEND)
+
+
+def check_file_results(results: dict) -> None:
+    """
+    Raise an error listing the created and failed files if any file could not be created.
 
-def update_quote_log(proj_data):
+    :param results: file kind, error message (None on success) pairs
+    """
+    failed = {kind: error for kind, error in results.items() if error}
+    if not failed:
+        return
+    created = [kind for kind, error in results.items() if not error]
+    errors = '\n'.join(f"- {kind}: {error}" for kind, error in failed.items())
+    raise Exception(f"Error: Unable to create the {', '.join(failed)} file(s):\n{errors}\n"
+                    f"Created: {', '.join(created) or 'none'}.")
+
+
+def update_quote_log(proj_data, session: ExcelSession = None):
     """
     Add the project information to the Quote Log.
 
     :param proj_data: data for the project
+    :param session: Excel session shared by the run
     """
-    file_gen.update_quote_log(consts.QUOTE_LOG_PATH, proj_data)
+    backend = get_backend(consts.WORKBOOK_BACKEND, session)
+    if not backend.in_place:
+        backend = get_backend(session=session)
+    file_gen.update_quote_log(consts.QUOTE_LOG_PATH, proj_data, backend)
 
 
 def update_keys_for_elements(data_keys: dict):
@@ -63,19 +122,6 @@ def update_keys_for_elements(data_keys: dict):
     })
 
 
-def generate_elements_with_keys(data: dict) -> list:
-    """
-    Append keys to their respective elements.
-
-    :param data: keys entered by the user in the app interface
-    :return: elements for the project
-    """
-    update_keys_for_elements(data)
-    elements = elem_handler.get_elements()
-    list_handler.add_keys_to_elements(data, elements, start=4, term_str=Keys.TAB)
-    return elements
-
-
 def get_proj_id(data: list) -> str:
     """
     Find and return the id of the current project.
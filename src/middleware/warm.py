@@ -0,0 +1,139 @@
+import consts
+from contextlib import contextmanager
+from threading import Thread, Event, Lock
+from utility import cookie_cache
+from middleware.session import is_alive, is_logged_in, login
+from middleware.middleware import get_controller
+
+"""
+Browser kept open and logged in between runs.
+
+A background thread reloads the new proposal form every HEALTH_INTERVAL seconds while the browser
+is idle. The reload keeps the NetSuite session active, and the thread logs in again if the session
+has expired, so the next run starts directly at the form.
+"""
+
+HEALTH_INTERVAL = 300
+
+
+class WarmController:
+    """
+    Owns a WebController that stays logged in while the app is open.
+
+        Attributes:
+        controller (WebController): The kept browser, None until the first run.
+        fast (bool): A boolean indicating whether the kept browser was started with the fast profile.
+        logged_in (bool): A boolean indicating whether the controller is logged in.
+        interval (float): The time (in seconds) between two health checks.
+        lock (Lock): Held while a run or a health check is using the controller.
+        stopped (Event): Set when the controller is closed to stop the health check.
+    """
+
+    def __init__(self, interval: float = HEALTH_INTERVAL):
+        self.controller = None
+        self.fast = False
+        self.logged_in = False
+        self.interval = interval
+        self.lock = Lock()
+        self.stopped = Event()
+        self.thread = None
+
+    @contextmanager
+    def session(self, wait: float, fast: bool = False):
+        """
+        Lend the logged in controller to a run, starting the browser and logging in if needed.
+
+        :param wait: delay (in seconds) before executing each action
+        :param fast: use the fast profile, see get_controller
+        :return: context manager yielding the logged in controller
+        """
+        with self.lock:
+            self.prepare(wait, fast)
+            try:
+                yield self.controller
+            except Exception:
+                self.logged_in = False
+                raise
+        self.start_health_check()
+
+    def prepare(self, wait: float, fast: bool = False):
+        """
+        Make sure the controller is running and logged in. Must be called with the lock held.
+
+        :param wait: delay (in seconds) before executing each action
+        :param fast: use the fast profile, restarting the browser if it was started with the other profile
+        """
+        if self.controller and (self.fast != fast or not is_alive(self.controller)):
+            self.quit_controller()
+        if self.controller is None:
+            self.controller = get_controller([consts.NETSUITE_URL], wait, fast=fast)
+            self.fast = fast
+            self.logged_in = False
+        self.controller.wait = wait
+        if not self.logged_in:
+            self.logged_in = is_logged_in(self.controller)
+        if not self.logged_in:
+            login(self.controller)
+            self.logged_in = True
+            cookie_cache.save_cookies(self.controller)
+
+    def check(self):
+        """
+        Reload the new proposal form and log in again if the session expired. Skipped during a run.
+        """
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            if self.controller is None:
+                return
+            if not is_alive(self.controller):
+                self.quit_controller()
+                return
+            self.logged_in = is_logged_in(self.controller)
+            if not self.logged_in:
+                login(self.controller)
+                self.logged_in = True
+        except Exception:
+            self.logged_in = False
+        finally:
+            self.lock.release()
+
+    def health_check(self):
+        """
+        Run the check every interval until the controller is closed.
+        """
+        while not self.stopped.wait(self.interval):
+            self.check()
+
+    def start_health_check(self):
+        """
+        Start the health check thread if it is not running yet.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped.clear()
+            self.thread = Thread(target=self.health_check, daemon=True)
+            self.thread.start()
+
+    def quit_controller(self):
+        """
+        Quit the browser.
+        """
+        try:
+            self.controller.quit()
+        except Exception:
+            pass
+        self.controller = None
+        self.logged_in = False
+
+    def close(self):
+        """
+        Stop the health check and quit the browser.
+        """
+        self.stopped.set()
+        locked = self.lock.acquire(timeout=5)
+        try:
+            if self.controller:
+                self.quit_controller()
+        finally:
+            if locked:
+                self.lock.release()
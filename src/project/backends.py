@@ -0,0 +1,338 @@
+import zipfile
+from pathlib import Path
+from project import xml_patcher
+from utility import excel_handler
+from project.excel_session import ExcelSession, client
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class WorkbookBackend:
+    """
+    Interface used by the file generator to open, fill and save Excel workbooks.
+
+    Subclasses only implement the primitive workbook operations; placeholder search and replacement
+    is done by utility.excel_handler on an in-memory array of the sheet values.
+    """
+
+    name = None
+    in_place = True
+
+    def open(self, src: Path):
+        """
+        Open and return the workbook at the given path.
+
+        :param src: path of the Excel workbook
+        """
+        raise NotImplementedError
+
+    def get_sheet(self, wb, index: int = 1):
+        """
+        Return the worksheet at the given one based index.
+
+        :param wb: workbook object returned by open
+        :param index: one based index of the worksheet
+        """
+        raise NotImplementedError
+
+    def read_values(self, sheet) -> tuple:
+        """
+        Read all the used cell values of the sheet.
+
+        :param sheet: worksheet object returned by get_sheet
+        :return: row, column indices of the top left cell and a two-dimensional array of values
+        """
+        raise NotImplementedError
+
+    def write_cells(self, sheet, changes: dict):
+        """
+        Write the new values to the given cells.
+
+        :param sheet: worksheet object returned by get_sheet
+        :param changes: (row, column), new value pairs
+        """
+        raise NotImplementedError
+
+    def add_hyperlink(self, sheet, row: int, col: int, address: str):
+        """
+        Turn the given cell into a hyperlink.
+
+        :param sheet: worksheet object returned by get_sheet
+        :param row: row index of the cell
+        :param col: column index of the cell
+        :param address: target of the hyperlink
+        """
+        raise NotImplementedError
+
+    def save(self, wb):
+        """
+        Save the workbook in place.
+
+        :param wb: workbook object returned by open
+        """
+        raise NotImplementedError
+
+    def save_as_xlsm(self, wb, dest: Path):
+        """
+        Save the workbook as a macro-enabled workbook (xlsm).
+
+        :param wb: workbook object returned by open
+        :param dest: destination path, the extension is replaced with xlsm
+        """
+        raise NotImplementedError
+
+    def close(self, wb):
+        """
+        Close the workbook without saving.
+
+        :param wb: workbook object returned by open
+        """
+
+    def get_cells_with_values(self, sheet, values) -> dict:
+        """
+        Get the indices of the cells containing the given values.
+
+        :param sheet: worksheet containing the cells
+        :param values: values to look for in the cells
+        :return: value, (row, column) indices pairs for the values found
+        """
+        return excel_handler.get_cells_with_values(sheet, values, self.read_values)
+
+    def change_cells_with_values(self, sheet, key_value_pairs, cells: dict = None):
+        """
+        Change all the cells containing specific values with the new values.
+
+        :param sheet: worksheet containing the cells
+        :param key_value_pairs: value, new value pairs
+        :param cells: known value, (row, column) indices pairs, the sheet is searched if not given
+        """
+        excel_handler.change_cells_with_values(sheet, key_value_pairs, cells, self.read_values, self.write_cells)
+
+    def change_adjacent_cells_with_values(self, sheet, key_value_pairs, cells: dict = None):
+        """
+        Change all the cells adjacent to the cells containing specific values with the new values.
+
+        :param sheet: worksheet containing the cells
+        :param key_value_pairs: value, new value pairs
+        :param cells: known value, (row, column) indices pairs, the sheet is searched if not given
+        """
+        excel_handler.change_adjacent_cells_with_values(sheet, key_value_pairs, cells, self.read_values,
+                                                        self.write_cells)
+
+    def get_last_empty_row(self, sheet, column: int) -> int:
+        """
+        Find and return the row index of the first empty cell after the last value in a column.
+
+        :param sheet: worksheet containing the cells
+        :param column: column used to identify the last row
+        :return: row index of the first empty cell
+        """
+        first_row, first_col, array = self.read_values(sheet)
+        for i in range(len(array) - 1, -1, -1):
+            if 0 <= column - first_col < len(array[i]) and array[i][column - first_col] is not None:
+                return first_row + i + 1
+
+    def fill_row_with_values(self, sheet, row: int, values: list):
+        """
+        Populate the given row with the given values, starting from the second column.
+
+        :param sheet: worksheet containing the cells
+        :param row: index of the row to be populated
+        :param values: values that the row is to be populated with
+        """
+        self.write_cells(sheet, {(row, col + 2): value for col, value in enumerate(values)})
+        for col, value in enumerate(values):
+            if Path(str(value)).is_dir():
+                self.add_hyperlink(sheet, row, col + 2, str(value))
+
+
+class ComBackend(WorkbookBackend):
+    """
+    Workbook backend driving a local Excel installation through COM (Windows only).
+
+    All workbooks are opened in the Excel process of the given session, which is started on first use.
+    """
+
+    name = 'com'
+
+    def __init__(self, session: ExcelSession = None):
+        self.session = session or ExcelSession()
+
+    def open(self, src: Path):
+        return self.session.open_workbook(src)
+
+    def get_sheet(self, wb, index: int = 1):
+        return wb.Worksheets(index)
+
+    def read_values(self, sheet) -> tuple:
+        return excel_handler.get_used_range_values(sheet)
+
+    def write_cells(self, sheet, changes: dict):
+        excel_handler.write_cells(sheet, changes)
+
+    def add_hyperlink(self, sheet, row: int, col: int, address: str):
+        sheet.Hyperlinks.Add(Anchor=sheet.Cells(row, col), Address=address, TextToDisplay=address)
+
+    def get_last_empty_row(self, sheet, column: int) -> int:
+        return excel_handler.get_last_empty_row(sheet, column)
+
+    def save(self, wb):
+        self.session.restore()
+        wb.Save()
+
+    def save_as_xlsm(self, wb, dest: Path):
+        self.session.restore()
+        filename = str(dest.parent / (dest.stem + '.xlsm'))
+        wb.SaveAs(Filename=filename, FileFormat=52, CreateBackup=False)
+        wb.Close()
+
+    def close(self, wb):
+        self.session.restore()
+        wb.Close(SaveChanges=False)
+
+
+class OpenpyxlBackend(WorkbookBackend):
+    """
+    Pure Python workbook backend built on openpyxl, usable on hosts without Excel.
+
+    Macros are preserved with keep_vba. Features openpyxl does not round-trip (charts, images, form
+    controls) are dropped on save, so templates relying on them should stay on the COM backend.
+    """
+
+    name = 'openpyxl'
+
+    def open(self, src: Path):
+        wb = openpyxl.load_workbook(str(src), keep_vba=True)
+        wb.source_path = str(src)
+        return wb
+
+    def get_sheet(self, wb, index: int = 1):
+        return wb.worksheets[index - 1]
+
+    def read_values(self, sheet) -> tuple:
+        values = tuple(sheet.iter_rows(min_row=sheet.min_row, min_col=sheet.min_column, values_only=True))
+        return sheet.min_row, sheet.min_column, values
+
+    def write_cells(self, sheet, changes: dict):
+        for (row, col), value in changes.items():
+            sheet.cell(row=row, column=col).value = value
+
+    def add_hyperlink(self, sheet, row: int, col: int, address: str):
+        sheet.cell(row=row, column=col).hyperlink = address
+
+    def save(self, wb):
+        wb.save(wb.source_path)
+
+    def save_as_xlsm(self, wb, dest: Path):
+        wb.template = False
+        wb.save(str(dest.parent / (dest.stem + '.xlsm')))
+        wb.close()
+
+    def close(self, wb):
+        wb.close()
+
+
+class XmlBackend(WorkbookBackend):
+    """
+    Template fast path that rewrites the worksheet and shared strings XML of the archive directly.
+
+    Neither Excel nor openpyxl is involved and every untouched part is copied as is, so it only
+    supports generating new workbooks from templates; in place updates such as the quote log need
+    another backend.
+    """
+
+    name = 'xml'
+    in_place = False
+
+    def open(self, src: Path):
+        with zipfile.ZipFile(src) as archive:
+            names = archive.namelist()
+            strings = []
+            if xml_patcher.SHARED_STRINGS in names:
+                strings = xml_patcher.read_shared_strings(archive.read(xml_patcher.SHARED_STRINGS).decode('utf-8'))
+            paths = xml_patcher.get_sheet_paths(archive)
+            sheets = {path: archive.read(path).decode('utf-8') for path in paths}
+        return {'src': src, 'paths': paths, 'sheets': sheets, 'strings': strings, 'count': len(strings),
+                'changed': set()}
+
+    def get_sheet(self, wb, index: int = 1):
+        return {'wb': wb, 'path': wb['paths'][index - 1]}
+
+    def read_values(self, sheet) -> tuple:
+        cells = {}
+        for row, col, value in xml_patcher.iter_cells(self.get_sheet_xml(sheet), sheet['wb']['strings']):
+            cells[(row, col)] = value
+        if not cells:
+            return 1, 1, ()
+        first_row, last_row = min(row for row, _ in cells), max(row for row, _ in cells)
+        first_col, last_col = min(col for _, col in cells), max(col for _, col in cells)
+        values = tuple(tuple(cells.get((row, col)) for col in range(first_col, last_col + 1))
+                       for row in range(first_row, last_row + 1))
+        return first_row, first_col, values
+
+    def get_cells_with_values(self, sheet, values) -> dict:
+        values = [value for value in values if isinstance(value, str)]
+        return xml_patcher.find_cells(self.get_sheet_xml(sheet), sheet['wb']['strings'], values)
+
+    def write_cells(self, sheet, changes: dict):
+        wb, path = sheet['wb'], sheet['path']
+        for (row, col), value in changes.items():
+            wb['sheets'][path] = xml_patcher.set_cell(wb['sheets'][path], row, col, value, wb['strings'])
+        wb['changed'].add(path)
+
+    def save_as_xlsm(self, wb, dest: Path):
+        sheets = {path: wb['sheets'][path] for path in wb['changed']}
+        dest = dest.parent / (dest.stem + '.xlsm')
+        xml_patcher.write_patched_archive(wb['src'], dest, sheets, wb['strings'], wb['count'])
+
+    @staticmethod
+    def get_sheet_xml(sheet) -> str:
+        """
+        Return the current XML of the given worksheet.
+
+        :param sheet: worksheet object returned by get_sheet
+        :return: worksheet XML
+        """
+        return sheet['wb']['sheets'][sheet['path']]
+
+
+BACKENDS = {
+    ComBackend.name: ComBackend,
+    OpenpyxlBackend.name: OpenpyxlBackend,
+    XmlBackend.name: XmlBackend,
+}
+
+
+def resolve_backend_name(name: str = None) -> str:
+    """
+    Resolve the configured backend name to an available backend.
+
+    :param name: 'com', 'openpyxl', 'xml' or 'auto'/None to pick COM when Excel automation is available
+    :return: name of the backend to use
+    """
+    if not name or name == 'auto':
+        name = ComBackend.name if client else OpenpyxlBackend.name
+    if name not in BACKENDS:
+        raise Exception(f"Error: Unknown workbook backend '{name}'. Expected one of: {', '.join(BACKENDS)}.")
+    if name == ComBackend.name and not client:
+        raise Exception("Error: The 'com' workbook backend requires pywin32 and Microsoft Excel.")
+    if name == OpenpyxlBackend.name and not openpyxl:
+        raise Exception("Error: The 'openpyxl' workbook backend requires the openpyxl package.")
+    return name
+
+
+def get_backend(name: str = None, session: ExcelSession = None) -> WorkbookBackend:
+    """
+    Return the workbook backend with the given name.
+
+    :param name: 'com', 'openpyxl', 'xml' or 'auto'/None to pick COM when Excel automation is available
+    :param session: Excel session shared by the COM backend, a private one is used if not given
+    :return: instance of the workbook backend
+    """
+    name = resolve_backend_name(name)
+    if name == ComBackend.name:
+        return ComBackend(session)
+    return BACKENDS[name]()
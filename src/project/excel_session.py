@@ -0,0 +1,130 @@
+import os
+import signal
+
+try:
+    import pythoncom
+    import win32process
+    import win32com.client as client
+except ImportError:
+    pythoncom = None
+    win32process = None
+    client = None
+
+XL_CALCULATION_MANUAL = -4135
+
+
+class ExcelSession:
+    """
+    Owns a private Excel process shared by all the workbook operations of a run.
+
+    Excel is only started when the first workbook is opened and is always quit on exit, so using the
+    session costs nothing when a non-COM backend is selected. The process is created with DispatchEx
+    so quitting it never touches an Excel window the user has open. A cancelled run ends the process
+    with terminate, which works from any thread as it does not go through COM.
+
+        Attributes:
+        excel (CDispatch): The Excel application object, None until started.
+        saved_state (tuple): ScreenUpdating, Calculation and EnableEvents values to restore after a fill.
+        pid (int): The id of the Excel process, None until started.
+        terminated (bool): A boolean indicating whether the process was ended by terminate.
+    """
+
+    def __init__(self):
+        self.excel = None
+        self.saved_state = None
+        self.pid = None
+        self.terminated = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.quit()
+
+    def start(self):
+        """
+        Start Excel if it is not running yet and return the application object.
+
+        :return: Excel application object
+        """
+        if self.excel is None:
+            pythoncom.CoInitialize()
+            self.excel = client.DispatchEx('Excel.Application')
+            self.excel.Visible = False
+            self.excel.DisplayAlerts = False
+            _, self.pid = win32process.GetWindowThreadProcessId(self.excel.Hwnd)
+        return self.excel
+
+    def open_workbook(self, src):
+        """
+        Open a workbook and suspend screen updating, recalculation and events while it is filled.
+
+        :param src: path of the Excel workbook
+        :return: Excel workbook object
+        """
+        excel = self.start()
+        wb = excel.Workbooks.Open(str(src), UpdateLinks=False)
+        self.suspend()
+        return wb
+
+    def suspend(self):
+        """
+        Turn off screen updating, automatic calculation and events, remembering their values.
+        """
+        if self.saved_state is not None:
+            return
+        self.saved_state = (self.excel.ScreenUpdating, self.excel.Calculation, self.excel.EnableEvents)
+        self.excel.ScreenUpdating = False
+        self.excel.Calculation = XL_CALCULATION_MANUAL
+        self.excel.EnableEvents = False
+
+    def restore(self):
+        """
+        Restore the values changed by suspend. Called before saving so the calculation mode is not
+        persisted in the saved workbook.
+        """
+        if self.saved_state is None:
+            return
+        screen_updating, calculation, events = self.saved_state
+        self.saved_state = None
+        self.excel.Calculation = calculation
+        self.excel.ScreenUpdating = screen_updating
+        self.excel.EnableEvents = events
+
+    def terminate(self):
+        """
+        End the Excel process without going through COM, e.g. from the thread cancelling the run. The
+        workbooks left open are discarded.
+        """
+        pid = self.pid
+        if pid is None:
+            return
+        self.terminated = True
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+    def quit(self):
+        """
+        Close any workbook left open without saving and quit Excel.
+        """
+        if self.excel is None:
+            return
+        if self.terminated:
+            self.excel = None
+            self.saved_state = None
+            self.pid = None
+            pythoncom.CoUninitialize()
+            return
+        try:
+            for wb in list(self.excel.Workbooks):
+                wb.Close(SaveChanges=False)
+        finally:
+            try:
+                self.excel.Quit()
+            finally:
+                self.excel = None
+                self.saved_state = None
+                self.pid = None
+                pythoncom.CoUninitialize()
@@ -1,78 +1,140 @@
 import datetime
-import win32wnet
-import pythoncom
-import pywintypes
 from pathlib import Path
-from utility.excel_handler import *
-import win32com.client as client
+from project.excel_session import ExcelSession
+from project.template_index import get_template_cells
+from concurrent.futures import ThreadPoolExecutor
+from project.backends import get_backend, resolve_backend_name, WorkbookBackend, ComBackend
 
 
-def create_takeoff_file(src: Path, dest: Path, proj_data: dict):
+ID_PLACEHOLDERS = ['XXXX', 'PROPOSAL-URL', 'PROJECT#', 'Project Number:']
+ADJACENT_KINDS = ['checklist', 'config']
+
+
+def get_key_value_pairs(kind: str, proj_data: dict) -> list:
+    """
+    Return the placeholders of a template and the values replacing them.
+
+    :param kind: 'takeoff', 'checklist' or 'config'
+    :param proj_data: object containing project information
+    :return: placeholder, new value pairs
+    """
+    if kind == 'takeoff':
+        today_date = datetime.datetime.today().strftime('%d-%m-%Y')
+        return [
+            ['XXXX', proj_data['id']],
+            ['TODAYSDATE', today_date],
+            ['NAMEHERE', proj_data['rep']],
+            ['CLIENT', proj_data['client']],
+            ['PROJECT NAME', proj_data['name']],
+            ['PROJECT TYPE', proj_data['type']],
+            ['PROPOSAL-URL', proj_data['url']]
+        ]
+    if kind == 'checklist':
+        return [['PROJECT#', proj_data['id']]]
+    return [
+        ['Project Number:', proj_data['id']],
+        ['Project Name:', proj_data['name']]
+    ]
+
+
+def fill_template(template: dict, key_value_pairs: list, backend: WorkbookBackend):
+    """
+    Write the given values into the cells of their placeholders, or next to them for the checklist and config.
+
+    :param template: template opened by open_template
+    :param key_value_pairs: placeholder, new value pairs
+    :param backend: workbook backend the template was opened with
+    """
+    if template['kind'] in ADJACENT_KINDS:
+        backend.change_adjacent_cells_with_values(template['ws'], key_value_pairs, template['cells'])
+    else:
+        backend.change_cells_with_values(template['ws'], key_value_pairs, template['cells'])
+
+
+def open_template(kind: str, src: Path, proj_data: dict, backend: WorkbookBackend) -> dict:
+    """
+    Open a template and fill the placeholders that do not depend on the project id or URL.
+
+    :param kind: 'takeoff', 'checklist' or 'config'
+    :param src: source path of the template file
+    :param proj_data: object containing project information, the id and URL may be missing
+    :param backend: workbook backend to use
+    :return: the kind, workbook, worksheet and placeholder cells of the template
+    """
+    key_value_pairs = get_key_value_pairs(kind, proj_data)
+    wb = backend.open(src)
+    ws = backend.get_sheet(wb, 1)
+    cells = get_template_cells(backend, src, ws, [key for key, _ in key_value_pairs])
+    template = {'kind': kind, 'wb': wb, 'ws': ws, 'cells': cells}
+    fill_template(template, [pair for pair in key_value_pairs if pair[0] not in ID_PLACEHOLDERS], backend)
+    return template
+
+
+def save_template(template: dict, dest: Path, proj_data: dict, backend: WorkbookBackend):
+    """
+    Fill the project id and URL of an opened template and save it as xlsm.
+
+    :param template: template opened by open_template
+    :param dest: destination to save the xlsm file in
+    :param proj_data: object containing project information
+    :param backend: workbook backend the template was opened with
+    """
+    key_value_pairs = get_key_value_pairs(template['kind'], proj_data)
+    fill_template(template, [pair for pair in key_value_pairs if pair[0] in ID_PLACEHOLDERS], backend)
+    backend.save_as_xlsm(template['wb'], dest)
+
+
+def create_takeoff_file(src: Path, dest: Path, proj_data: dict, backend: WorkbookBackend = None):
     """
     Copy the takeoff template file, add information to it and save it as xlsm.
 
     :param src: source path of the template file
     :param dest: destination to save the xlsm file in
     :param proj_data: object containing project information
+    :param backend: workbook backend to use, picked automatically if not given
     """
-    today_date = datetime.datetime.today().strftime('%d-%m-%Y')
-    key_value_pairs = [
-        ['XXXX', proj_data['id']],
-        ['TODAYSDATE', today_date],
-        ['NAMEHERE', proj_data['rep']],
-        ['CLIENT', proj_data['client']],
-        ['PROJECT NAME', proj_data['name']],
-        ['PROJECT TYPE', proj_data['type']],
-        ['PROPOSAL-URL', proj_data['url']]
-    ]
-    takeoff_wb = get_excel_workbook(src)
-    takeoff_ws = takeoff_wb.Worksheets(1)
-    change_cells_with_values(takeoff_ws, key_value_pairs)
-    save_as_xlsm(takeoff_wb, dest)
+    backend = backend or get_backend()
+    save_template(open_template('takeoff', src, proj_data, backend), dest, proj_data, backend)
 
 
-def create_checklist_file(src: Path, dest: Path, proj_data: dict):
+def create_checklist_file(src: Path, dest: Path, proj_data: dict, backend: WorkbookBackend = None):
     """
     Copy the checklist template file, add information to it and save it as xlsm.
 
     :param src: source path of the template file
     :param dest: destination to save the xlsm file in
     :param proj_data: object containing project information
+    :param backend: workbook backend to use, picked automatically if not given
     """
-    checklist_wb = get_excel_workbook(src)
-    checklist_ws = checklist_wb.Worksheets(1)
-    change_adjacent_cell(checklist_ws, 'PROJECT#', proj_data['id'])
-    save_as_xlsm(checklist_wb, dest)
+    backend = backend or get_backend()
+    save_template(open_template('checklist', src, proj_data, backend), dest, proj_data, backend)
 
 
-def create_config_file(src: Path, dest: Path, proj_data: dict):
+def create_config_file(src: Path, dest: Path, proj_data: dict, backend: WorkbookBackend = None):
     """
     Copy the configurator template file, add information to it and save it as xlsm.
 
     :param src: source path of the template file
     :param dest: destination to save the xlsm file in
     :param proj_data: object containing project information
+    :param backend: workbook backend to use, picked automatically if not given
     """
-    key_value_pairs = [
-        ['Project Number:', proj_data['id']],
-        ['Project Name:', proj_data['name']]
-    ]
-    config_wb = get_excel_workbook(src)
-    config_ws = config_wb.Worksheets(1)
-    change_adjacent_cells_with_values(config_ws, key_value_pairs)
-    save_as_xlsm(config_wb, dest)
+    backend = backend or get_backend()
+    save_template(open_template('config', src, proj_data, backend), dest, proj_data, backend)
 
 
-def update_quote_log(path, proj_data):
+def update_quote_log(path, proj_data, backend: WorkbookBackend = None):
     """
     Add a row entry for the project in the Quote Log.
 
     :param path: full path of the Quote Log file
     :param proj_data: object containing project information
+    :param backend: workbook backend to use, picked automatically if not given
     """
-    ql_wb = get_excel_workbook(path)
-    ql_ws = ql_wb.Worksheets(1)
-    last_row = get_last_empty_row(ql_ws, 3)
+    backend = backend or get_backend()
+    ql_wb = backend.open(path)
+    ql_ws = backend.get_sheet(ql_wb, 1)
+    last_row = backend.get_last_empty_row(ql_ws, 3)
     today_date = datetime.datetime.today().strftime('%d-%b-%y')
     row_data = [
         today_date,
@@ -83,34 +145,67 @@ def update_quote_log(path, proj_data):
         'TBD',
         proj_data['rep']
     ]
-    fill_row_with_values(ql_ws, last_row, row_data)
+    backend.fill_row_with_values(ql_ws, last_row, row_data)
     try:
-        ql_wb.Save()
+        backend.save(ql_wb)
     except:
         raise Exception("Error: Unable to save the quote log. It may be in use by another user or application. Please "
                         "try again.")
-    ql_wb.Close()
+    backend.close(ql_wb)
 
 
-def save_as_xlsm(wb, dest: Path):
+def create_file(kind: str, src: Path | str, dest: Path | str, proj_data: dict, backend_name: str,
+                session: ExcelSession = None) -> str:
     """
-    Save the given xltm file as xlsm.
+    Create a single project file with its own backend.
 
-    :param wb: source Excel Workbook object
-    :param dest: destination path to save the xlsm file as
+    :param kind: 'takeoff', 'checklist' or 'config'
+    :param src: source path of the template file
+    :param dest: destination to save the xlsm file in
+    :param proj_data: object containing project information
+    :param backend_name: name of the workbook backend
+    :param session: Excel session used by the COM backend, a session of the file otherwise
+    :return: error message or None if the file was created
     """
-    filename = str(dest.parent / (dest.stem + '.xlsm'))
-    wb.SaveAs(Filename=filename, FileFormat=52, CreateBackup=False)
-    wb.Close()
+    creators = {
+        'takeoff': create_takeoff_file,
+        'checklist': create_checklist_file,
+        'config': create_config_file,
+    }
+    try:
+        if session:
+            creators[kind](Path(src), Path(dest), proj_data, get_backend(backend_name, session))
+            return None
+        with ExcelSession() as own_session:
+            creators[kind](Path(src), Path(dest), proj_data, get_backend(backend_name, own_session))
+    except Exception as ex:
+        return str(ex) or type(ex).__name__
 
 
-def get_excel_workbook(src: Path):
+def create_files(jobs: list, proj_data: dict, backend_name: str = None) -> dict:
     """
-    Open and return the Excel workbook.
+    Create the given project files.
 
-    :param src: path of the Excel workbook
+    COM jobs run one after the other in a single Excel process, started once for the run, as Excel serves
+    one COM call at a time anyway. openpyxl and xml jobs run on threads, which file_gen_bench measured
+    faster than worker processes: a process pays its start and imports before it opens a template.
+
+    :param jobs: kind, template path, destination path triplets
+    :param proj_data: object containing project information
+    :param backend_name: name of the workbook backend
+    :return: kind, error message (None on success) pairs in job order
     """
-    app, command = 'Excel.Application', pythoncom.CoInitialize
-    excel = client.Dispatch(app, command())
-    excel.DisplayAlerts = False
-    return excel.Workbooks.Open(str(src), UpdateLinks=False)
+    backend_name = resolve_backend_name(backend_name)
+    if backend_name == ComBackend.name:
+        with ExcelSession() as session:
+            return {kind: create_file(kind, src, dest, proj_data, backend_name, session) for kind, src, dest in jobs}
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = [(kind, executor.submit(create_file, kind, str(src), str(dest), proj_data, backend_name))
+                   for kind, src, dest in jobs]
+    results = {}
+    for kind, future in futures:
+        try:
+            results[kind] = future.result()
+        except Exception as ex:
+            results[kind] = str(ex) or type(ex).__name__
+    return results
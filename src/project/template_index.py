@@ -0,0 +1,168 @@
+import os
+import json
+import consts
+from pathlib import Path
+from threading import Lock, get_ident
+from utility.mirror_handler import get_file_hash
+
+"""
+Persistent index of where the placeholders live in each template.
+
+Entries are keyed by the template path and validated by its modification time and size; the
+content hash is only computed when those change, so a touched but identical template keeps its entry.
+Saving merges the changed entries into the index on disk, so files generated in parallel do not drop
+each other's entries.
+"""
+
+INDEX_LOCK = Lock()
+
+
+def get_index_path() -> Path:
+    """
+    Return the path of the index file.
+
+    :return: path of the index file in the cache directory
+    """
+    return Path(consts.CACHE_DIR, 'template_index.json')
+
+
+def load_index() -> dict:
+    """
+    Load the index from disk.
+
+    :return: template path, entry pairs
+    """
+    try:
+        with open(get_index_path(), encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def merge_entry(old: dict, new: dict) -> dict:
+    """
+    Merge the cells of two entries describing the same template contents.
+
+    :param old: entry currently in the index
+    :param new: entry to be saved
+    :return: new entry, with the cells of the old one added if the template is unchanged
+    """
+    if not old or old['hash'] != new['hash']:
+        return new
+    for sheet, cells in old['sheets'].items():
+        new['sheets'][sheet] = {**cells, **new['sheets'].get(sheet, {})}
+    for sheet, missing in old['missing'].items():
+        found = new['sheets'].get(sheet, {})
+        merged = set(missing) | set(new['missing'].get(sheet, []))
+        new['missing'][sheet] = sorted(value for value in merged if value not in found)
+    return new
+
+
+def save_index(changes: dict):
+    """
+    Merge the changed entries into the index on disk and write it atomically, so concurrent writers never
+    leave a partial file or drop the entries of other templates.
+
+    :param changes: template path, entry pairs
+    """
+    path = get_index_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{get_ident()}.tmp')
+    with INDEX_LOCK:
+        index = load_index()
+        for key, entry in changes.items():
+            index[key] = merge_entry(index.get(key), entry)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(index, file)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+def get_valid_entry(index: dict, src: Path | str) -> dict:
+    """
+    Return the entry of the template if it still describes the file on disk.
+
+    :param index: template path, entry pairs
+    :param src: path of the template
+    :return: entry of the template or None if missing or outdated
+    """
+    entry = index.get(str(src))
+    if not entry:
+        return None
+    stat = os.stat(src)
+    if entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+        return entry
+    if entry['size'] == stat.st_size and entry['hash'] == get_file_hash(src):
+        entry['mtime'] = stat.st_mtime
+        save_index({str(src): entry})
+        return entry
+    index.pop(str(src))
+    return None
+
+
+def lookup(src: Path | str, values: list, sheet: int = 1) -> dict:
+    """
+    Look up the cells of the given placeholders in the template.
+
+    :param src: path of the template
+    :param values: placeholders to look up
+    :param sheet: one based index of the worksheet
+    :return: placeholder, (row, column) indices pairs or None if any placeholder is not indexed
+    """
+    index = load_index()
+    entry = get_valid_entry(index, src)
+    if not entry:
+        return None
+    cells = entry['sheets'].get(str(sheet), {})
+    missing = entry['missing'].get(str(sheet), [])
+    if any(value not in cells and value not in missing for value in values):
+        return None
+    return {value: tuple(cells[value]) for value in values if value in cells}
+
+
+def store(src: Path | str, values: list, cells: dict, sheet: int = 1):
+    """
+    Record the cells found for the given placeholders in the template.
+
+    :param src: path of the template
+    :param values: placeholders that were searched for
+    :param cells: placeholder, (row, column) indices pairs found by the search
+    :param sheet: one based index of the worksheet
+    """
+    index = load_index()
+    entry = get_valid_entry(index, src)
+    if not entry:
+        stat = os.stat(src)
+        entry = {'mtime': stat.st_mtime, 'size': stat.st_size, 'hash': get_file_hash(src), 'sheets': {},
+                 'missing': {}}
+        index[str(src)] = entry
+    entry['sheets'].setdefault(str(sheet), {}).update({value: list(cell) for value, cell in cells.items()})
+    missing = set(entry['missing'].get(str(sheet), [])) | {value for value in values if value not in cells}
+    entry['missing'][str(sheet)] = sorted(missing)
+    save_index({str(src): entry})
+
+
+def get_template_cells(backend, src: Path | str, ws, values: list, sheet: int = 1) -> dict:
+    """
+    Return the cells of the given placeholders, scanning the worksheet only on an index miss.
+
+    :param backend: workbook backend the worksheet was opened with
+    :param src: path of the template
+    :param ws: worksheet object returned by the backend
+    :param values: placeholders to look up
+    :param sheet: one based index of the worksheet
+    :return: placeholder, (row, column) indices pairs
+    """
+    try:
+        cells = lookup(src, values, sheet)
+    except OSError:
+        cells = None
+    if cells is None:
+        cells = backend.get_cells_with_values(ws, values)
+        try:
+            store(src, values, cells, sheet)
+        except OSError:
+            pass
+    return cells
@@ -0,0 +1,380 @@
+import re
+import html
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+"""
+Helpers to fill an Excel template by rewriting its OOXML parts directly, without Excel or openpyxl.
+
+Cells are addressed with one based (row, column) indices like the other workbook backends.
+"""
+
+CONTENT_TYPES = '[Content_Types].xml'
+SHARED_STRINGS = 'xl/sharedStrings.xml'
+WORKBOOK = 'xl/workbook.xml'
+WORKBOOK_RELS = 'xl/_rels/workbook.xml.rels'
+SHARED_STRINGS_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'
+XLSM_MAIN_TYPE = 'application/vnd.ms-excel.sheet.macroEnabled.main+xml'
+WORKBOOK_MAIN_TYPES = [
+    'application/vnd.ms-excel.template.macroEnabled.main+xml',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.template.main+xml',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml',
+]
+
+CELL_REGEX = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+ROW_REGEX = r'<row\b[^>]*\br="{}"[^>]*?(?:/>|>(.*?)</row>)'
+ATTR_REGEX = r'\b{}="([^"]*)"'
+VALUE_REGEX = re.compile(r'<v>(.*?)</v>', re.S)
+STRING_CELL_REGEX = re.compile(r'<c\b[^>]*\bt="s"')
+# Children of <workbook> that follow <calcPr> in the schema, in schema order
+AFTER_CALC_PR = ['oleSize', 'customWorkbookViews', 'pivotCaches', 'smartTagPr', 'smartTagTypes', 'webPublishing',
+                 'fileRecoveryPr', 'webPublishObjects', 'extLst']
+
+
+def column_index(letters: str) -> int:
+    """
+    Convert column letters to a one based column index.
+
+    :param letters: column letters, e.g. 'AB'
+    :return: one based column index
+    """
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def column_letters(index: int) -> str:
+    """
+    Convert a one based column index to column letters.
+
+    :param index: one based column index
+    :return: column letters, e.g. 'AB'
+    """
+    letters = ''
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def split_reference(ref: str) -> tuple:
+    """
+    Split a cell reference into its row and column indices.
+
+    :param ref: cell reference, e.g. 'B12'
+    :return: row, column indices of the cell
+    """
+    match = re.match(r'([A-Z]+)(\d+)', ref)
+    return int(match.group(2)), column_index(match.group(1))
+
+
+def get_attr(attrs: str, name: str) -> str:
+    """
+    Return the value of an attribute from a raw attribute string.
+
+    :param attrs: raw attribute string of an XML tag
+    :param name: name of the attribute
+    :return: value of the attribute or None
+    """
+    match = re.search(ATTR_REGEX.format(name), attrs)
+    if match:
+        return match.group(1)
+
+
+def read_text(xml: str) -> str:
+    """
+    Return the concatenated text of the <t> runs in a string item, ignoring phonetic runs.
+
+    :param xml: inner XML of a <si> or <is> element
+    :return: unescaped text
+    """
+    xml = re.sub(r'<rPh\b.*?</rPh>', '', xml, flags=re.S)
+    return html.unescape(''.join(re.findall(r'<t\b[^>]*?(?:/>|>(.*?)</t>)', xml, re.S)))
+
+
+def read_shared_strings(xml: str) -> list:
+    """
+    Parse the shared strings table.
+
+    :param xml: content of xl/sharedStrings.xml
+    :return: shared strings in table order
+    """
+    return [read_text(item or '') for item in re.findall(r'<si\b[^>]*?(?:/>|>(.*?)</si>)', xml, re.S)]
+
+
+def get_sheet_paths(archive: zipfile.ZipFile) -> list:
+    """
+    Return the archive paths of the worksheets in workbook order.
+
+    :param archive: opened workbook archive
+    :return: archive paths of the worksheets
+    """
+    workbook = archive.read(WORKBOOK).decode('utf-8')
+    rels = archive.read(WORKBOOK_RELS).decode('utf-8')
+    targets = {}
+    for rel in re.findall(r'<Relationship\b([^>]*)/?>', rels):
+        targets[get_attr(rel, 'Id')] = get_attr(rel, 'Target')
+    paths = []
+    for sheet in re.findall(r'<sheet\b([^>]*)/?>', workbook):
+        target = targets[get_attr(sheet, 'r:id')]
+        paths.append(target.lstrip('/') if target.startswith('/') else f'xl/{target}')
+    return paths
+
+
+def iter_cells(xml: str, shared_strings: list):
+    """
+    Yield the constant values of the cells of a worksheet in document (row-major) order.
+
+    :param xml: content of the worksheet XML
+    :param shared_strings: parsed shared strings table
+    :return: generator of (row, column, value) tuples
+    """
+    for match in CELL_REGEX.finditer(xml):
+        attrs, inner = match.group(1), match.group(2) or ''
+        if '<f' in inner:
+            continue
+        cell_type = get_attr(attrs, 't')
+        if cell_type == 'inlineStr':
+            value = read_text(inner)
+        else:
+            raw = VALUE_REGEX.search(inner)
+            if not raw:
+                continue
+            value = raw.group(1)
+            if cell_type == 's':
+                value = shared_strings[int(value)]
+            elif cell_type in ('str', 'e'):
+                value = html.unescape(value)
+            elif cell_type == 'b':
+                value = value == '1'
+            else:
+                value = float(value)
+        row, col = split_reference(get_attr(attrs, 'r'))
+        yield row, col, value
+
+
+def find_cells(xml: str, shared_strings: list, values) -> dict:
+    """
+    Find the first cell holding each of the given strings without decoding the other cells.
+
+    :param xml: content of the worksheet XML
+    :param shared_strings: parsed shared strings table
+    :param values: string values to look for
+    :return: value, (row, column) indices pairs for the values found
+    """
+    remaining = set(values)
+    indices = {i: text for i, text in enumerate(shared_strings) if text in remaining}
+    found = {}
+    for match in CELL_REGEX.finditer(xml):
+        attrs, inner = match.group(1), match.group(2)
+        if not inner or '<f' in inner:
+            continue
+        if 't="s"' in attrs:
+            raw = VALUE_REGEX.search(inner)
+            value = indices.get(int(raw.group(1))) if raw else None
+        elif 't="inlineStr"' in attrs:
+            value = read_text(inner)
+        else:
+            continue
+        if value in remaining:
+            found[value] = split_reference(get_attr(attrs, 'r'))
+            remaining.discard(value)
+            if not remaining:
+                break
+    return found
+
+
+def build_cell(ref: str, attrs: str, value, shared_strings: list) -> str:
+    """
+    Build the XML of a cell holding a constant value, keeping its style.
+
+    :param ref: cell reference, e.g. 'B12'
+    :param attrs: raw attribute string of the existing cell, if any
+    :param value: new value of the cell
+    :param shared_strings: shared strings table, new strings are appended to it
+    :return: XML of the cell
+    """
+    style = get_attr(attrs, 's') if attrs else None
+    head = f'<c r="{ref}"' + (f' s="{style}"' if style else '')
+    if value is None or value == '':
+        return head + '/>'
+    if isinstance(value, bool):
+        return head + f' t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return head + f'><v>{value}</v></c>'
+    shared_strings.append(str(value))
+    return head + f' t="s"><v>{len(shared_strings) - 1}</v></c>'
+
+
+def set_cell(xml: str, row: int, col: int, value, shared_strings: list) -> str:
+    """
+    Replace or insert the cell at the given position of a worksheet.
+
+    :param xml: content of the worksheet XML
+    :param row: one based row index of the cell
+    :param col: one based column index of the cell
+    :param value: new value of the cell
+    :param shared_strings: shared strings table, new strings are appended to it
+    :return: patched worksheet XML
+    """
+    ref = f'{column_letters(col)}{row}'
+    row_match = re.search(ROW_REGEX.format(row), xml, re.S)
+    if not row_match:
+        return insert_row(xml, row, build_cell(ref, '', value, shared_strings))
+
+    row_start, row_end = row_match.span()
+    row_xml = row_match.group(0)
+    for cell in CELL_REGEX.finditer(row_xml):
+        cell_row, cell_col = split_reference(get_attr(cell.group(1), 'r'))
+        if cell_col == col:
+            new_cell = build_cell(ref, cell.group(1), value, shared_strings)
+            row_xml = row_xml[:cell.start()] + new_cell + row_xml[cell.end():]
+            break
+        if cell_col > col:
+            new_cell = build_cell(ref, '', value, shared_strings)
+            row_xml = row_xml[:cell.start()] + new_cell + row_xml[cell.start():]
+            break
+    else:
+        new_cell = build_cell(ref, '', value, shared_strings)
+        if row_xml.endswith('/>'):
+            row_xml = row_xml[:-2] + '>' + new_cell + '</row>'
+        else:
+            row_xml = row_xml[:-len('</row>')] + new_cell + '</row>'
+    row_xml = re.sub(r'\sspans="[^"]*"', '', row_xml, count=1)
+    return xml[:row_start] + row_xml + xml[row_end:]
+
+
+def insert_row(xml: str, row: int, cell_xml: str) -> str:
+    """
+    Insert a new row containing a single cell in row order.
+
+    :param xml: content of the worksheet XML
+    :param row: one based row index of the new row
+    :param cell_xml: XML of the cell in the new row
+    :return: patched worksheet XML
+    """
+    row_xml = f'<row r="{row}">{cell_xml}</row>'
+    for match in re.finditer(r'<row\b([^>]*)>', xml):
+        if int(get_attr(match.group(1), 'r')) > row:
+            return xml[:match.start()] + row_xml + xml[match.start():]
+    if '<sheetData/>' in xml:
+        return xml.replace('<sheetData/>', f'<sheetData>{row_xml}</sheetData>', 1)
+    return xml.replace('</sheetData>', row_xml + '</sheetData>', 1)
+
+
+def count_string_cells(xml: str) -> int:
+    """
+    Count the cells of a worksheet referencing the shared strings table.
+
+    :param xml: content of the worksheet XML
+    :return: number of shared string cells
+    """
+    return len(STRING_CELL_REGEX.findall(xml))
+
+
+def write_shared_strings(xml: str, shared_strings: list, count: int, references: int = None) -> str:
+    """
+    Append the new strings to the shared strings table and update its counts.
+
+    :param xml: original content of xl/sharedStrings.xml
+    :param shared_strings: shared strings table including the appended strings
+    :param count: number of strings in the original table
+    :param references: number of cells referencing the table in the workbook, the count attribute is kept if None
+    :return: patched shared strings XML
+    """
+    if references is not None:
+        xml = re.sub(r'(<sst\b[^>]*?\bcount=")\d+(")', rf'\g<1>{references}\2', xml, count=1)
+    items = ''
+    for text in shared_strings[count:]:
+        space = ' xml:space="preserve"' if text != text.strip() else ''
+        items += f'<si><t{space}>{escape(text)}</t></si>'
+    if not items:
+        return xml
+    xml = re.sub(r'(<sst\b[^>]*?)\s*/>', r'\1></sst>', xml, count=1)
+    xml = re.sub(r'(<sst\b[^>]*?\buniqueCount=")\d+(")', rf'\g<1>{len(shared_strings)}\2', xml, count=1)
+    return xml.replace('</sst>', items + '</sst>', 1)
+
+
+def patch_content_types(xml: str, has_shared_strings: bool) -> str:
+    """
+    Flip the workbook content type to a macro-enabled workbook.
+
+    :param xml: content of [Content_Types].xml
+    :param has_shared_strings: flag indicating if the archive already has a shared strings part
+    :return: patched content types XML
+    """
+    for main_type in WORKBOOK_MAIN_TYPES:
+        xml = xml.replace(main_type, XLSM_MAIN_TYPE)
+    if not has_shared_strings:
+        override = f'<Override PartName="/{SHARED_STRINGS}" ContentType="{SHARED_STRINGS_TYPE}"/>'
+        xml = xml.replace('</Types>', override + '</Types>', 1)
+    return xml
+
+
+def patch_workbook(xml: str) -> str:
+    """
+    Make Excel recalculate the formulas on open so cached results pick up the new values.
+
+    :param xml: content of xl/workbook.xml
+    :return: patched workbook XML
+    """
+    if re.search(r'<calcPr\b[^>]*\bfullCalcOnLoad=', xml):
+        return xml
+    if '<calcPr' in xml:
+        return re.sub(r'<calcPr\b', '<calcPr fullCalcOnLoad="1"', xml, count=1)
+    # Insert at its schema position, before the elements following it, as Excel repairs misordered workbooks
+    match = re.search(rf'<(\w+:)?(?:{"|".join(AFTER_CALC_PR)})\b', xml)
+    if match:
+        prefix = match.group(1) or ''
+        return xml[:match.start()] + f'<{prefix}calcPr fullCalcOnLoad="1"/>' + xml[match.start():]
+    match = re.search(r'</(\w+:)?workbook>', xml)
+    prefix = match.group(1) or ''
+    return xml[:match.start()] + f'<{prefix}calcPr fullCalcOnLoad="1"/>' + xml[match.start():]
+
+
+def patch_workbook_rels(xml: str) -> str:
+    """
+    Add the relationship to a newly created shared strings part.
+
+    :param xml: content of xl/_rels/workbook.xml.rels
+    :return: patched relationships XML
+    """
+    rel_type = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings'
+    rel = f'<Relationship Id="rIdSst1" Type="{rel_type}" Target="sharedStrings.xml"/>'
+    return xml.replace('</Relationships>', rel + '</Relationships>', 1)
+
+
+def write_patched_archive(src: Path, dest: Path, sheets: dict, shared_strings: list, count: int):
+    """
+    Copy the source archive to the destination, replacing the patched parts on the way.
+
+    :param src: path of the source workbook or template
+    :param dest: path of the workbook to write
+    :param sheets: archive path, patched worksheet XML pairs
+    :param shared_strings: shared strings table including the appended strings
+    :param count: number of strings in the original table
+    """
+    with zipfile.ZipFile(src) as archive, zipfile.ZipFile(dest, 'w', zipfile.ZIP_DEFLATED) as output:
+        names = archive.namelist()
+        has_shared_strings = SHARED_STRINGS in names
+        references = sum(count_string_cells(sheets[path] if path in sheets else archive.read(path).decode('utf-8'))
+                         for path in get_sheet_paths(archive) if path in names)
+        for info in archive.infolist():
+            data = archive.read(info.filename)
+            if info.filename in sheets:
+                data = sheets[info.filename].encode('utf-8')
+            elif info.filename == CONTENT_TYPES:
+                data = patch_content_types(data.decode('utf-8'), has_shared_strings).encode('utf-8')
+            elif info.filename == WORKBOOK:
+                data = patch_workbook(data.decode('utf-8')).encode('utf-8')
+            elif info.filename == SHARED_STRINGS:
+                data = write_shared_strings(data.decode('utf-8'), shared_strings, count, references).encode('utf-8')
+            elif info.filename == WORKBOOK_RELS and not has_shared_strings:
+                data = patch_workbook_rels(data.decode('utf-8')).encode('utf-8')
+            output.writestr(info, data)
+        if not has_shared_strings:
+            sst = ('<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="0" '
+                   'uniqueCount="0"></sst>')
+            output.writestr(SHARED_STRINGS, write_shared_strings(sst, shared_strings, count, references))
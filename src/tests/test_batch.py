@@ -0,0 +1,56 @@
+import openpyxl
+import pytest
+from middleware.batch import read_queue, check_queue_fields, get_row_data, get_missing_fields, get_results_path
+
+DEFAULTS = {'Customer': '', 'Project Scope': '', 'Site Name': 'Main', 'Configurator': False, 'Quote Log': True}
+
+
+def test_read_csv_queue_skips_empty_rows(tmp_path):
+    path = tmp_path / 'queue.csv'
+    path.write_text('Customer:, Project Scope ,Configurator\nAcme , Roof,yes\n,,\nBeta,,\n')
+    assert read_queue(path) == [
+        {'Customer': 'Acme', 'Project Scope': 'Roof', 'Configurator': 'yes'},
+        {'Customer': 'Beta', 'Project Scope': '', 'Configurator': ''},
+    ]
+
+
+def test_read_xlsx_queue_converts_values_to_text(tmp_path):
+    path = tmp_path / 'queue.xlsx'
+    wb = openpyxl.Workbook()
+    wb.active.append(['Customer', 'Project Scope'])
+    wb.active.append(['Acme', 12])
+    wb.active.append([None, None])
+    wb.active.append(['Beta', None])
+    wb.save(path)
+    assert read_queue(path) == [{'Customer': 'Acme', 'Project Scope': '12'}, {'Customer': 'Beta', 'Project Scope': ''}]
+
+
+def test_unsupported_and_empty_queues_are_rejected(tmp_path):
+    with pytest.raises(Exception, match='file type .txt is not supported'):
+        read_queue(tmp_path / 'queue.txt')
+    path = tmp_path / 'queue.csv'
+    path.write_text('')
+    with pytest.raises(Exception, match='queue.csv is empty'):
+        read_queue(path)
+
+
+def test_unknown_columns_are_rejected():
+    check_queue_fields([{'Customer': 'Acme'}], DEFAULTS)
+    with pytest.raises(Exception, match='unknown column\\(s\\) in the queue file: Colour'):
+        check_queue_fields([{'Customer': 'Acme', 'Colour': 'red'}], DEFAULTS)
+
+
+def test_row_values_override_the_app_values():
+    data = get_row_data(DEFAULTS, {'Customer': 'Acme', 'Site Name': '', 'Configurator': 'X', 'Quote Log': 'no'})
+    assert data == {'Customer': 'Acme', 'Project Scope': '', 'Site Name': 'Main', 'Configurator': True,
+                    'Quote Log': False}
+    assert DEFAULTS['Customer'] == ''
+
+
+def test_missing_fields_ignore_optional_and_boolean_fields():
+    assert get_missing_fields(get_row_data(DEFAULTS, {})) == ['Customer']
+    assert get_missing_fields(get_row_data(DEFAULTS, {'Customer': 'Acme'})) == []
+
+
+def test_results_are_written_next_to_the_queue(tmp_path):
+    assert get_results_path(tmp_path / 'queue.xlsx') == tmp_path / 'queue_results.csv'
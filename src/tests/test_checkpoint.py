@@ -0,0 +1,96 @@
+import consts
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from selenium.common.exceptions import WebDriverException
+from middleware.checkpoint import Checkpoint, get_run_key, is_record_url, load_checkpoint
+
+RECORD_URL = 'https://1234.app.netsuite.com/app/common/custom/custrecordentry.nl?rectype=207&id=1001'
+FORM_URL = 'https://1234.app.netsuite.com/app/common/custom/custrecordentry.nl?rectype=207'
+
+
+class FakeController:
+    def __init__(self, url: str, windows: int = 1, steps: int = 10):
+        self.url = url
+        self.windows = windows
+        self.plan = [None] * steps
+        self.data_handler = SimpleNamespace(database=[{'type': 'text', 'data-keys': 'P1001 Acme_Roof'}])
+
+    @property
+    def current_url(self):
+        if self.url is None:
+            raise WebDriverException('no such window')
+        return self.url
+
+    @property
+    def window_handles(self):
+        return [f'window{i}' for i in range(self.windows)]
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(consts, 'CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def record(url: str, windows: int = 1, next_index: int = 4) -> Checkpoint:
+    checkpoint = Checkpoint(get_run_key({'Customer': 'Acme'}))
+    checkpoint.record(FakeController(url, windows), SimpleNamespace(window=0), next_index)
+    return checkpoint
+
+
+def test_run_key_ignores_key_order_and_changes_with_values():
+    key = get_run_key({'Customer': 'Acme', 'Project Scope': 'Roof', 'Configurator': True})
+    assert key == get_run_key({'Configurator': True, 'Project Scope': 'Roof', 'Customer': 'Acme'})
+    assert key != get_run_key({'Customer': 'Acme', 'Project Scope': 'Wall', 'Configurator': True})
+    assert key != get_run_key({'Customer': 'Acme', 'Project Scope': 'Roof', 'Configurator': False})
+
+
+def test_run_key_accepts_paths():
+    assert get_run_key({'Project Path': Path('jobs')}) == get_run_key({'Project Path': str(Path('jobs'))})
+
+
+@pytest.mark.parametrize('url, saved', [
+    (RECORD_URL, True),
+    (FORM_URL, False),
+    (f'{FORM_URL}&id=', False),
+    (f'{FORM_URL}&pid=3&cfid=4', False),
+    ('https://1234.app.netsuite.com/app/id=5/form.nl', False),
+])
+def test_record_url_needs_an_id_parameter(url, saved):
+    assert is_record_url(url) == saved
+
+
+def test_saved_record_in_a_single_window_is_restorable():
+    checkpoint = record(RECORD_URL)
+    assert checkpoint.started and checkpoint.restorable
+    assert checkpoint.remaining == 6
+    assert checkpoint.data == [{'type': 'text', 'data-keys': 'P1001 Acme_Roof'}]
+
+
+def test_unsaved_form_is_not_restorable():
+    assert not record(FORM_URL).restorable
+
+
+def test_open_popup_is_not_restorable():
+    assert not record(RECORD_URL, windows=2).restorable
+
+
+def test_closed_window_is_not_restorable():
+    checkpoint = record(None)
+    assert checkpoint.url is None and not checkpoint.restorable
+
+
+def test_checkpoint_is_only_loaded_for_the_same_keys():
+    checkpoint = record(RECORD_URL)
+    loaded = load_checkpoint(checkpoint.key)
+    assert vars(loaded) == vars(checkpoint)
+    assert not load_checkpoint(get_run_key({'Customer': 'Beta'})).started
+
+
+def test_clear_deletes_the_checkpoint(cache_dir):
+    checkpoint = record(RECORD_URL)
+    checkpoint.clear()
+    assert not checkpoint.started
+    assert not load_checkpoint(checkpoint.key).started
+    assert not list(cache_dir.iterdir())
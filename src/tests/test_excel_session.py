@@ -0,0 +1,25 @@
+import sys
+import subprocess
+from middleware.cancel import CancelToken
+from project.excel_session import ExcelSession
+
+
+def test_cancel_terminates_the_started_process():
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+    try:
+        session = ExcelSession()
+        token = CancelToken()
+        token.register(session.terminate)
+        session.pid = process.pid
+        token.cancel()
+        assert process.wait(timeout=10) != 0
+        assert session.terminated
+    finally:
+        process.kill()
+
+
+def test_terminate_before_start_does_nothing():
+    session = ExcelSession()
+    session.terminate()
+    assert not session.terminated
+    session.quit()
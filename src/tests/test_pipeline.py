@@ -0,0 +1,46 @@
+from middleware.pipeline import move_dir
+
+
+def make_tree(root, files: dict):
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def read_tree(root) -> dict:
+    return {path.relative_to(root).as_posix(): path.read_text() for path in root.rglob('*') if path.is_file()}
+
+
+def test_pending_folder_is_renamed_to_a_new_job_folder(tmp_path):
+    src, dest = tmp_path / '_pending_1', tmp_path / 'P1001 Acme_Roof'
+    make_tree(src, {'takeoff.xlsm': 'takeoff', 'Drawings/plan.pdf': 'plan'})
+    move_dir(src, dest)
+    assert not src.exists()
+    assert read_tree(dest) == {'takeoff.xlsm': 'takeoff', 'Drawings/plan.pdf': 'plan'}
+
+
+def test_pending_folder_is_merged_into_an_existing_job_folder(tmp_path):
+    src, dest = tmp_path / '_pending_1', tmp_path / 'P1001 Acme_Roof'
+    make_tree(dest, {'notes.txt': 'notes', 'Drawings/site.pdf': 'site', 'takeoff.xlsm': 'old takeoff'})
+    make_tree(src, {'takeoff.xlsm': 'takeoff', 'checklist.xlsm': 'checklist', 'Drawings/plan.pdf': 'plan',
+                    'Quotes/quote.pdf': 'quote'})
+    move_dir(src, dest)
+    assert not src.exists()
+    assert read_tree(dest) == {
+        'notes.txt': 'notes',
+        'takeoff.xlsm': 'takeoff',
+        'checklist.xlsm': 'checklist',
+        'Drawings/site.pdf': 'site',
+        'Drawings/plan.pdf': 'plan',
+        'Quotes/quote.pdf': 'quote',
+    }
+
+
+def test_empty_pending_folder_leaves_the_job_folder_unchanged(tmp_path):
+    src, dest = tmp_path / '_pending_1', tmp_path / 'P1001 Acme_Roof'
+    src.mkdir()
+    make_tree(dest, {'notes.txt': 'notes'})
+    move_dir(src, dest)
+    assert not src.exists()
+    assert read_tree(dest) == {'notes.txt': 'notes'}
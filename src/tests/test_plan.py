@@ -0,0 +1,75 @@
+import pytest
+from selenium.webdriver import Keys
+from middleware.plan import compile_plan, get_actions, get_plan
+
+
+def custom(controller, step):
+    return True
+
+
+ELEMENTS = [
+    {'loc': 'id', 'value': 'customer', 'action': 'send-keys', 'keys': 'Customer'},
+    {'loc': 'css[2]', 'value': 'td.row', 'action': 'click double-click', 'custom': custom, 'branch': 'save'},
+    {'loc': 'active', 'action': 'send-keys', 'keys': 'Scope', 'term': Keys.ENTER, 'window': 1},
+    {'loc': 'name', 'value': 'memo', 'window': 1, 'page': 1, 'wait': 0.2},
+    {'loc': 'id', 'value': 'btn_submit', 'action': 'click', 'label': 'save', 'ready': 'settled'},
+]
+
+
+def test_actions_are_reversed_into_execution_order():
+    assert get_actions('click double-click send-keys') == ('send-keys', 'double-click', 'click')
+    assert get_actions(None) == ()
+    assert get_actions(custom) == (custom,)
+
+
+def test_locators_are_resolved():
+    steps = compile_plan(ELEMENTS).steps
+    assert (steps[0].strategy, steps[0].nth) == ('id', None)
+    assert (steps[1].strategy, steps[1].nth) == ('css selector', 2)
+    assert (steps[2].strategy, steps[2].nth) == (None, None)
+
+
+def test_branch_labels_resolve_to_step_indices():
+    plan = compile_plan(ELEMENTS)
+    assert plan.labels == {'save': 4}
+    assert plan.steps[1].branch == 4
+    assert plan.steps[0].branch is None
+
+
+def test_keys_bindings_and_terminators():
+    steps = compile_plan(ELEMENTS, term_str=Keys.TAB).steps
+    assert (steps[0].key, steps[0].term) == ('Customer', Keys.TAB)
+    assert (steps[2].key, steps[2].term) == ('Scope', Keys.ENTER)
+    assert (steps[3].key, steps[3].term) == (None, '')
+
+
+def test_window_switches_and_page_loads():
+    steps = compile_plan(ELEMENTS).steps
+    assert [step.switch for step in steps] == [True, False, True, False, True]
+    assert [step.window for step in steps] == [0, 0, 1, 1, 0]
+    # The page of the next element is loaded after the step when it changes
+    assert [step.page for step in steps] == [None, None, 1, 0, None]
+    assert steps[3].wait == 0.2 and steps[0].wait == 0
+
+
+def test_steps_are_immutable():
+    step = compile_plan(ELEMENTS).steps[0]
+    with pytest.raises(AttributeError):
+        step.key = 'Scope'
+    with pytest.raises(AttributeError):
+        del step.key
+
+
+def test_unknown_branch_label_is_rejected():
+    with pytest.raises(Exception, match="unknown label 'missing'"):
+        compile_plan([{'loc': 'id', 'value': 'x', 'branch': 'missing'}])
+
+
+def test_unknown_locator_is_rejected():
+    with pytest.raises(Exception, match="unknown locator 'link'"):
+        compile_plan([{'loc': 'link', 'value': 'x'}])
+
+
+def test_get_plan_compiles_once():
+    assert get_plan('proposal') is get_plan('proposal')
+    assert len(get_plan('login')) > 0
@@ -0,0 +1,94 @@
+import pytest
+from urllib3.exceptions import MaxRetryError
+from selenium.common.exceptions import WebDriverException
+from middleware import pool
+from middleware.pool import WorkerPool
+
+
+class DeadController:
+    """
+    Controller whose chromedriver is gone, as after pool.close() or a crash.
+    """
+
+    def __init__(self):
+        self.quits = 0
+
+    @property
+    def window_handles(self):
+        raise MaxRetryError(None, '/session/1/window/handles')
+
+    def quit(self):
+        self.quits += 1
+
+
+@pytest.fixture
+def controllers(monkeypatch):
+    started = []
+
+    def get_controller(urls, wait, profile, fast=False):
+        started.append(DeadController())
+        return started[-1]
+
+    monkeypatch.setattr(pool, 'get_controller', get_controller)
+    monkeypatch.setattr(pool, 'copy_worker_profile', lambda number: None)
+    monkeypatch.setattr(pool, 'get_worker_profile', lambda number: None)
+    return started
+
+
+def run(worker_pool: WorkerPool, rows: list) -> list:
+    return list(worker_pool.run(rows))
+
+
+def test_rows_are_yielded_in_row_order(controllers):
+    worker_pool = WorkerPool(lambda controller, data, logged_in: (data['row'], None), 0, workers=3)
+    assert run(worker_pool, [{'row': i} for i in range(6)]) == [(i, (i, None)) for i in range(6)]
+
+
+def test_dead_driver_does_not_hang_the_batch(controllers):
+    def process_row(controller, data, logged_in):
+        raise WebDriverException('chrome not reachable')
+
+    worker_pool = WorkerPool(process_row, 0, workers=2, attempts=2)
+    results = run(worker_pool, [{}, {}, {}])
+    assert [index for index, _ in results] == [0, 1, 2]
+    assert all('chrome not reachable' in error for _, (_, error) in results)
+    assert all(controller.quits for controller in controllers)
+
+
+def test_unexpected_worker_error_reports_the_row_and_fails_the_rest(controllers, monkeypatch):
+    def process_row(controller, data, logged_in):
+        raise WebDriverException('chrome not reachable')
+
+    def is_alive(controller):
+        raise RuntimeError('probe failed')
+
+    monkeypatch.setattr(pool, 'is_alive', is_alive)
+    results = run(WorkerPool(process_row, 0, workers=1), [{}, {}, {}])
+    assert results[0] == (0, (None, 'probe failed'))
+    assert [error for _, (_, error) in results[1:]] == \
+        ['Error: the browser worker stopped unexpectedly. probe failed'] * 2
+    assert controllers[0].quits == 1
+
+
+def test_browser_start_failure_fails_the_remaining_rows(monkeypatch):
+    def get_controller(urls, wait, profile, fast=False):
+        raise WebDriverException('chromedriver missing')
+
+    monkeypatch.setattr(pool, 'get_controller', get_controller)
+    monkeypatch.setattr(pool, 'get_worker_profile', lambda number: None)
+    results = run(WorkerPool(lambda *args: (None, None), 0, workers=1), [{}, {}])
+    assert [error for _, (_, error) in results] == \
+        ['Error: unable to start the browser. Message: chromedriver missing\n'] * 2
+
+
+def test_cancelled_batch_skips_the_remaining_rows(controllers):
+    worker_pool = WorkerPool(lambda controller, data, logged_in: (None, None), 0, workers=1)
+
+    def process_row(controller, data, logged_in):
+        worker_pool.token.cancel()
+        return 'done', None
+
+    worker_pool.process_row = process_row
+    results = run(worker_pool, [{}, {}])
+    assert results[0] == (0, ('done', None))
+    assert results[1][1][1] == 'Error: the run was cancelled.'
@@ -0,0 +1,121 @@
+import consts
+import pytest
+from middleware import rest
+from middleware.rest import RestClient, create_proposal, get_signature
+from benchmark.mock_netsuite import MockNetSuite, MOCK_CREDENTIALS
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = MockNetSuite().start()
+    monkeypatch.setattr(consts, 'NETSUITE_URL', server.url)
+    monkeypatch.setattr(consts, 'NETSUITE_REST_URL', server.rest_url)
+    monkeypatch.setattr(consts, 'BATCH_WORKERS', 1)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(server):
+    client = RestClient(server.rest_url, MOCK_CREDENTIALS, 'MOCK')
+    yield client
+    client.close()
+
+
+def get_data() -> dict:
+    return {
+        'Customer': "O'Brien Homes",
+        'Status': 'Open',
+        'Proposal Sales Rep': 'Jane Doe',
+        'Department': 'Engineering',
+        'Class': 'Residential',
+        'Item': 'SALES - Design',
+        'Project Template': 'Standard',
+        'Project Type': 'New Build',
+        'Site Name': '',
+        'Project Scope': 'Roof',
+        'Memo': 'Batch 7'
+    }
+
+
+def test_signature_matches_reference_value():
+    # Reference computed independently with the OAuth 1.0a base string rules
+    params = {'oauth_consumer_key': 'ck', 'oauth_token': 'tk', 'oauth_signature_method': 'HMAC-SHA256',
+              'oauth_timestamp': '1700000000', 'oauth_nonce': 'abc', 'oauth_version': '1.0'}
+    credentials = {'consumer_secret': 'cs', 'token_secret': 'ts'}
+    assert get_signature('post', 'https://1234.suitetalk.api.netsuite.com/services/rest/record/v1/job?a=1&b=x y',
+                         params, credentials) == 'jKWpXSa35A0TSOy0rklce82jP5+6qY3QI6qeDQV+gUM='
+
+
+def test_signature_covers_method_url_query_and_secrets():
+    params = {'oauth_nonce': 'abc', 'oauth_timestamp': '1700000000'}
+    credentials = {'consumer_secret': 'cs', 'token_secret': 'ts'}
+    signature = get_signature('GET', 'https://host/path?a=1', params, credentials)
+    assert signature == get_signature('get', 'https://host/path?a=1', dict(params), credentials)
+    assert signature != get_signature('POST', 'https://host/path?a=1', params, credentials)
+    assert signature != get_signature('GET', 'https://host/path?a=2', params, credentials)
+    assert signature != get_signature('GET', 'https://host/path?a=1', params, {**credentials, 'token_secret': 'x'})
+
+
+def test_unsigned_requests_are_rejected(server):
+    client = RestClient(server.rest_url, {**MOCK_CREDENTIALS, 'token_secret': 'wrong'}, 'MOCK')
+    with pytest.raises(Exception, match='returned 401 .*Invalid login attempt'):
+        client.query("SELECT 'Customer' AS label, id FROM customer WHERE entityid = 'Acme'")
+    client.close()
+
+
+def test_create_proposal_creates_the_linked_records(server, client):
+    data_scraped = create_proposal(get_data(), client)
+    project_id = server.lookups["O'Brien Homes"]
+    records = {record_type: (record_id, fields) for (record_type, record_id), fields in server.rest_records.items()}
+    assert set(records) == {rest.PROJECT_RECORD, rest.PROPOSAL_RECORD, rest.ITEM_LINE_RECORD}
+
+    job_id, job = records[rest.PROJECT_RECORD]
+    assert job['parent'] == {'id': project_id}
+    assert job['custentityprime_project_scope'] == 'Roof'
+    assert 'custentityprime_project_site_name' not in job
+    proposal_id, proposal = records[rest.PROPOSAL_RECORD]
+    assert proposal['custrecord_appfproj'] == {'id': job_id}
+    assert proposal['custrecord_proposalmemo'] == 'Batch 7'
+    _, line = records[rest.ITEM_LINE_RECORD]
+    assert line['custrecord_proposallink'] == {'id': proposal_id}
+    assert (line['custrecord_proposalmilestone'], line['custrecord_proposalquantity']) == ('Design', 1.0)
+
+    assert data_scraped == [
+        {'element': None, 'type': 'text', 'data-keys': f"P{job_id} O'Brien Homes_Roof"},
+        {'element': None, 'type': 'url', 'data-keys': f'{server.url}&id={proposal_id}'}
+    ]
+
+
+def test_resolved_ids_are_reused(server, client):
+    create_proposal(get_data(), client)
+    lookups = dict(server.lookups)
+    create_proposal(get_data(), client)
+    assert server.lookups == lookups
+    assert len(server.rest_records) == 6
+
+
+def test_ambiguous_name_is_rejected(server, client):
+    server.duplicate_names.add('Jane Doe')
+    with pytest.raises(Exception, match="Proposal Sales Rep 'Jane Doe' matches more than one record"):
+        create_proposal(get_data(), client)
+    assert server.rest_records == {}
+
+
+def test_failed_create_deletes_the_records_already_created(server, client):
+    server.failing_records.add(rest.ITEM_LINE_RECORD)
+    with pytest.raises(Exception, match='returned 400 .*Invalid field value'):
+        create_proposal(get_data(), client)
+    assert server.rest_records == {}
+
+
+def test_records_left_behind_are_reported(server, client, monkeypatch):
+    server.failing_records.add(rest.PROPOSAL_RECORD)
+
+    def delete_record(record_type, record_id):
+        raise Exception('Error: NetSuite returned 500')
+
+    monkeypatch.setattr(client, 'delete_record', delete_record)
+    with pytest.raises(Exception, match=f'delete them in NetSuite before running again: {rest.PROJECT_RECORD} 10'):
+        create_proposal(get_data(), client)
+    assert len(server.rest_records) == 1
@@ -0,0 +1,69 @@
+import consts
+import pytest
+from selenium.common.exceptions import (
+    StaleElementReferenceException, ElementClickInterceptedException, TimeoutException, NoSuchWindowException
+)
+from middleware import retry
+from middleware.retry import RetryPolicy, CircuitBreaker
+
+
+def test_errors_are_classified():
+    assert retry.classify_error(StaleElementReferenceException()) == retry.TRANSIENT
+    assert retry.classify_error(TimeoutException()) == retry.TRANSIENT
+    assert retry.classify_error(NoSuchWindowException()) == retry.BROWSER
+    assert retry.classify_error(ValueError()) == retry.FATAL
+
+
+def test_transient_errors_are_retried_until_attempts_run_out():
+    policy = RetryPolicy(attempts=3)
+    assert policy.should_retry(StaleElementReferenceException(), 1)
+    assert policy.should_retry(TimeoutException(), 2)
+    assert not policy.should_retry(TimeoutException(), 3)
+
+
+def test_browser_and_fatal_errors_are_not_retried():
+    policy = RetryPolicy(attempts=3)
+    assert not policy.should_retry(NoSuchWindowException(), 1)
+    assert not policy.should_retry(Exception('Error: wrong value'), 1)
+
+
+def test_only_unperformed_action_errors_are_retried():
+    policy = RetryPolicy(attempts=3)
+    assert policy.should_retry(ElementClickInterceptedException(), 1, acting=True)
+    assert not policy.should_retry(TimeoutException(), 1, acting=True)
+
+
+def test_single_attempt_never_retries():
+    assert RetryPolicy(attempts=0).attempts == 1
+    assert not RetryPolicy(attempts=1).should_retry(StaleElementReferenceException(), 1)
+
+
+@pytest.mark.parametrize('attempt, delay', [(1, 0.5), (2, 1), (3, 2), (5, 4), (10, 4)])
+def test_delay_doubles_with_jitter_up_to_the_maximum(attempt, delay):
+    policy = RetryPolicy(attempts=10, base_delay=0.5, max_delay=4)
+    for _ in range(50):
+        assert delay / 2 <= policy.get_delay(attempt) <= delay
+
+
+def test_policy_is_read_from_consts(monkeypatch):
+    monkeypatch.setattr(consts, 'STEP_ATTEMPTS', 4)
+    monkeypatch.setattr(consts, 'STEP_BACKOFF', 0.25)
+    policy = retry.get_retry_policy()
+    assert (policy.attempts, policy.base_delay) == (4, 0.25)
+
+
+def test_breaker_trips_after_consecutive_failures():
+    breaker = CircuitBreaker(threshold=2)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    assert not breaker.tripped
+    breaker.record(False)
+    assert breaker.tripped and breaker.failures == 2
+
+
+def test_breaker_without_threshold_never_trips():
+    breaker = CircuitBreaker()
+    for _ in range(10):
+        breaker.record(False)
+    assert not breaker.tripped
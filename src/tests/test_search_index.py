@@ -0,0 +1,53 @@
+from utility.search_index import SearchIndex
+
+VALUES = ['Acme Corp', 'acme industries', 'Beta Acme', 'Gamma Ltd', 'Delta Acme Works', 'Zeta']
+
+
+def test_empty_query_returns_values_in_sorted_order():
+    index = SearchIndex(VALUES)
+    assert len(index) == len(VALUES)
+    assert index.search('', limit=3) == ['Acme Corp', 'acme industries', 'Beta Acme']
+
+
+def test_prefix_query_is_case_insensitive():
+    index = SearchIndex(VALUES)
+    assert index.search('ACM') == ['Acme Corp', 'acme industries', 'Beta Acme', 'Delta Acme Works']
+
+
+def test_prefix_matches_come_before_substring_matches():
+    index = SearchIndex(VALUES)
+    assert index.search('acme')[:2] == ['Acme Corp', 'acme industries']
+
+
+def test_substring_matches_rank_earliest_occurrence_first():
+    index = SearchIndex(VALUES)
+    assert index.search('acme')[2:] == ['Beta Acme', 'Delta Acme Works']
+
+
+def test_short_query_only_matches_prefixes():
+    index = SearchIndex(VALUES)
+    assert index.search('ta') == []
+    assert index.search('ze') == ['Zeta']
+
+
+def test_trigram_query_without_match():
+    index = SearchIndex(VALUES)
+    assert index.search('acmx') == []
+    assert index.search('ltd works') == []
+
+
+def test_limit_spans_prefix_and_substring_matches():
+    index = SearchIndex(VALUES)
+    assert index.search('acme', limit=3) == ['Acme Corp', 'acme industries', 'Beta Acme']
+    assert index.search('acme', limit=1) == ['Acme Corp']
+
+
+def test_substring_requires_every_trigram_in_order():
+    index = SearchIndex(['abcxbcd', 'abcd'])
+    assert index.search('bcd') == ['abcd', 'abcxbcd']
+    assert index.search('abcd') == ['abcd']
+
+
+def test_non_string_values_are_indexed_as_text():
+    index = SearchIndex([1200, 300])
+    assert index.search('12') == ['1200']
@@ -0,0 +1,90 @@
+import os
+import consts
+import pytest
+from threading import Thread
+from project import template_index
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(consts, 'CACHE_DIR', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
+
+@pytest.fixture
+def template(tmp_path):
+    path = tmp_path / 'template.xltm'
+    path.write_bytes(b'template contents')
+    return path
+
+
+class FakeBackend:
+    def __init__(self, cells):
+        self.cells = cells
+        self.searches = 0
+
+    def get_cells_with_values(self, ws, values):
+        self.searches += 1
+        return {value: cell for value, cell in self.cells.items() if value in values}
+
+
+def test_lookup_misses_until_stored(cache_dir, template):
+    assert template_index.lookup(template, ['{a}']) is None
+    template_index.store(template, ['{a}', '{b}'], {'{a}': (2, 3)})
+    assert template_index.lookup(template, ['{a}', '{b}']) == {'{a}': (2, 3)}
+    assert template_index.lookup(template, ['{c}']) is None
+    assert template_index.lookup(template, ['{a}'], sheet=2) is None
+
+
+def test_touched_but_identical_template_keeps_its_entry(cache_dir, template):
+    template_index.store(template, ['{a}'], {'{a}': (2, 3)})
+    stat = os.stat(template)
+    os.utime(template, (stat.st_atime, stat.st_mtime + 10))
+    assert template_index.lookup(template, ['{a}']) == {'{a}': (2, 3)}
+    assert template_index.load_index()[str(template)]['mtime'] == stat.st_mtime + 10
+
+
+def test_changed_template_invalidates_its_entry(cache_dir, template):
+    template_index.store(template, ['{a}'], {'{a}': (2, 3)})
+    template.write_bytes(b'other contents!!!')
+    assert template_index.lookup(template, ['{a}']) is None
+
+
+def test_save_keeps_the_entries_of_other_templates(cache_dir, template, tmp_path):
+    other = tmp_path / 'other.xltm'
+    other.write_bytes(b'other template')
+    template_index.store(other, ['{x}'], {'{x}': (1, 1)})
+    template_index.save_index({str(template): {'mtime': 0, 'size': 0, 'hash': '', 'sheets': {}, 'missing': {}}})
+    assert set(template_index.load_index()) == {str(template), str(other)}
+
+
+def test_concurrent_stores_keep_every_template_and_placeholder(cache_dir, tmp_path):
+    templates = []
+    for i in range(8):
+        path = tmp_path / f'template{i}.xltm'
+        path.write_bytes(b'template contents')
+        templates.append(path)
+    threads = [Thread(target=template_index.store, args=(path, [value], {value: (i, 1)}))
+               for path in templates for i, value in enumerate(['{a}', '{b}'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for path in templates:
+        assert template_index.lookup(path, ['{a}', '{b}']) == {'{a}': (0, 1), '{b}': (1, 1)}
+    assert not list(cache_dir.glob('*.tmp'))
+
+
+def test_corrupt_index_is_ignored(cache_dir, template):
+    cache_dir.mkdir()
+    template_index.get_index_path().write_text('{not json')
+    assert template_index.load_index() == {}
+    template_index.store(template, ['{a}'], {'{a}': (2, 3)})
+    assert template_index.lookup(template, ['{a}']) == {'{a}': (2, 3)}
+
+
+def test_get_template_cells_scans_the_sheet_only_on_a_miss(cache_dir, template):
+    backend = FakeBackend({'{a}': (2, 3)})
+    assert template_index.get_template_cells(backend, template, None, ['{a}', '{b}']) == {'{a}': (2, 3)}
+    assert template_index.get_template_cells(backend, template, None, ['{a}', '{b}']) == {'{a}': (2, 3)}
+    assert backend.searches == 1
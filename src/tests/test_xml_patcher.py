@@ -0,0 +1,92 @@
+import zipfile
+import openpyxl
+from project import xml_patcher
+
+SHEET = ('<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+         '<row r="2" spans="2:3"><c r="B2" s="1" t="s"><v>0</v></c><c r="D2"><v>5</v></c></row>'
+         '<row r="4"><c r="A4"><f>B2</f><v>0</v></c></row>'
+         '</sheetData></worksheet>')
+
+
+def test_column_conversion_round_trips():
+    for index, letters in [(1, 'A'), (26, 'Z'), (27, 'AA'), (703, 'AAA')]:
+        assert xml_patcher.column_letters(index) == letters
+        assert xml_patcher.column_index(letters) == index
+
+
+def test_iter_cells_decodes_values_and_skips_formulas():
+    cells = list(xml_patcher.iter_cells(SHEET, ['{name}']))
+    assert cells == [(2, 2, '{name}'), (2, 4, 5.0)]
+
+
+def test_find_cells_returns_first_cell_of_each_string():
+    assert xml_patcher.find_cells(SHEET, ['{name}'], ['{name}', '{missing}']) == {'{name}': (2, 2)}
+
+
+def test_set_cell_replaces_value_and_keeps_style():
+    strings = ['{name}']
+    xml = xml_patcher.set_cell(SHEET, 2, 2, 'Acme & Co', strings)
+    assert '<c r="B2" s="1" t="s"><v>1</v></c>' in xml
+    assert strings == ['{name}', 'Acme & Co']
+    assert 'spans=' not in xml
+
+
+def test_set_cell_inserts_cells_and_rows_in_order():
+    strings = []
+    xml = xml_patcher.set_cell(SHEET, 2, 3, 7, strings)
+    xml = xml_patcher.set_cell(xml, 3, 1, True, strings)
+    xml = xml_patcher.set_cell(xml, 5, 1, None, strings)
+    assert '<c r="B2" s="1" t="s"><v>0</v></c><c r="C2"><v>7</v></c><c r="D2"><v>5</v></c>' in xml
+    assert xml.index('<row r="3"><c r="A3" t="b"><v>1</v></c></row>') < xml.index('<row r="4">')
+    assert xml.endswith('<row r="5"><c r="A5"/></row></sheetData></worksheet>')
+
+
+def test_patch_workbook_sets_existing_calc_pr():
+    xml = '<workbook><sheets/><calcPr calcId="191029"/></workbook>'
+    assert xml_patcher.patch_workbook(xml) == \
+        '<workbook><sheets/><calcPr fullCalcOnLoad="1" calcId="191029"/></workbook>'
+    assert xml_patcher.patch_workbook(xml_patcher.patch_workbook(xml)) == xml_patcher.patch_workbook(xml)
+
+
+def test_patch_workbook_inserts_calc_pr_at_schema_position():
+    xml = '<x:workbook><x:sheets/><x:definedNames/><x:fileRecoveryPr/><x:extLst/></x:workbook>'
+    assert xml_patcher.patch_workbook(xml) == ('<x:workbook><x:sheets/><x:definedNames/>'
+                                               '<x:calcPr fullCalcOnLoad="1"/><x:fileRecoveryPr/><x:extLst/>'
+                                               '</x:workbook>')
+    assert xml_patcher.patch_workbook('<workbook><sheets/></workbook>') == \
+        '<workbook><sheets/><calcPr fullCalcOnLoad="1"/></workbook>'
+
+
+def test_write_shared_strings_appends_items_and_updates_counts():
+    xml = '<sst count="3" uniqueCount="1"><si><t>{name}</t></si></sst>'
+    patched = xml_patcher.write_shared_strings(xml, ['{name}', ' a<b '], 1, references=2)
+    assert patched == ('<sst count="2" uniqueCount="2"><si><t>{name}</t></si>'
+                       '<si><t xml:space="preserve"> a&lt;b </t></si></sst>')
+
+
+def test_write_patched_archive_produces_readable_xlsm(tmp_path):
+    src, dest = tmp_path / 'template.xlsx', tmp_path / 'output.xlsm'
+    wb = openpyxl.Workbook()
+    wb.active['B2'] = '{name}'
+    wb.active['C3'] = '{scope}'
+    wb.save(src)
+
+    with zipfile.ZipFile(src) as archive:
+        strings = []
+        if xml_patcher.SHARED_STRINGS in archive.namelist():
+            strings = xml_patcher.read_shared_strings(archive.read(xml_patcher.SHARED_STRINGS).decode('utf-8'))
+        path = xml_patcher.get_sheet_paths(archive)[0]
+        xml = archive.read(path).decode('utf-8')
+    count = len(strings)
+    cells = xml_patcher.find_cells(xml, strings, ['{name}', '{scope}'])
+    xml = xml_patcher.set_cell(xml, *cells['{name}'], 'Acme', strings)
+    xml = xml_patcher.set_cell(xml, *cells['{scope}'], 12.5, strings)
+    xml_patcher.write_patched_archive(src, dest, {path: xml}, strings, count)
+
+    with zipfile.ZipFile(dest) as archive:
+        assert xml_patcher.XLSM_MAIN_TYPE in archive.read(xml_patcher.CONTENT_TYPES).decode('utf-8')
+        assert 'fullCalcOnLoad="1"' in archive.read(xml_patcher.WORKBOOK).decode('utf-8')
+        assert 'count="1"' in archive.read(xml_patcher.SHARED_STRINGS).decode('utf-8')
+    ws = openpyxl.load_workbook(dest).active
+    assert ws['B2'].value == 'Acme'
+    assert ws['C3'].value == 12.5
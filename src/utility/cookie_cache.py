@@ -0,0 +1,112 @@
+import time
+import json
+import consts
+from pathlib import Path
+from selenium.common.exceptions import WebDriverException
+
+try:
+    import win32crypt
+    from pywintypes import error as CryptError
+except ImportError:
+    win32crypt = None
+    CryptError = OSError
+
+"""
+Optional cache of the NetSuite session cookies, encrypted for the current Windows user with DPAPI.
+
+Enabled by COOKIE_CACHE. The cookies are saved after a successful run and set in a browser that is not
+logged in, so a reset or new Chrome profile can skip the login. Without pywin32 the cache is disabled, as
+the cookies are never written to disk unencrypted.
+"""
+
+COOKIE_FIELDS = ['name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires']
+DESCRIPTION = 'NetSuite Takeoff Integration session'
+
+
+def is_enabled() -> bool:
+    """
+    Check if the cookie cache is enabled and can be encrypted.
+
+    :return: true if the cookies are cached
+    """
+    return bool(consts.COOKIE_CACHE and win32crypt)
+
+
+def get_cache_path() -> Path:
+    """
+    Return the path of the encrypted cookie file.
+
+    :return: path of the cookie file in the cache directory
+    """
+    return Path(consts.CACHE_DIR, 'session.bin')
+
+
+def save_cookies(controller):
+    """
+    Encrypt and save the cookies of all the domains of the browser.
+
+    :param controller: instance of WebController
+    """
+    if not is_enabled():
+        return
+    try:
+        cookies = controller.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+        blob = win32crypt.CryptProtectData(json.dumps(cookies).encode('utf-8'), DESCRIPTION, None, None, None, 0)
+        path = get_cache_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(blob)
+    except (WebDriverException, CryptError, OSError, KeyError):
+        pass
+
+
+def load_cookies() -> list:
+    """
+    Decrypt the cached cookies, leaving out the expired ones.
+
+    :return: cookie parameters accepted by Network.setCookies
+    """
+    if not is_enabled():
+        return []
+    try:
+        _, data = win32crypt.CryptUnprotectData(get_cache_path().read_bytes(), None, None, None, 0)
+        cookies = json.loads(data.decode('utf-8'))
+    except Exception:
+        return []
+    now = time.time()
+    params = []
+    for cookie in cookies:
+        if not cookie.get('session') and cookie.get('expires', -1) < now:
+            continue
+        param = {field: cookie[field] for field in COOKIE_FIELDS if field in cookie}
+        if cookie.get('session'):
+            param.pop('expires', None)
+        params.append(param)
+    return params
+
+
+def restore_cookies(controller) -> bool:
+    """
+    Set the cached cookies in the browser and reload the landing page.
+
+    :param controller: instance of WebController
+    :return: true if cookies were restored
+    """
+    cookies = load_cookies()
+    if not cookies:
+        return False
+    try:
+        controller.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+        controller.load_page(controller.urls[0])
+    except WebDriverException:
+        return False
+    return True
+
+
+def clear_cookies():
+    """
+    Delete the cached cookies, e.g. after they failed to restore the session.
+    """
+    try:
+        get_cache_path().unlink()
+    except OSError:
+        pass
@@ -0,0 +1,103 @@
+import os
+import pickle
+import consts
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from utility import csv_handler, mirror_handler
+
+"""
+Compiled snapshot of the dropdown lists.
+
+The values of every dropdown CSV are stored in a single pickle file together with the size and
+modification time of the source CSV. Only the lists whose source changed are parsed again.
+"""
+
+SNAPSHOT_VERSION = 1
+
+
+def get_snapshot_path() -> Path:
+    """
+    Return the path of the snapshot file.
+
+    :return: path of the snapshot in the cache directory
+    """
+    return Path(consts.CACHE_DIR, 'dropdowns.pickle')
+
+
+def load_snapshot() -> dict:
+    """
+    Load the snapshot from disk.
+
+    :return: dropdown name, entry pairs
+    """
+    try:
+        with open(get_snapshot_path(), 'rb') as file:
+            snapshot = pickle.load(file)
+        if snapshot.get('version') == SNAPSHOT_VERSION:
+            return snapshot['dropdowns']
+    except (OSError, pickle.PickleError, EOFError, AttributeError, KeyError):
+        pass
+    return {}
+
+
+def save_snapshot(dropdowns: dict):
+    """
+    Write the snapshot to disk atomically.
+
+    :param dropdowns: dropdown name, entry pairs
+    """
+    path = get_snapshot_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as file:
+        pickle.dump({'version': SNAPSHOT_VERSION, 'dropdowns': dropdowns}, file, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def is_entry_valid(entry: dict, path: str, stat) -> bool:
+    """
+    Check if a snapshot entry still matches its source CSV.
+
+    :param entry: snapshot entry of the dropdown
+    :param path: path of the source CSV
+    :param stat: os.stat_result of the source CSV, None if it could not be reached
+    :return: true if the entry can be used
+    """
+    if not entry or entry['path'] != path:
+        return False
+    if stat is None:
+        return True
+    return entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+
+
+def load_dropdowns(paths: dict) -> dict:
+    """
+    Return the values of the dropdowns, parsing only the CSV files that changed since the last run.
+
+    :param paths: dropdown name, source CSV path pairs
+    :return: dropdown name, values pairs
+    """
+    snapshot = load_snapshot()
+    with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        stats = dict(zip(paths, executor.map(mirror_handler.stat_with_timeout, paths.values())))
+
+    changed = False
+    for name, path in paths.items():
+        entry, stat = snapshot.get(name), stats[name]
+        if is_entry_valid(entry, str(path), stat):
+            continue
+        values = csv_handler.read_csv_column(mirror_handler.get_local_path(path), header=True)
+        snapshot[name] = {
+            'path': str(path),
+            'size': stat.st_size if stat else None,
+            'mtime': stat.st_mtime if stat else None,
+            'values': values
+        }
+        changed = True
+
+    if changed:
+        try:
+            save_snapshot(snapshot)
+        except OSError:
+            pass
+    return {name: snapshot[name]['values'] for name in paths}
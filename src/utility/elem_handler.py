@@ -1,6 +1,8 @@
-import time
+from urllib.parse import urlsplit
+from utility import cookie_cache
 from selenium.webdriver import Keys
-from pywebgo import utils
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import WebDriverException
 
 """
 Variables to store NetSuite username, password and security questions.
@@ -9,6 +11,10 @@ questions = {}
 username = ''
 password = ''
 
+LOGIN_ELEMENTS = 4
+PROPOSAL_LABEL = 'proposal'
+POLL_FREQUENCY = 0.05
+
 
 def set_user_pass_questions(data):
     """
@@ -27,123 +33,180 @@ def set_user_pass_questions(data):
     })
 
 
-def validate_func(*argv):
+def is_authenticated(controller) -> bool:
+    """
+    Check if the browser shows the landing page, which NetSuite only serves to a logged in session.
+
+    :param controller: current instance of the controller
+    :return: true if the current URL is the landing page
+    """
+    try:
+        url = urlsplit(controller.current_url)
+    except WebDriverException:
+        return False
+    landing = urlsplit(controller.urls[0])
+    return url.netloc == landing.netloc and url.path == landing.path
+
+
+def restore_session(controller) -> bool:
+    """
+    Check if the browser is logged in, setting the cached session cookies if it is not.
+
+    :param controller: current instance of the controller
+    :return: true if the landing page is shown
+    """
+    if is_authenticated(controller):
+        return True
+    if not cookie_cache.restore_cookies(controller):
+        return False
+    if is_authenticated(controller):
+        return True
+    cookie_cache.clear_cookies()
+    return False
+
+
+def validate_func(*argv) -> bool:
     """
-    Answers the security question in NetSuite if prompted.
+    Binds the answer of the security question in NetSuite if prompted.
 
-    :param argv: controller, element
+    :param argv: controller, step
+    :return: true if NetSuite showed the landing page instead, skipping the answer
     """
-    controller, element = argv[0], argv[1]
-    textbox = controller.elem_handler.elements[4]
-    if controller.element_exists(textbox, retry=0, timeout=1):
-        index = controller.elem_handler.elements.index(element)
-        answer_element = controller.elem_handler.elements[index + 1]
-        controller.elem_handler.elements.remove(answer_element)
-        return
+    controller, step = argv[0], argv[1]
+
+    def get_prompt(driver):
+        if is_authenticated(driver):
+            return 'landing'
+        found = driver.find_elements(step.strategy, step.value)
+        return found[0] if found else False
 
-    webelement = controller.get_element(element, retry=0, timeout=1)
-    answer = questions[webelement.text]
-    index = controller.elem_handler.elements.index(element)
-    controller.elem_handler.elements[index + 1]['keys'] = answer + Keys.ENTER
+    prompt = WebDriverWait(controller, controller.timeout, POLL_FREQUENCY).until(get_prompt)
+    if prompt == 'landing':
+        return True
 
+    controller.bindings['Answer'] = questions[prompt.text]
+    return False
 
-def popup_handler(controller, element):
+
+def popup_handler(controller, step):
     """
-    Handle any pop-up prompts that come along during runtime.
+    Choose the popup row showing the keys of the step, unless the field accepted them without a popup.
 
     :param controller: current instance of the controller
-    :param element: current element in execution
+    :param step: current step in execution
     """
-    if controller.element_exists(element, retry=0, timeout=2):
-        identifiers = utils.get_element_identifiers(element)
-        (strategy, locator) = (identifiers['strategy'], identifiers['locator'])
-        web_element = controller.find_element(strategy, locator)
-        controller.execute_actions(web_element, element)
+    row = controller.wait_for_popup(step, controller.bindings[step.key])
+    if row:
+        controller.execute_actions(row, step)
 
 
-def check_for_auto_populate(*argv):
+def check_for_auto_populate(*argv) -> bool:
     """
-    Fill username and password fields only if they are not autopopulated.
+    Fill username and password fields only if they are not autopopulated. The login is skipped when the
+    browser is already logged in, or once the cached session cookies are restored.
 
-    :param argv: controller, element
+    :param argv: controller, step
+    :return: true if the browser is logged in, skipping the rest of the login
     """
-    controller, element = argv[0], argv[1]
-    web_element = controller.get_element(element, retry=0, timeout=1)
-    if web_element.get_attribute('id') == 'email':
-        time.sleep(0.5)
+    controller, step = argv[0], argv[1]
+    if step.value == 'email' and restore_session(controller):
+        return True
+
+    web_element = controller.get_element(step, retry=0, timeout=1)
     web_element.click()
     if web_element.get_attribute('value') != '':
         if web_element.get_attribute('id') == 'password':
             web_element.send_keys(Keys.ENTER)
-        return
+        return False
 
     if web_element.get_attribute('id') == 'email':
         web_element.send_keys(username)
     if web_element.get_attribute('id') == 'password':
         web_element.send_keys(password + Keys.ENTER)
+    return False
 
 
 def fetch_current_url(*argv):
     """
     Get the url of the current web page.
 
-    :param argv: controller, element
+    :param argv: controller, step
     """
-    controller, element = argv[0], argv[1]
-    index = controller.elem_handler.elements.index(element)
-    controller.data_handler.add_data(index, element['retrieve'], controller.current_url)
+    controller, step = argv[0], argv[1]
+    controller.data_handler.add_data(step.index, step.retrieve, controller.current_url)
 
 
 def get_elements() -> list:
     """
     Return a list of elements.
 
-    :return: static element list for WebController
+    :return: static element list, compiled into a plan by middleware.plan
     """
     return [
-        {'loc': 'id', 'value': 'email', 'custom': check_for_auto_populate},
-        {'loc': 'id', 'value': 'password', 'custom': check_for_auto_populate},
-        {'loc': 'css', 'value': r'tbody tbody tr td.smalltextnolink.text-opensans', 'custom': validate_func},
-        {'loc': 'name', 'value': 'answer', 'action': 'send-keys'},
-        {'loc': 'name', 'value': 'custrecord_appfcust_display', 'action': 'send-keys', 'keys': 'Customer'},
+        {'loc': 'id', 'value': 'email', 'custom': check_for_auto_populate, 'ready': 'settled',
+         'branch': PROPOSAL_LABEL},
+        {'loc': 'id', 'value': 'password', 'custom': check_for_auto_populate, 'ready': 'settled'},
+        {'loc': 'css', 'value': r'tbody tbody tr td.smalltextnolink.text-opensans', 'custom': validate_func,
+         'branch': PROPOSAL_LABEL},
+        {'loc': 'name', 'value': 'answer', 'action': 'send-keys', 'keys': 'Answer', 'term': Keys.ENTER},
+        {'loc': 'name', 'value': 'custrecord_appfcust_display', 'action': 'send-keys', 'keys': 'Customer',
+         'ready': 'clickable', 'label': PROPOSAL_LABEL},
         {'loc': 'css', 'value': '.uir-popup-select-content tbody td .smalltextnolink', 'action': 'click',
-         'custom': popup_handler},
-        {'loc': 'name', 'value': 'inpt_custrecord_appfproposalstatus', 'action': 'send-keys', 'keys': 'Status'},
-        {'loc': 'name', 'value': 'custrecord_proposalmemo', 'action': 'send-keys', 'keys': 'Memo'},
-        {'loc': 'name', 'value': 'inpt_custrecord_proposalsales', 'action': 'send-keys', 'keys': 'Proposal Sales Rep'},
+         'custom': popup_handler, 'keys': 'Customer', 'ready': 'popup'},
+        {'loc': 'name', 'value': 'inpt_custrecord_appfproposalstatus', 'action': 'send-keys', 'keys': 'Status',
+         'ready': 'clickable'},
+        {'loc': 'name', 'value': 'custrecord_proposalmemo', 'action': 'send-keys', 'keys': 'Memo',
+         'ready': 'clickable'},
+        {'loc': 'name', 'value': 'inpt_custrecord_proposalsales', 'action': 'send-keys', 'keys': 'Proposal Sales Rep',
+         'ready': 'clickable'},
         {'loc': 'name', 'value': 'inpt_custrecord_proposaldepartment', 'action': 'send-keys click',
-         'keys': 'Department'},
-        {'loc': 'name', 'value': 'inpt_custrecord_proposalclass', 'action': 'send-keys click', 'keys': 'Class'},
+         'keys': 'Department', 'ready': 'clickable'},
+        {'loc': 'name', 'value': 'inpt_custrecord_proposalclass', 'action': 'send-keys click', 'keys': 'Class',
+         'ready': 'clickable'},
         {'loc': 'id', 'value': 'recmachcustrecord_proposallink_custrecord_proposalitem_display',
-         'action': 'send-keys', 'keys': 'Item'},
+         'action': 'send-keys', 'keys': 'Item', 'ready': 'clickable'},
         {'loc': 'css', 'value': '.uir-popup-select-content tbody td .smalltextnolink', 'action': 'click',
-         'custom': popup_handler},
-        {'loc': 'css', 'value': 'td[data-ns-tooltip="Milestone Name"]', 'action': 'click'},
-        {'loc': 'name', 'value': 'custrecord_proposalmilestone', 'action': 'send-keys', 'keys': 'Milestone'},
-        {'loc': 'css', 'value': 'td[data-ns-tooltip="Quantity"]', 'action': 'click'},
+         'custom': popup_handler, 'keys': 'Item', 'ready': 'popup'},
+        {'loc': 'css', 'value': 'td[data-ns-tooltip="Milestone Name"]', 'action': 'click', 'ready': 'idle'},
+        {'loc': 'name', 'value': 'custrecord_proposalmilestone', 'action': 'send-keys', 'keys': 'Milestone',
+         'ready': 'clickable'},
+        {'loc': 'css', 'value': 'td[data-ns-tooltip="Quantity"]', 'action': 'click', 'ready': 'clickable'},
         {'loc': 'name', 'value': 'custrecord_proposalquantity_formattedValue', 'action': 'send-keys',
-         'keys': 'Quantity'},
-        {'loc': 'id', 'value': 'custrecord_appfproj_display', 'action': 'hover'},
-        {'loc': 'id', 'value': 'custrecord_appfproj_popup_new', 'action': 'click'},
-        {'loc': 'name', 'value': 'parent_display', 'action': 'send-keys', 'keys': 'Customer', 'window': 1},
+         'keys': 'Quantity', 'ready': 'clickable'},
+        {'loc': 'id', 'value': 'custrecord_appfproj_display', 'action': 'hover', 'ready': 'idle'},
+        {'loc': 'id', 'value': 'custrecord_appfproj_popup_new', 'action': 'click', 'ready': 'clickable'},
+        {'loc': 'name', 'value': 'parent_display', 'action': 'send-keys', 'keys': 'Customer', 'window': 1,
+         'ready': 'idle'},
         {'loc': 'css', 'value': '.uir-popup-select-content tbody td .smalltextnolink', 'action': 'click hover',
-         'custom': popup_handler, 'window': 1},
+         'custom': popup_handler, 'keys': 'Customer', 'window': 1, 'ready': 'popup'},
         {'loc': 'name', 'value': 'inpt_custentityprime_choose_template', 'action': 'send-keys click',
-         'keys': 'Choose', 'window': 1},
+         'keys': 'Choose', 'window': 1, 'ready': 'idle'},
         {'loc': 'name', 'value': 'inpt_projecttemplate', 'action': 'send-keys click',
-         'keys': 'Project Template', 'window': 1},
+         'keys': 'Project Template', 'window': 1, 'ready': 'clickable'},
         {'loc': 'name', 'value': 'custentityprime_project_scope', 'action': 'send-keys',
-         'keys': 'Project Scope', 'window': 1},
+         'keys': 'Project Scope', 'term': Keys.TAB * 2, 'window': 1, 'ready': 'clickable'},
         {'loc': 'active', 'action': 'send-keys', 'keys': 'Project Type', 'window': 1},
         {'loc': 'css', 'value': '.uir-popup-select-content tbody td .smalltextnolink', 'action': 'click',
-         'custom': popup_handler, 'window': 1},
+         'custom': popup_handler, 'keys': 'Project Type', 'window': 1, 'ready': 'popup'},
         {'loc': 'active', 'action': 'send-keys', 'keys': 'Proposal Sales Rep', 'window': 1},
         {'loc': 'name', 'value': 'custentityprime_project_site_name_display', 'action': 'send-keys',
-         'keys': 'Site Name', 'window': 1},
+         'keys': 'Site Name', 'window': 1, 'ready': 'clickable'},
         {'loc': 'css', 'value': '.uir-popup-select-content tbody td .smalltextnolink', 'action': 'click',
-         'custom': popup_handler, 'window': 1},
-        {'loc': 'id', 'value': 'btn_secondarymultibutton_submitter', 'action': 'click', 'window': 1},
-        {'loc': 'id', 'value': 'btn_secondarymultibutton_submitter', 'action': 'click'},
-        {'loc': 'css', 'value': '#custrecord_appfproj_fs_lbl_uir_label + span', 'retrieve': 'text'},
+         'custom': popup_handler, 'keys': 'Site Name', 'window': 1, 'ready': 'popup'},
+        {'loc': 'id', 'value': 'btn_secondarymultibutton_submitter', 'action': 'click', 'window': 1,
+         'ready': 'idle'},
+        {'loc': 'id', 'value': 'btn_secondarymultibutton_submitter', 'action': 'click', 'ready': 'idle'},
+        {'loc': 'css', 'value': '#custrecord_appfproj_fs_lbl_uir_label + span', 'retrieve': 'text', 'ready': 'idle'},
         {'custom': fetch_current_url, 'retrieve': 'url'}
     ]
+
+
+def get_login_elements() -> list:
+    """
+    Return the login elements, ending once the new proposal form is shown.
+
+    :return: static element list, compiled into a plan by middleware.plan
+    """
+    elements = get_elements()
+    landing = elements[LOGIN_ELEMENTS]
+    return elements[:LOGIN_ELEMENTS] + [{'loc': landing['loc'], 'value': landing['value'], 'label': PROPOSAL_LABEL}]
@@ -13,6 +13,54 @@ def get_max_row_col(sheet):
     return max_row, max_col
 
 
+def get_used_range_values(sheet):
+    """
+    Read the values of the used range of the sheet with a single COM call.
+
+    :param sheet: excel worksheet containing data
+    :return: row, column indices of the top left cell and a two-dimensional tuple of values
+    """
+    used_range = sheet.UsedRange
+    values = used_range.Value
+    if not isinstance(values, tuple):
+        values = ((values,),)
+    return used_range.Row, used_range.Column, values
+
+
+def find_values_in_array(values, targets) -> dict:
+    """
+    Find the first occurrence of each target value in a two-dimensional array in one pass.
+
+    :param values: two-dimensional array of cell values
+    :param targets: values to look for in the array
+    :return: target value, (row, column) zero based indices pairs for the targets found
+    """
+    remaining = set(targets)
+    found = {}
+    for i, row in enumerate(values):
+        for j, value in enumerate(row):
+            if value in remaining:
+                found[value] = (i, j)
+                remaining.discard(value)
+                if not remaining:
+                    return found
+    return found
+
+
+def get_cells_with_values(sheet, values, read_values=get_used_range_values) -> dict:
+    """
+    Get the indices of the cells containing the given values.
+
+    :param sheet: excel worksheet containing the cells
+    :param values: values to look for in the cells
+    :param read_values: function reading the used values of the sheet, see get_used_range_values
+    :return: value, (row, column) indices pairs for the values found
+    """
+    first_row, first_col, array = read_values(sheet)
+    found = find_values_in_array(array, [value for value in values if value is not None])
+    return {value: (first_row + i, first_col + j) for value, (i, j) in found.items()}
+
+
 def get_cell_with_value(sheet, value):
     """
     Get the indices of the cell containing a given value.
@@ -21,11 +69,38 @@ def get_cell_with_value(sheet, value):
     :param value: value to look for in the cell
     :return: row, column indices of the cell
     """
-    max_row, max_col = get_max_row_col(sheet)
-    for i in range(1, max_row):
-        for j in range(1, max_col):
-            if sheet.Cells(i, j).Value == value:
-                return i, j
+    return get_cells_with_values(sheet, [value]).get(value)
+
+
+def group_contiguous_cells(changes: dict) -> list:
+    """
+    Group the changed cells into horizontal runs of adjacent cells.
+
+    :param changes: (row, column), new value pairs
+    :return: row, first column and values of each run
+    """
+    runs = []
+    for (row, col) in sorted(changes):
+        if runs and runs[-1][0] == row and runs[-1][1] + len(runs[-1][2]) == col:
+            runs[-1][2].append(changes[(row, col)])
+        else:
+            runs.append((row, col, [changes[(row, col)]]))
+    return runs
+
+
+def write_cells(sheet, changes: dict):
+    """
+    Write the new values to the changed cells, one COM call per contiguous run.
+
+    :param sheet: excel worksheet containing the cells
+    :param changes: (row, column), new value pairs
+    """
+    for row, col, values in group_contiguous_cells(changes):
+        if len(values) == 1:
+            sheet.Cells(row, col).Value = values[0]
+            continue
+        cells = sheet.Range(sheet.Cells(row, col), sheet.Cells(row, col + len(values) - 1))
+        cells.Value = (tuple(values),)
 
 
 def change_cell_with_value(sheet, value, new_value):
@@ -36,12 +111,7 @@ def change_cell_with_value(sheet, value, new_value):
     :param value: value to look for in the cell
     :param new_value: value to replace the existing value with
     """
-    max_row, max_col = get_max_row_col(sheet)
-    for i in range(1, max_row):
-        for j in range(1, max_col):
-            if sheet.Cells(i, j).Value == value:
-                sheet.Cells(i, j).Value = new_value
-                return
+    change_cells_with_values(sheet, [[value, new_value]])
 
 
 def change_adjacent_cell(sheet, value, new_value):
@@ -56,26 +126,41 @@ def change_adjacent_cell(sheet, value, new_value):
     sheet.Cells(row, col + 1).Value = new_value
 
 
-def change_cells_with_values(sheet, key_value_pairs):
+def change_cells_with_values(sheet, key_value_pairs, cells: dict = None, read_values=get_used_range_values,
+                             write=write_cells):
     """
     Change all the cells containing specific values with the new values.
 
     :param sheet: excel worksheet containing the cells
     :param key_value_pairs: value, new value pairs
+    :param cells: known value, (row, column) indices pairs, the sheet is searched if not given
+    :param read_values: function reading the used values of the sheet, see get_used_range_values
+    :param write: function writing the changed cells, see write_cells
     """
-    for key_value_pair in key_value_pairs:
-        change_cell_with_value(sheet, key_value_pair[0], key_value_pair[1])
+    if cells is None:
+        cells = get_cells_with_values(sheet, [key for key, _ in key_value_pairs], read_values)
+    changes = {cells[key]: new_value for key, new_value in key_value_pairs if key in cells}
+    write(sheet, changes)
 
 
-def change_adjacent_cells_with_values(sheet, key_value_pairs):
+def change_adjacent_cells_with_values(sheet, key_value_pairs, cells: dict = None, read_values=get_used_range_values,
+                                      write=write_cells):
     """
     Change all the cells adjacent to the cells containing specific values with the new values.
 
     :param sheet: excel worksheet containing the cells
     :param key_value_pairs: value, new value pairs
-    """
-    for key_value_pair in key_value_pairs:
-        change_adjacent_cell(sheet, key_value_pair[0], key_value_pair[1])
+    :param cells: known value, (row, column) indices pairs, the sheet is searched if not given
+    :param read_values: function reading the used values of the sheet, see get_used_range_values
+    :param write: function writing the changed cells, see write_cells
+    """
+    if cells is None:
+        cells = get_cells_with_values(sheet, [key for key, _ in key_value_pairs], read_values)
+    changes = {}
+    for key, new_value in key_value_pairs:
+        row, col = cells[key]
+        changes[(row, col + 1)] = new_value
+    write(sheet, changes)
 
 
 def get_last_empty_row(sheet, column):
@@ -0,0 +1,218 @@
+import os
+import json
+import shutil
+import consts
+import hashlib
+import threading
+from pathlib import Path
+
+"""
+Local mirror of the templates and dropdown files kept on the network share.
+
+A mirrored copy is used while the size and modification time of the original are unchanged. When
+the share is slow or unreachable the last mirrored copy is used instead. Both the stat and the copy run on
+a worker thread, so a share that hangs mid-read cannot block the caller past the timeout.
+"""
+
+STAT_TIMEOUT = 2.0
+COPY_TIMEOUT = 30.0
+mirror_lock = threading.Lock()
+
+
+def get_mirror_dir() -> Path:
+    """
+    Return the directory holding the mirrored files.
+
+    :return: path of the mirror directory
+    """
+    return Path(consts.CACHE_DIR, 'mirror')
+
+
+def get_mirror_path(remote: Path | str) -> Path:
+    """
+    Return the path of the mirrored copy of a file.
+
+    :param remote: path of the file on the network share
+    :return: path of the local copy
+    """
+    prefix = hashlib.sha1(str(remote).lower().encode('utf-8')).hexdigest()[:10]
+    return get_mirror_dir() / f'{prefix}_{Path(remote).name}'
+
+
+def load_manifest() -> dict:
+    """
+    Load the manifest describing the mirrored files.
+
+    :return: remote path, (size, mtime, hash) entry pairs
+    """
+    try:
+        with open(get_mirror_dir() / 'manifest.json', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: dict):
+    """
+    Write the manifest atomically.
+
+    :param manifest: remote path, (size, mtime, hash) entry pairs
+    """
+    path = get_mirror_dir() / 'manifest.json'
+    tmp_path = path.with_name(f'manifest.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+    os.replace(tmp_path, path)
+
+
+def run_with_timeout(function, timeout: float, *args):
+    """
+    Run a file operation on a daemon thread without blocking longer than the timeout on an unresponsive share.
+
+    :param function: file operation to run
+    :param timeout: time (in seconds) to wait for the share
+    :param args: arguments of the file operation
+    :return: result of the operation or None if it failed or the share is too slow
+    """
+    result = []
+
+    def run():
+        try:
+            result.append(function(*args))
+        except OSError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result[0] if result else None
+
+
+def stat_with_timeout(path: Path | str, timeout: float = STAT_TIMEOUT):
+    """
+    Stat a file without blocking longer than the timeout on an unresponsive share.
+
+    :param path: path of the file
+    :param timeout: time (in seconds) to wait for the share
+    :return: os.stat_result or None if the file is unavailable or the share is too slow
+    """
+    return run_with_timeout(os.stat, timeout, path)
+
+
+def copy_file(remote: Path | str, local: Path) -> Path:
+    """
+    Copy a file next to its mirrored copy and move it into place.
+
+    :param remote: path of the file on the network share
+    :param local: path of the local copy
+    :return: path of the local copy
+    """
+    tmp_path = local.with_name(f'{local.name}.{threading.get_ident()}.tmp')
+    try:
+        shutil.copy2(remote, tmp_path)
+        os.replace(tmp_path, local)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return local
+
+
+def get_file_hash(path: Path | str) -> str:
+    """
+    Compute the SHA-256 hash of a file.
+
+    :param path: path of the file
+    :return: hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_mirror_valid(entry: dict, stat, local: Path, verify_hash: bool) -> bool:
+    """
+    Check if the mirrored copy matches the original.
+
+    :param entry: manifest entry of the file
+    :param stat: os.stat_result of the original
+    :param local: path of the local copy
+    :param verify_hash: also check the local copy against the hash recorded when it was copied
+    :return: true if the local copy can be used
+    """
+    if not entry or not local.is_file():
+        return False
+    if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+        return False
+    return not verify_hash or entry['hash'] == get_file_hash(local)
+
+
+def copy_to_mirror(remote: Path | str, stat, timeout: float = COPY_TIMEOUT) -> Path:
+    """
+    Copy a file to the mirror and record it in the manifest.
+
+    :param remote: path of the file on the network share
+    :param stat: os.stat_result of the original
+    :param timeout: time (in seconds) to wait for the copy
+    :return: path of the local copy or None if the copy failed or the share is too slow
+    """
+    local = get_mirror_path(remote)
+    local.parent.mkdir(parents=True, exist_ok=True)
+    if run_with_timeout(copy_file, timeout, remote, local) is None:
+        return None
+    with mirror_lock:
+        manifest = load_manifest()
+        manifest[str(remote)] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'hash': get_file_hash(local)}
+        save_manifest(manifest)
+    return local
+
+
+def get_local_path(remote: Path | str, verify_hash: bool = None, timeout: float = STAT_TIMEOUT) -> Path:
+    """
+    Return a local path to read the given file from, refreshing the mirror if the original changed.
+
+    :param remote: path of the file on the network share
+    :param verify_hash: also check the local copy against the hash recorded when it was copied,
+        defaults to MIRROR_VERIFY_HASH
+    :param timeout: time (in seconds) to wait for the share before falling back to the mirror
+    :return: path of the local copy, or the original path if it cannot be mirrored
+    """
+    if verify_hash is None:
+        verify_hash = consts.MIRROR_VERIFY_HASH
+    local = get_mirror_path(remote)
+    stat = stat_with_timeout(remote, timeout)
+    if stat is None:
+        return local if local.is_file() else Path(remote)
+    if is_mirror_valid(load_manifest().get(str(remote)), stat, local, verify_hash):
+        return local
+    try:
+        copied = copy_to_mirror(remote, stat)
+    except OSError:
+        copied = None
+    if copied is None:
+        return local if local.is_file() else Path(remote)
+    return copied
+
+
+def refresh(remotes: list, verify_hash: bool = None):
+    """
+    Bring the mirrored copies of the given files up to date.
+
+    :param remotes: paths of the files on the network share
+    :param verify_hash: also check the local copies against the hashes recorded when they were copied
+    """
+    for remote in remotes:
+        get_local_path(remote, verify_hash)
+
+
+def refresh_async(remotes: list, verify_hash: bool = None) -> threading.Thread:
+    """
+    Refresh the mirrored copies of the given files on a background thread.
+
+    :param remotes: paths of the files on the network share
+    :param verify_hash: also check the local copies against the hashes recorded when they were copied
+    :return: the started thread
+    """
+    thread = threading.Thread(target=refresh, args=(remotes, verify_hash), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,93 @@
+from bisect import bisect_left
+from heapq import nsmallest
+
+"""
+Search index over the values of a dropdown list.
+
+Prefix queries are answered with a binary search over the sorted, case folded values. Substring
+queries intersect the posting lists of the query trigrams and only check the surviving candidates,
+so the cost of a keystroke depends on the number of matches rather than the size of the list.
+"""
+
+GRAM_SIZE = 3
+
+
+class SearchIndex:
+    """
+    Case insensitive prefix and substring index built once per list.
+
+        Attributes:
+        values (list): The values of the list, sorted case insensitively.
+        keys (list): The case folded values, in the same order as values.
+        grams (dict): Trigram, indices of the values containing it pairs.
+    """
+
+    def __init__(self, values: list):
+        keyed = sorted((str(value).casefold(), str(value)) for value in values)
+        self.keys = [key for key, _ in keyed]
+        self.values = [value for _, value in keyed]
+        self.grams = {}
+        for i, key in enumerate(self.keys):
+            for gram in {key[j:j + GRAM_SIZE] for j in range(len(key) - GRAM_SIZE + 1)}:
+                self.grams.setdefault(gram, []).append(i)
+
+    def __len__(self):
+        return len(self.values)
+
+    def prefix_matches(self, query: str, limit: int) -> list:
+        """
+        Return the indices of the values starting with the query, in sorted order.
+
+        :param query: case folded text to look for
+        :param limit: maximum number of matches
+        :return: indices of the matching values
+        """
+        matches = []
+        i = bisect_left(self.keys, query)
+        while i < len(self.keys) and len(matches) < limit and self.keys[i].startswith(query):
+            matches.append(i)
+            i += 1
+        return matches
+
+    def substring_matches(self, query: str, limit: int, exclude: set = frozenset()) -> list:
+        """
+        Return the indices of the values containing the query, earliest occurrence first.
+
+        :param query: case folded text to look for, at least GRAM_SIZE characters long
+        :param limit: maximum number of matches
+        :param exclude: indices to leave out of the result
+        :return: indices of the matching values
+        """
+        postings = []
+        for gram in {query[j:j + GRAM_SIZE] for j in range(len(query) - GRAM_SIZE + 1)}:
+            if gram not in self.grams:
+                return []
+            postings.append(self.grams[gram])
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        ranked = []
+        for i in candidates - exclude:
+            position = self.keys[i].find(query)
+            if position >= 0:
+                ranked.append((position, i))
+        return [i for _, i in nsmallest(limit, ranked)]
+
+    def search(self, query: str, limit: int = 100) -> list:
+        """
+        Return the values matching the query, prefix matches first followed by substring matches.
+
+        :param query: text typed by the user
+        :param limit: maximum number of values to return
+        :return: matching values in ranked order
+        """
+        query = query.casefold()
+        if not query:
+            return self.values[:limit]
+        matches = self.prefix_matches(query, limit)
+        if len(matches) < limit and len(query) >= GRAM_SIZE:
+            matches += self.substring_matches(query, limit - len(matches), set(matches))
+        return [self.values[i] for i in matches]